@@ -18,13 +18,20 @@ Modules:
 __version__ = "1.0.0"
 __author__ = "Yaakov Lombard"
 
-# Import main classes for easy access
-from src.models import MenstrualPeriod, ForbiddenDay
-from . import main
-
 # Define what gets imported with "from tahara_calculator import *"
 __all__ = [
     'MenstrualPeriod',
     'ForbiddenDay', 
     'main'
 ]
+
+
+def __getattr__(name):
+    """Import the main classes and the entry point on first access."""
+    if name in ('MenstrualPeriod', 'ForbiddenDay'):
+        from src import models
+        return getattr(models, name)
+    if name == 'main':
+        import importlib
+        return importlib.import_module('.main', __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,9 @@
+"""
+Benchmarks for the Tahara Calculator.
+
+Modules:
+    generators: Synthetic period history generators
+    run_benchmarks: Per-stage timing and memory benchmark runner
+    regression: Regression gate against a stored baseline
+    startup: Cold-start import time budget of the entry points
+"""
@@ -0,0 +1,124 @@
+"""
+Synthetic period history generators for the Tahara Calculator benchmarks.
+
+This module generates reproducible input files of any size with regular,
+irregular or heavily duplicated cycle intervals, written in Hebrew,
+Gregorian or mixed date formats.
+"""
+
+import os
+import random
+import sys
+from datetime import date, timedelta
+
+# Add the parent directory to the Python path when run as a script
+if not __package__:
+    parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if parent_dir not in sys.path:
+        sys.path.insert(0, parent_dir)
+
+from pyluach import dates
+from utils.date_converter import format_hebrew_date_for_input
+
+# Shapes of generated cycle interval sequences
+HISTORY_PATTERNS = ("regular", "irregular", "duplicates")
+
+# Date formats of generated input lines
+DATE_FORMATS = ("hebrew", "gregorian", "mixed")
+
+# History sizes (number of periods) used by the benchmark suite
+HISTORY_SIZES = (10, 100, 1000, 10000, 100000, 1000000)
+
+# Gregorian input formats accepted by the parser
+GREGORIAN_FORMATS = ("%d/%m/%Y", "%d-%m-%Y", "%Y-%m-%d")
+
+# Default first period date (1 Tishrei 5660)
+DEFAULT_START_DATE = dates.HebrewDate(5660, 7, 1)
+
+
+def generate_cycle_intervals(pattern, count, rng):
+    """
+    Generate a sequence of cycle intervals.
+    
+    Args:
+        pattern: One of HISTORY_PATTERNS
+        count: Number of intervals to generate
+        rng: random.Random instance
+    
+    Returns:
+        list: Cycle intervals (days, counting both periods' days)
+    """
+    if pattern == "regular":
+        base_interval = rng.randint(26, 32)
+        return [base_interval + rng.choice((-1, 0, 0, 0, 0, 1)) for _ in range(count)]
+    if pattern == "irregular":
+        return [max(15, int(rng.gauss(31, 7))) for _ in range(count)]
+    if pattern == "duplicates":
+        common_intervals = rng.sample(range(26, 35), 3)
+        return [rng.choice(common_intervals) for _ in range(count)]
+    raise ValueError(f"Unknown history pattern: {pattern}")
+
+
+def generate_period_history(pattern, size, date_format="hebrew", seed=0, start_date=None):
+    """
+    Generate a synthetic period history as input file lines.
+    
+    Args:
+        pattern: One of HISTORY_PATTERNS
+        size: Number of periods
+        date_format: One of DATE_FORMATS
+        seed: Random seed, so the same arguments give the same history
+        start_date: Hebrew date of the first period (optional)
+    
+    Returns:
+        list: Input lines such as "8/12/5785 0" or "2024-03-15 1"
+    
+    Raises:
+        ValueError: If the history runs past the last Gregorian year
+            and the format includes Gregorian dates
+    """
+    if date_format not in DATE_FORMATS:
+        raise ValueError(f"Unknown date format: {date_format}")
+    
+    rng = random.Random(seed)
+    start_date = start_date or DEFAULT_START_DATE
+    intervals = generate_cycle_intervals(pattern, max(size - 1, 0), rng)
+    
+    day_offsets = [0]
+    for interval in intervals:
+        day_offsets.append(day_offsets[-1] + interval - 1)
+    
+    if date_format != "hebrew":
+        start_pydate = start_date.to_pydate()
+        if day_offsets[-1] > (date.max - start_pydate).days:
+            raise ValueError(
+                f"A {pattern} history of {size} periods runs past year {date.max.year}; "
+                f"use the hebrew date format"
+            )
+    
+    history_lines = []
+    for day_offset in day_offsets:
+        time_of_day = rng.randint(0, 1)
+        if date_format == "hebrew" or (date_format == "mixed" and rng.random() < 0.5):
+            hebrew_date = dates.JulianDay(start_date.jd + day_offset).to_heb()
+            history_lines.append(format_hebrew_date_for_input(hebrew_date, time_of_day))
+        else:
+            gregorian_date = start_pydate + timedelta(days=day_offset)
+            gregorian_format = rng.choice(GREGORIAN_FORMATS)
+            history_lines.append(f"{gregorian_date.strftime(gregorian_format)} {time_of_day}")
+    
+    return history_lines
+
+
+def write_period_history(file_path, history_lines, encoding="utf-8"):
+    """
+    Write a generated history to an input file.
+    
+    Args:
+        file_path: Path to the input file
+        history_lines: Lines returned by generate_period_history
+        encoding: File encoding
+    """
+    with open(file_path, "w", encoding=encoding) as f:
+        f.write("\n".join(history_lines))
+        f.write("\n")
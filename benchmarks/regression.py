@@ -0,0 +1,348 @@
+"""
+Benchmark regression gate for the Tahara Calculator.
+
+This module measures the calculation, parsing and formatting hot paths
+and the pipeline stages over fixed-seed histories, repeats every
+measurement, and compares the median throughput and peak memory against
+a committed baseline file.
+"""
+
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# Add the parent directory to the Python path when run as a script
+if not __package__:
+    parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if parent_dir not in sys.path:
+        sys.path.insert(0, parent_dir)
+
+from benchmarks.generators import generate_period_history, write_period_history
+from benchmarks.run_benchmarks import run_pipeline
+from src.parsers import convert_text_to_menstrual_period
+from src.calculations import calculate_forbidden_days, _calculate_unbroken_patterns
+from src.processor import (
+    process_periods_data,
+    calculate_cycle_intervals,
+    calculate_all_forbidden_days,
+    create_periods_index
+)
+from utils.formatters import (
+    format_output_lines,
+    _format_forbidden_day_line,
+    get_date_render_cache,
+    get_period_block_cache,
+    PeriodBlockCache
+)
+
+DEFAULT_BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+# Gate defaults
+DEFAULT_REPEATS = 5
+DEFAULT_TOLERANCE = 0.25
+DEFAULT_MEMORY_TOLERANCE = 0.10
+GATE_SEED = 1234
+GATE_HISTORY_SIZE = 150
+
+
+def _build_hot_path_cases(seed=GATE_SEED, size=GATE_HISTORY_SIZE):
+    """
+    Build the hot path benchmark cases over a fixed-seed history.
+    
+    Returns:
+        dict: Case name -> (function to time, number of items it processes)
+    """
+    history_lines = generate_period_history("duplicates", size, "mixed", seed)
+    menstrual_periods_list = process_periods_data(history_lines)
+    historical_cycle_intervals = calculate_cycle_intervals(menstrual_periods_list)
+    calculate_all_forbidden_days(menstrual_periods_list, historical_cycle_intervals)
+    periods_indexed_by_date = create_periods_index(menstrual_periods_list)
+    forbidden_days = [
+        unbroken_pattern
+        for period in menstrual_periods_list
+        for forbidden_day in period.forbidden_days_list
+        for unbroken_pattern in (forbidden_day if isinstance(forbidden_day, list) else [forbidden_day])
+    ]
+    render_cache = get_date_render_cache()
+    # Measure the formatting itself, not the block cache bookkeeping
+    disabled_block_cache = PeriodBlockCache(max_size=0)
+    
+    def parse_lines():
+        return [convert_text_to_menstrual_period(line) for line in history_lines]
+    
+    def calculate_periods():
+        return [
+            calculate_forbidden_days(period, historical_cycle_intervals[:period_index])
+            for period_index, period in enumerate(menstrual_periods_list)
+        ]
+    
+    def calculate_unbroken_patterns():
+        return [
+            _calculate_unbroken_patterns(
+                period, historical_cycle_intervals[:period_index], period.hebrew_date
+            )
+            for period_index, period in enumerate(menstrual_periods_list)
+        ]
+    
+    def format_lines():
+        render_cache.clear()
+        return [_format_forbidden_day_line(forbidden_day) for forbidden_day in forbidden_days]
+    
+    def format_output():
+        render_cache.clear()
+        return format_output_lines(periods_indexed_by_date, historical_cycle_intervals,
+                                   block_cache=disabled_block_cache)
+    
+    return {
+        "parsers.convert_text_to_menstrual_period": (parse_lines, len(history_lines)),
+        "calculations.calculate_forbidden_days": (calculate_periods, len(menstrual_periods_list)),
+        "calculations._calculate_unbroken_patterns": (calculate_unbroken_patterns, len(menstrual_periods_list)),
+        "formatters._format_forbidden_day_line": (format_lines, len(forbidden_days)),
+        "formatters.format_output_lines": (format_output, len(menstrual_periods_list))
+    }
+
+
+def _summarize(samples):
+    """Get the median and interquartile range of a list of samples."""
+    if len(samples) >= 2:
+        first_quartile, _, third_quartile = statistics.quantiles(samples, n=4, method="inclusive")
+    else:
+        first_quartile = third_quartile = samples[0]
+    return {
+        "median": statistics.median(samples),
+        "iqr": third_quartile - first_quartile
+    }
+
+
+def _measure_case(case_function, item_count, repeats):
+    """
+    Time a case repeatedly and trace its peak memory once.
+    
+    Returns:
+        dict: Throughput statistics (items per second) and peak memory
+    """
+    case_function()  # Warm up
+    throughputs = []
+    for _ in range(repeats):
+        start_time = time.perf_counter()
+        case_function()
+        elapsed_seconds = time.perf_counter() - start_time
+        throughputs.append(item_count / elapsed_seconds if elapsed_seconds else float("inf"))
+    
+    tracemalloc.start()
+    try:
+        case_function()
+        peak_memory = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    
+    throughput = _summarize(throughputs)
+    return {
+        "items": item_count,
+        "throughput_median": throughput["median"],
+        "throughput_iqr": throughput["iqr"],
+        "peak_memory_bytes": peak_memory
+    }
+
+
+def _measure_pipeline_stages(repeats, seed=GATE_SEED, size=GATE_HISTORY_SIZE):
+    """
+    Measure every pipeline stage repeatedly over a fixed-seed history.
+    
+    Returns:
+        dict: "pipeline.<stage>" -> throughput statistics and peak memory
+    """
+    with tempfile.TemporaryDirectory() as temp_dir:
+        input_path = os.path.join(temp_dir, "dates.txt")
+        write_period_history(input_path, generate_period_history("regular", size, "hebrew", seed))
+        
+        runs = []
+        for run_index in range(repeats + 1):
+            get_date_render_cache().clear()
+            get_period_block_cache().clear()
+            runs.append(run_pipeline(input_path, os.path.join(temp_dir, f"results_{run_index}.txt")))
+        runs = runs[1:]  # The first run is a warm up
+        get_date_render_cache().clear()
+        get_period_block_cache().clear()
+        traced_run = run_pipeline(input_path, os.path.join(temp_dir, "traced_results.txt"), track_memory=True)
+    
+    stage_results = {}
+    for stage_name, traced_measurement in traced_run.items():
+        throughputs = [
+            run[stage_name]["items"] / run[stage_name]["seconds"] if run[stage_name]["seconds"] else float("inf")
+            for run in runs
+        ]
+        throughput = _summarize(throughputs)
+        stage_results[f"pipeline.{stage_name}"] = {
+            "items": traced_measurement["items"],
+            "throughput_median": throughput["median"],
+            "throughput_iqr": throughput["iqr"],
+            "peak_memory_bytes": traced_measurement["peak_memory_bytes"]
+        }
+    return stage_results
+
+
+def measure_gate_stages(repeats=DEFAULT_REPEATS):
+    """
+    Measure all stages covered by the regression gate.
+    
+    Args:
+        repeats: Number of timed runs per stage
+    
+    Returns:
+        dict: Stage name -> {"items", "throughput_median", "throughput_iqr", "peak_memory_bytes"}
+    """
+    stage_results = {}
+    for case_name, (case_function, item_count) in _build_hot_path_cases().items():
+        stage_results[case_name] = _measure_case(case_function, item_count, repeats)
+    stage_results.update(_measure_pipeline_stages(repeats))
+    return stage_results
+
+
+def load_baseline(baseline_file=DEFAULT_BASELINE_FILE):
+    """
+    Load a stored baseline.
+    
+    Args:
+        baseline_file: Path to the baseline file
+    
+    Returns:
+        dict: Stage name -> measurements, or None if there is no baseline
+    """
+    try:
+        with open(baseline_file, "r", encoding="utf-8") as f:
+            return json.load(f)["stages"]
+    except (json.JSONDecodeError, KeyError, IOError, OSError):
+        return None
+
+
+def save_baseline(stage_results, baseline_file=DEFAULT_BASELINE_FILE, repeats=DEFAULT_REPEATS):
+    """
+    Store measurements as the new baseline.
+    
+    Args:
+        stage_results: Measurements returned by measure_gate_stages
+        baseline_file: Path to the baseline file
+        repeats: Number of timed runs the measurements are based on
+    """
+    baseline = {
+        "seed": GATE_SEED,
+        "history_size": GATE_HISTORY_SIZE,
+        "repeats": repeats,
+        "stages": stage_results
+    }
+    with open(baseline_file, "w", encoding="utf-8") as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def compare_to_baseline(stage_results, baseline_stages, tolerance=DEFAULT_TOLERANCE,
+                        memory_tolerance=DEFAULT_MEMORY_TOLERANCE):
+    """
+    Compare measurements against a baseline.
+    
+    Args:
+        stage_results: Current measurements
+        baseline_stages: Baseline measurements
+        tolerance: Allowed relative throughput drop (0.25 = 25% slower)
+        memory_tolerance: Allowed relative peak memory growth
+    
+    Returns:
+        list: One comparison dict per stage, with a "regressions" list
+    """
+    comparisons = []
+    for stage_name, current in stage_results.items():
+        baseline = baseline_stages.get(stage_name)
+        comparison = {"stage": stage_name, "current": current, "baseline": baseline, "regressions": []}
+        if baseline:
+            throughput_change = current["throughput_median"] / baseline["throughput_median"] - 1
+            memory_change = (
+                current["peak_memory_bytes"] / baseline["peak_memory_bytes"] - 1
+                if baseline["peak_memory_bytes"] else 0.0
+            )
+            comparison["throughput_change"] = throughput_change
+            comparison["memory_change"] = memory_change
+            if throughput_change < -tolerance:
+                comparison["regressions"].append("throughput")
+            if memory_change > memory_tolerance:
+                comparison["regressions"].append("memory")
+        comparisons.append(comparison)
+    return comparisons
+
+
+def format_comparison_report(comparisons):
+    """
+    Format a per-stage comparison table.
+    
+    Args:
+        comparisons: Result of compare_to_baseline
+    
+    Returns:
+        str: Human readable report
+    """
+    report_lines = [
+        f"{'Stage':<48} {'items/s':>12} {'IQR':>10} {'baseline':>12} {'change':>8} "
+        f"{'peak mem':>11} {'change':>8}  status"
+    ]
+    for comparison in comparisons:
+        current = comparison["current"]
+        baseline = comparison["baseline"]
+        if baseline:
+            status = ", ".join(f"REGRESSED ({kind})" for kind in comparison["regressions"]) or "ok"
+            report_lines.append(
+                f"{comparison['stage']:<48} {current['throughput_median']:>12.1f} "
+                f"{current['throughput_iqr']:>10.1f} {baseline['throughput_median']:>12.1f} "
+                f"{comparison['throughput_change']:>+8.1%} {current['peak_memory_bytes']:>11d} "
+                f"{comparison['memory_change']:>+8.1%}  {status}"
+            )
+        else:
+            report_lines.append(
+                f"{comparison['stage']:<48} {current['throughput_median']:>12.1f} "
+                f"{current['throughput_iqr']:>10.1f} {'-':>12} {'-':>8} "
+                f"{current['peak_memory_bytes']:>11d} {'-':>8}  new stage"
+            )
+    return "\n".join(report_lines)
+
+
+def run_regression_gate(baseline_file=DEFAULT_BASELINE_FILE, repeats=DEFAULT_REPEATS,
+                        tolerance=DEFAULT_TOLERANCE, memory_tolerance=DEFAULT_MEMORY_TOLERANCE,
+                        update_baseline=False, output_stream=None):
+    """
+    Run the regression gate.
+    
+    Args:
+        baseline_file: Path to the baseline file
+        repeats: Number of timed runs per stage
+        tolerance: Allowed relative throughput drop
+        memory_tolerance: Allowed relative peak memory growth
+        update_baseline: Store the current measurements as the new baseline
+        output_stream: Stream for the report (default: stdout)
+    
+    Returns:
+        bool: True if no stage regressed (always True when updating the baseline)
+    """
+    output_stream = output_stream or sys.stdout
+    stage_results = measure_gate_stages(repeats)
+    
+    if update_baseline:
+        save_baseline(stage_results, baseline_file, repeats)
+        output_stream.write(f"Baseline updated: {baseline_file}\n")
+        return True
+    
+    baseline_stages = load_baseline(baseline_file)
+    if baseline_stages is None:
+        output_stream.write(f"No baseline found at {baseline_file}; run with --update-baseline first.\n")
+        return False
+    
+    comparisons = compare_to_baseline(stage_results, baseline_stages, tolerance, memory_tolerance)
+    output_stream.write(format_comparison_report(comparisons) + "\n")
+    regressed_stages = [comparison["stage"] for comparison in comparisons if comparison["regressions"]]
+    if regressed_stages:
+        output_stream.write(f"\n{len(regressed_stages)} stage(s) regressed: {', '.join(regressed_stages)}\n")
+        return False
+    output_stream.write("\nNo regressions.\n")
+    return True
@@ -0,0 +1,307 @@
+"""
+Benchmark runner for the Tahara Calculator.
+
+This module times each stage of the calculation pipeline separately
+over synthetic histories and reports throughput and peak memory as JSON.
+
+Usage:
+    python benchmarks/run_benchmarks.py --sizes 10,100,1000 --output results.json
+    python benchmarks/run_benchmarks.py --gate [--tolerance 0.25] [--repeats 5]
+    python benchmarks/run_benchmarks.py --update-baseline
+    python benchmarks/run_benchmarks.py --startup [--startup-budget-ms 75]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# Add the parent directory to the Python path when run as a script
+if not __package__:
+    parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if parent_dir not in sys.path:
+        sys.path.insert(0, parent_dir)
+
+from benchmarks.generators import (
+    generate_period_history,
+    write_period_history,
+    HISTORY_PATTERNS,
+    DATE_FORMATS
+)
+from utils.file_operations import read_periods_list_file, export_results
+from src.processor import (
+    process_periods_data,
+    calculate_cycle_intervals,
+    calculate_all_forbidden_days,
+    create_periods_index
+)
+from utils.formatters import format_output_lines
+
+# Pipeline stages, in execution order
+BENCHMARK_STAGES = (
+    "read_periods_list_file",
+    "process_periods_data",
+    "calculate_cycle_intervals",
+    "calculate_all_forbidden_days",
+    "format_output_lines",
+    "export"
+)
+
+# Default benchmark matrix
+DEFAULT_SIZES = (10, 100, 1000)
+DEFAULT_PATTERNS = HISTORY_PATTERNS
+DEFAULT_FORMATS = ("hebrew",)
+
+
+def count_forbidden_days(menstrual_periods_list):
+    """
+    Count all forbidden days, including those inside unbroken pattern lists.
+    
+    Args:
+        menstrual_periods_list: List of menstrual periods
+    
+    Returns:
+        int: Number of forbidden days
+    """
+    return sum(
+        len(forbidden_day) if isinstance(forbidden_day, list) else 1
+        for period in menstrual_periods_list
+        for forbidden_day in period.forbidden_days_list
+    )
+
+
+def _run_stage(stage_function, track_memory):
+    """
+    Run one stage, measuring its wall time and (optionally) peak memory.
+    
+    Returns:
+        tuple: (stage result, seconds, peak memory in bytes or None)
+    """
+    if track_memory:
+        tracemalloc.reset_peak()
+        memory_before = tracemalloc.get_traced_memory()[0]
+    start_time = time.perf_counter()
+    stage_result = stage_function()
+    elapsed_seconds = time.perf_counter() - start_time
+    peak_memory = None
+    if track_memory:
+        peak_memory = tracemalloc.get_traced_memory()[1] - memory_before
+    return stage_result, elapsed_seconds, peak_memory
+
+
+def run_pipeline(input_path, output_path, track_memory=False):
+    """
+    Run the calculation pipeline once, measuring every stage.
+    
+    Args:
+        input_path: Path to the input file
+        output_path: Path the results are exported to
+        track_memory: Measure peak memory per stage (slows the run down)
+    
+    Returns:
+        dict: Stage name -> {"seconds", "items", "peak_memory_bytes"}
+    """
+    stage_measurements = {}
+    
+    def measure(stage_name, stage_function, count_items):
+        stage_result, elapsed_seconds, peak_memory = _run_stage(stage_function, track_memory)
+        stage_measurements[stage_name] = {
+            "seconds": elapsed_seconds,
+            "items": count_items(stage_result),
+            "peak_memory_bytes": peak_memory
+        }
+        return stage_result
+    
+    if track_memory:
+        tracemalloc.start()
+    try:
+        period_dates_list = measure(
+            "read_periods_list_file", lambda: read_periods_list_file(input_path), len
+        )
+        menstrual_periods_list = measure(
+            "process_periods_data", lambda: process_periods_data(period_dates_list), len
+        )
+        historical_cycle_intervals = measure(
+            "calculate_cycle_intervals",
+            lambda: calculate_cycle_intervals(menstrual_periods_list),
+            len
+        )
+        measure(
+            "calculate_all_forbidden_days",
+            lambda: calculate_all_forbidden_days(menstrual_periods_list, historical_cycle_intervals),
+            lambda _: count_forbidden_days(menstrual_periods_list)
+        )
+        periods_indexed_by_date = create_periods_index(menstrual_periods_list)
+        output_content_lines = measure(
+            "format_output_lines",
+            lambda: format_output_lines(periods_indexed_by_date, historical_cycle_intervals),
+            len
+        )
+        with contextlib.redirect_stdout(io.StringIO()):
+            measure(
+                "export",
+                lambda: export_results(output_path, output_content_lines),
+                lambda _: len(output_content_lines)
+            )
+    finally:
+        if track_memory:
+            tracemalloc.stop()
+    
+    return stage_measurements
+
+
+def benchmark_history(pattern, size, date_format, seed=0, track_memory=True, work_dir=None):
+    """
+    Benchmark the pipeline over one synthetic history.
+    
+    Timings come from a run without memory tracing; peak memory comes
+    from a second, traced run.
+    
+    Args:
+        pattern: One of HISTORY_PATTERNS
+        size: Number of periods
+        date_format: One of DATE_FORMATS
+        seed: Random seed for the history
+        track_memory: Also measure peak memory per stage
+        work_dir: Directory for the input and output files (optional)
+    
+    Returns:
+        dict: Benchmark result with per-stage measurements
+    """
+    with tempfile.TemporaryDirectory(dir=work_dir) as temp_dir:
+        input_path = os.path.join(temp_dir, "dates.txt")
+        write_period_history(input_path, generate_period_history(pattern, size, date_format, seed))
+        
+        stages = run_pipeline(input_path, os.path.join(temp_dir, "timed_results.txt"))
+        if track_memory:
+            memory_stages = run_pipeline(
+                input_path, os.path.join(temp_dir, "traced_results.txt"), track_memory=True
+            )
+            for stage_name, measurement in memory_stages.items():
+                stages[stage_name]["peak_memory_bytes"] = measurement["peak_memory_bytes"]
+    
+    for measurement in stages.values():
+        seconds = measurement["seconds"]
+        measurement["items_per_second"] = measurement["items"] / seconds if seconds else None
+    
+    return {
+        "pattern": pattern,
+        "size": size,
+        "format": date_format,
+        "seed": seed,
+        "total_seconds": sum(measurement["seconds"] for measurement in stages.values()),
+        "stages": stages
+    }
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, patterns=DEFAULT_PATTERNS, formats=DEFAULT_FORMATS,
+                   seed=0, track_memory=True, progress_stream=None):
+    """
+    Run the benchmark matrix.
+    
+    Args:
+        sizes: History sizes to benchmark
+        patterns: History patterns to benchmark
+        formats: Date formats to benchmark
+        seed: Random seed for the histories
+        track_memory: Also measure peak memory per stage
+        progress_stream: Stream for progress messages (optional)
+    
+    Returns:
+        dict: JSON-serializable benchmark report
+    """
+    results = []
+    for size in sizes:
+        for pattern in patterns:
+            for date_format in formats:
+                if progress_stream:
+                    progress_stream.write(f"Benchmarking {pattern} {date_format} history of {size} periods...\n")
+                    progress_stream.flush()
+                results.append(benchmark_history(pattern, size, date_format, seed, track_memory))
+    
+    return {
+        "python_version": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results
+    }
+
+
+def _parse_list(value, converter=str):
+    """Parse a comma separated command line value."""
+    return tuple(converter(item) for item in value.split(",") if item)
+
+
+def main(argv=None):
+    """Main entry point for the benchmark runner."""
+    parser = argparse.ArgumentParser(description="Benchmark the Tahara Calculator pipeline stages.")
+    parser.add_argument("--sizes", type=lambda value: _parse_list(value, int), default=DEFAULT_SIZES,
+                        help="Comma separated history sizes (default: 10,100,1000)")
+    parser.add_argument("--patterns", type=_parse_list, default=DEFAULT_PATTERNS,
+                        help=f"Comma separated history patterns from: {', '.join(HISTORY_PATTERNS)}")
+    parser.add_argument("--formats", type=_parse_list, default=DEFAULT_FORMATS,
+                        help=f"Comma separated date formats from: {', '.join(DATE_FORMATS)}")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for the histories")
+    parser.add_argument("--no-memory", action="store_true", help="Skip peak memory measurement")
+    parser.add_argument("--output", help="Write the JSON report to this file instead of stdout")
+    parser.add_argument("--gate", action="store_true",
+                        help="Compare the hot paths against the stored baseline and fail on regressions")
+    parser.add_argument("--update-baseline", action="store_true",
+                        help="Measure the hot paths and store them as the new baseline")
+    parser.add_argument("--baseline", help="Baseline file (default: benchmarks/baseline.json)")
+    parser.add_argument("--repeats", type=int, default=5, help="Timed runs per stage in gate mode")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed relative throughput drop in gate mode (default: 0.25)")
+    parser.add_argument("--memory-tolerance", type=float, default=0.10,
+                        help="Allowed relative peak memory growth in gate mode (default: 0.10)")
+    parser.add_argument("--startup", action="store_true",
+                        help="Measure the cold start of the entry points and enforce the startup budget")
+    parser.add_argument("--startup-budget-ms", type=float, default=None,
+                        help="Cold-start import budget per entry point in milliseconds (default: 75)")
+    args = parser.parse_args(argv)
+    
+    if args.startup or args.gate:
+        from benchmarks.startup import run_startup_check, DEFAULT_STARTUP_BUDGET_MS
+        startup_passed = run_startup_check(
+            budget_ms=args.startup_budget_ms or DEFAULT_STARTUP_BUDGET_MS
+        )
+        if args.startup:
+            sys.exit(0 if startup_passed else 1)
+        print()
+    
+    if args.gate or args.update_baseline:
+        from benchmarks.regression import run_regression_gate, DEFAULT_BASELINE_FILE
+        gate_passed = run_regression_gate(
+            baseline_file=args.baseline or DEFAULT_BASELINE_FILE,
+            repeats=args.repeats,
+            tolerance=args.tolerance,
+            memory_tolerance=args.memory_tolerance,
+            update_baseline=args.update_baseline
+        )
+        if args.gate and not startup_passed:
+            gate_passed = False
+        sys.exit(0 if gate_passed else 1)
+    
+    report = run_benchmarks(
+        sizes=args.sizes,
+        patterns=args.patterns,
+        formats=args.formats,
+        seed=args.seed,
+        track_memory=not args.no_memory,
+        progress_stream=sys.stderr
+    )
+    report_text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(report_text + "\n")
+    else:
+        print(report_text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+"""
+Startup benchmark for the Tahara Calculator.
+
+This module imports each command line entry point in a fresh interpreter
+under ``python -X importtime`` and checks the cumulative import time
+against a cold-start budget. It also checks that importing performs no
+file I/O and leaves heavy modules (pyluach, the HTTP server, the
+profilers) unloaded until they are used.
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Entry point name -> module imported at startup
+STARTUP_ENTRY_POINTS = {
+    "calculator": "cli.cli",
+    "dates_cli": "cli.dates_cli",
+    "config_cli": "config.config_cli"
+}
+
+# Modules that must not be executed just by importing an entry point
+LAZY_MODULES = (
+    "pyluach.dates",
+    "pyluach.hebrewcal",
+    "http.server",
+    "concurrent.futures",
+    "cProfile",
+    "pstats",
+    "tempfile"
+)
+
+# Default cold-start budget: cumulative import time of an entry point
+DEFAULT_STARTUP_BUDGET_MS = 75.0
+DEFAULT_STARTUP_REPEATS = 7
+
+# Runs in the child interpreter: records file opens during the import and
+# reports which lazy modules were executed
+_STARTUP_PROBE = """
+import sys
+opened_files = []
+def _record_open(event, args):
+    if event == "open" and isinstance(args[0], str) and not args[0].endswith((".py", ".pyc", ".pth")):
+        opened_files.append(args[0])
+sys.addaudithook(_record_open)
+import {module}
+import json, types
+loaded_modules = [
+    name for name in {lazy_modules!r}
+    if type(sys.modules.get(name)) is types.ModuleType
+]
+sys.stdout.write(json.dumps({{"opened_files": opened_files, "loaded_modules": loaded_modules}}))
+"""
+
+
+def parse_importtime(stderr_text, module_name):
+    """
+    Get the cumulative import time of a module from ``-X importtime`` output.
+    
+    Args:
+        stderr_text: Standard error of the child interpreter
+        module_name: Top level module to look up
+    
+    Returns:
+        float: Cumulative import time in milliseconds, or None if not found
+    """
+    for line in stderr_text.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or fields[2].strip() != module_name:
+            continue
+        # Only the top level import, not a nested one of the same name
+        if fields[2][1:2] != " ":
+            try:
+                return int(fields[1]) / 1000
+            except ValueError:
+                return None
+    return None
+
+
+def measure_entry_point(module_name, repeats=DEFAULT_STARTUP_REPEATS):
+    """
+    Measure the cold-start import of one entry point module.
+    
+    Args:
+        module_name: Module to import (e.g., "cli.cli")
+        repeats: Number of fresh interpreters to start
+    
+    Returns:
+        dict: Median import time, median process wall time and side effects
+    """
+    probe = _STARTUP_PROBE.format(module=module_name, lazy_modules=LAZY_MODULES)
+    import_times = []
+    wall_times = []
+    side_effects = None
+    # Import from a directory holding a config.json, so reading it at import is caught
+    with tempfile.TemporaryDirectory() as work_dir:
+        # Let the warm-up run write bytecode into the work directory, so the
+        # measured runs load cached bytecode even when the parent disabled it
+        child_environment = dict(os.environ, PYTHONPATH=PROJECT_DIR, PYTHONPYCACHEPREFIX=work_dir)
+        child_environment.pop("PYTHONDONTWRITEBYTECODE", None)
+        with open(os.path.join(work_dir, "config.json"), "w", encoding="utf-8") as f:
+            f.write("{}")
+        for _ in range(repeats + 1):
+            start_time = time.perf_counter()
+            completed = subprocess.run(
+                [sys.executable, "-X", "importtime", "-c", probe],
+                cwd=work_dir, env=child_environment, capture_output=True, text=True
+            )
+            wall_times.append((time.perf_counter() - start_time) * 1000)
+            if completed.returncode != 0:
+                raise RuntimeError(f"Importing {module_name} failed:\n{completed.stderr}")
+            import_times.append(parse_importtime(completed.stderr, module_name))
+            side_effects = json.loads(completed.stdout)
+    
+    # The first run compiles bytecode and warms the OS file cache
+    import_times = import_times[1:]
+    wall_times = wall_times[1:]
+    return {
+        "module": module_name,
+        "import_ms": statistics.median(import_times),
+        "process_ms": statistics.median(wall_times),
+        "opened_files": side_effects["opened_files"],
+        "loaded_modules": side_effects["loaded_modules"]
+    }
+
+
+def measure_command_ms(command, repeats=DEFAULT_STARTUP_REPEATS, cwd=None, env=None):
+    """
+    Measure the wall time of running a command to completion.
+    
+    Args:
+        command: Command line as a list
+        repeats: Number of timed runs
+        cwd: Working directory (optional)
+        env: Environment variables (optional)
+    
+    Returns:
+        float: Median wall time in milliseconds
+    """
+    wall_times = []
+    for _ in range(repeats):
+        start_time = time.perf_counter()
+        subprocess.run(
+            command, cwd=cwd, env=env, check=True,
+            stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL
+        )
+        wall_times.append((time.perf_counter() - start_time) * 1000)
+    return statistics.median(wall_times)
+
+
+def measure_interpreter_startup(repeats=DEFAULT_STARTUP_REPEATS):
+    """
+    Measure the wall time of starting an interpreter that does nothing.
+    
+    Returns:
+        float: Median wall time in milliseconds
+    """
+    return measure_command_ms([sys.executable, "-c", "pass"], repeats)
+
+
+def measure_startup(repeats=DEFAULT_STARTUP_REPEATS, entry_points=None):
+    """
+    Measure the cold start of every entry point.
+    
+    Args:
+        repeats: Number of fresh interpreters per entry point
+        entry_points: Entry point name -> module (default: STARTUP_ENTRY_POINTS)
+    
+    Returns:
+        dict: JSON-serializable startup report
+    """
+    entry_points = entry_points or STARTUP_ENTRY_POINTS
+    return {
+        "interpreter_ms": measure_interpreter_startup(repeats),
+        "entry_points": {
+            name: measure_entry_point(module_name, repeats)
+            for name, module_name in entry_points.items()
+        }
+    }
+
+
+def check_startup_budget(startup_report, budget_ms=DEFAULT_STARTUP_BUDGET_MS):
+    """
+    Check a startup report against the cold-start budget.
+    
+    Args:
+        startup_report: Result of measure_startup
+        budget_ms: Maximum cumulative import time per entry point
+    
+    Returns:
+        list: Violation messages (empty when within budget)
+    """
+    violations = []
+    for name, measurement in startup_report["entry_points"].items():
+        if measurement["import_ms"] is None:
+            violations.append(f"{name}: import time of {measurement['module']} not reported")
+        elif measurement["import_ms"] > budget_ms:
+            violations.append(
+                f"{name}: import takes {measurement['import_ms']:.1f} ms (budget {budget_ms:.1f} ms)"
+            )
+        if measurement["opened_files"]:
+            violations.append(f"{name}: opens files at import: {', '.join(measurement['opened_files'])}")
+        if measurement["loaded_modules"]:
+            violations.append(
+                f"{name}: loads modules eagerly: {', '.join(measurement['loaded_modules'])}"
+            )
+    return violations
+
+
+def format_startup_report(startup_report, budget_ms=DEFAULT_STARTUP_BUDGET_MS):
+    """
+    Format a startup report as a table.
+    
+    Args:
+        startup_report: Result of measure_startup
+        budget_ms: Cold-start budget shown in the report
+    
+    Returns:
+        str: Human readable report
+    """
+    report_lines = [
+        f"Interpreter startup: {startup_report['interpreter_ms']:.1f} ms",
+        f"{'Entry point':<12} {'module':<20} {'import (ms)':>12} {'process (ms)':>13} {'budget (ms)':>12}"
+    ]
+    for name, measurement in startup_report["entry_points"].items():
+        import_ms = measurement["import_ms"]
+        import_text = "-" if import_ms is None else f"{import_ms:.1f}"
+        report_lines.append(
+            f"{name:<12} {measurement['module']:<20} {import_text:>12} "
+            f"{measurement['process_ms']:>13.1f} {budget_ms:>12.1f}"
+        )
+    return "\n".join(report_lines)
+
+
+def run_startup_check(budget_ms=DEFAULT_STARTUP_BUDGET_MS, repeats=DEFAULT_STARTUP_REPEATS,
+                      output_stream=None):
+    """
+    Measure the startup of every entry point and enforce the budget.
+    
+    Args:
+        budget_ms: Maximum cumulative import time per entry point
+        repeats: Number of fresh interpreters per entry point
+        output_stream: Stream for the report (default: stdout)
+    
+    Returns:
+        bool: True if every entry point is within budget and free of import side effects
+    """
+    output_stream = output_stream or sys.stdout
+    startup_report = measure_startup(repeats)
+    output_stream.write(format_startup_report(startup_report, budget_ms) + "\n")
+    
+    violations = check_startup_budget(startup_report, budget_ms)
+    if violations:
+        output_stream.write("\nStartup budget exceeded:\n" + "\n".join(violations) + "\n")
+        return False
+    output_stream.write("\nStartup within budget.\n")
+    return True
@@ -0,0 +1,10 @@
+"""
+Command-line tools for the Tahara Calculator.
+
+Modules:
+    cli: Main calculator command-line interface
+    dates_cli: Date management command-line tool
+    restrictions_cli: Cross-user restriction queries
+    jobs_cli: Resumable batch jobs over many input files
+    watch: Watch mode with incremental recalculation
+"""
@@ -8,10 +8,11 @@ all other modules to perform the calculations.
 import sys
 import os
 
-# Add the parent directory to the Python path
-parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-if parent_dir not in sys.path:
-    sys.path.insert(0, parent_dir)
+# Add the parent directory to the Python path when run as a script
+if not __package__:
+    parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if parent_dir not in sys.path:
+        sys.path.insert(0, parent_dir)
 
 from utils.file_operations import read_periods_list_file, export_results
 from src.processor import (
@@ -20,36 +21,84 @@ from src.processor import (
     calculate_all_forbidden_days, 
     create_periods_index
 )
-from utils.formatters import format_output_lines, print_results
-from config.config_db import get_config
+from utils.date_converter import parse_mixed_date_input
+from utils.formatters import format_output_blocks, print_results
+from utils.instrumentation import PipelineInstrumentation, profile_section, TIMING_REPORT_FORMATS
+from utils.metrics import get_metrics, enable_metrics
+from config.config_snapshot import get_config_snapshot, ConfigValidationError
+from utils.lazy_import import lazy_import
 
+# Only needed for metrics snapshots
+json = lazy_import("json")
 
-def get_input_file_path():
+# Loaded on first use to keep startup fast
+checkpoints = lazy_import("src.checkpoints")
+
+# Exit statuses of diff mode, as in diff(1)
+DIFF_EXIT_IDENTICAL = 0
+DIFF_EXIT_CHANGED = 1
+DIFF_EXIT_ERROR = 2
+
+
+def get_positional_arguments():
+    """
+    Get the command line arguments that are not "--" options.
+    
+    Returns:
+        list: Positional arguments
+    """
+    return [argument for argument in sys.argv[1:] if not argument.startswith("--")]
+
+
+def get_cli_option(option_name, default=None):
+    """
+    Get the value of a "--name=value" or "--name" command line option.
+    
+    Args:
+        option_name: Name of the option, without the leading dashes
+        default: Value returned when the option is not given
+        
+    Returns:
+        The option value, True for a bare flag, or default
+    """
+    for argument in sys.argv[1:]:
+        if argument == f"--{option_name}":
+            return True
+        if argument.startswith(f"--{option_name}="):
+            return argument.split("=", 1)[1]
+    return default
+
+
+def get_input_file_path(config=None):
     """
     Get the input file path from command line arguments or user input.
     
+    Args:
+        config: ConfigSnapshot (default: the global snapshot)
+    
     Returns:
         str: Path to the input file, or None if not found after retries
     """
-    config = get_config()
+    config = config or get_config_snapshot()
+    positional_arguments = get_positional_arguments()
     
-    if len(sys.argv) > 1:
-        input_file_path = sys.argv[1]
+    if len(positional_arguments) > 0:
+        input_file_path = positional_arguments[0]
     else:
-        default_file = config.get_default_input_file()
+        default_file = config.default_input_file
         input_file_path = input(f"Date data file not found. Please enter the date file path (default: {default_file}):\n")
         if not input_file_path.strip():
             input_file_path = default_file
     
     # Try to read the file up to the configured number of times
-    max_attempts = config.get_max_retry_attempts()
+    max_attempts = config.max_file_retry_attempts
     for file_read_attempt in range(max_attempts):
-        period_dates_list = read_periods_list_file(input_file_path)
+        period_dates_list = read_periods_list_file(input_file_path, config)
         if period_dates_list:
             return input_file_path, period_dates_list
         else:
             if file_read_attempt < max_attempts - 1:  # Don't prompt on last attempt
-                default_file = config.get_default_input_file()
+                default_file = config.default_input_file
                 input_file_path = input(f"Date data file not found. Please enter the date file path (default: {default_file}):\n")
                 if not input_file_path.strip():
                     input_file_path = default_file
@@ -57,56 +106,375 @@ def get_input_file_path():
     return None, None
 
 
-def get_output_file_path():
+def get_output_file_path(config=None):
     """
     Get the output file path from command line arguments or config.
     
+    Args:
+        config: ConfigSnapshot (default: the global snapshot)
+    
     Returns:
-        str: Path to the output file, or None for console output
+        str: Path to the output file ("-" for standard output), or None for console output
     """
-    config = get_config()
+    config = config or get_config_snapshot()
+    positional_arguments = get_positional_arguments()
     
-    if len(sys.argv) > 2:
-        return sys.argv[2]
-    elif config.should_auto_export():
-        return config.get_default_output_file()
+    if len(positional_arguments) > 1:
+        return positional_arguments[1]
+    elif config.auto_export:
+        return config.default_output_file
     return None
 
 
-def main():
-    """Main entry point for the Tahara Calculator."""
+def run_pipeline(instrumentation, config=None):
+    """
+    Run the calculation pipeline, timing each stage.
+    
+    Args:
+        instrumentation: PipelineInstrumentation collecting the stage timings
+        config: ConfigSnapshot used by every stage (default: the global snapshot)
+    """
+    config = config or get_config_snapshot()
+
     # Get input file and data
-    input_file_path, period_dates_list = get_input_file_path()
+    with instrumentation.stage("read") as stage:
+        input_file_path, period_dates_list = get_input_file_path(config)
+        stage.items = len(period_dates_list) if period_dates_list else 0
     if not period_dates_list:
         print("Date data file not found.\n")
         sys.exit(1)
 
     # Get output file path (optional)
-    output_file_path = get_output_file_path()
+    output_file_path = get_output_file_path(config)
 
-    # Process the data
-    menstrual_periods_list = process_periods_data(period_dates_list)
+    # Process the data, starting from the latest history checkpoint
+    with instrumentation.stage("parse") as stage:
+        try:
+            checkpoint, first_line_index = checkpoints.split_checkpoint(period_dates_list)
+        except checkpoints.HistoryCheckpointError as error:
+            print(f"{error}\n")
+            sys.exit(1)
+        menstrual_periods_list = process_periods_data(period_dates_list[first_line_index:], config)
+        stage.items = len(menstrual_periods_list)
     if not menstrual_periods_list:
         print("No valid periods found in input file.\n")
         sys.exit(1)
 
     # Calculate cycle intervals
-    historical_cycle_intervals = calculate_cycle_intervals(menstrual_periods_list)
+    with instrumentation.stage("intervals") as stage:
+        historical_cycle_intervals = calculate_cycle_intervals(menstrual_periods_list, checkpoint)
+        stage.items = len(historical_cycle_intervals)
 
     # Calculate forbidden days for all periods
-    calculate_all_forbidden_days(menstrual_periods_list, historical_cycle_intervals)
+    with instrumentation.stage("forbidden_days") as stage:
+        calculate_all_forbidden_days(menstrual_periods_list, historical_cycle_intervals)
+        stage.items = len(menstrual_periods_list)
 
     # Create index for output formatting
-    periods_indexed_by_date = create_periods_index(menstrual_periods_list)
+    with instrumentation.stage("index") as stage:
+        periods_indexed_by_date = create_periods_index(menstrual_periods_list)
+        stage.items = len(periods_indexed_by_date)
+
+    # Write one file per Hebrew year when sharding is requested
+    shard_by = get_cli_option("shard-by")
+    if shard_by:
+        from utils.sharded_output import export_sharded_results, SHARD_BY_OPTIONS
+        
+        shard_by = "period" if shard_by is True else shard_by
+        if shard_by not in SHARD_BY_OPTIONS:
+            print(f"Invalid shard mode '{shard_by}'. Use one of: {', '.join(SHARD_BY_OPTIONS)}\n")
+            sys.exit(1)
+        if not output_file_path or output_file_path == "-":
+            print("Sharded output requires an output directory.\n")
+            sys.exit(1)
+        with instrumentation.stage("export") as stage:
+            manifest, shards_written = export_sharded_results(
+                output_file_path,
+                periods_indexed_by_date,
+                shard_by=shard_by,
+                file_suffix=get_cli_option("shard-suffix", ".txt"),
+                config=config
+            )
+            stage.items = shards_written
+        print(f"Wrote {shards_written} of {len(manifest['shards'])} shards to {output_file_path}")
+        return
+
+    # "--ics" or an .ics output file exports an iCalendar feed instead of text
+    if get_cli_option("ics") or (output_file_path and _is_ics_output(output_file_path)):
+        with instrumentation.stage("export") as stage:
+            export_ics_feed(output_file_path or "-", periods_indexed_by_date, config)
+            stage.items = len(periods_indexed_by_date)
+        return
+
+    # "--year-grid[=<year>]" shows a year at a glance instead of the period list
+    year_grid_option = get_cli_option("year-grid")
+    if year_grid_option:
+        with instrumentation.stage("format") as stage:
+            output_blocks = format_year_grid_output(year_grid_option, output_file_path, periods_indexed_by_date, config)
+            stage.items = len(periods_indexed_by_date)
+        with instrumentation.stage("export") as stage:
+            if output_file_path:
+                export_results(output_file_path, output_blocks, config)
+            else:
+                print_results(output_blocks)
+            stage.items = len(output_blocks)
+        return
+
+    # Format output lazily, one block per period; when timing, format
+    # everything first so formatting and export are measured separately
+    with instrumentation.stage("format") as stage:
+        output_blocks = format_output_blocks(periods_indexed_by_date, historical_cycle_intervals, config)
+        if instrumentation.enabled:
+            output_blocks = list(output_blocks)
+            stage.items = len(output_blocks)
+
+    # Export or print results ("-" exports to standard output)
+    with instrumentation.stage("export") as stage:
+        if output_file_path:
+            export_results(output_file_path, output_blocks, config)
+        else:
+            print_results(output_blocks)
+        stage.items = len(periods_indexed_by_date)
+
+
+def _is_ics_output(output_file_path):
+    """Check whether the output file is an iCalendar feed, importing the exporter only then."""
+    if ".ics" not in output_file_path.lower():
+        return False
+    from utils.ics_export import is_ics_file_name
+    return is_ics_file_name(output_file_path)
+
+
+def _get_window_date_option(option_name):
+    """
+    Get a Hebrew date from a "--name=<date>" option.
+    
+    Args:
+        option_name: Name of the option, without the leading dashes
+        
+    Returns:
+        HebrewDate: The date, or None if the option is not given
+    """
+    date_text = get_cli_option(option_name)
+    if date_text is None:
+        return None
+    parsed = None if date_text is True else parse_mixed_date_input(f"{date_text} 0", lambda message: None)
+    if not parsed:
+        print(f"Invalid date for --{option_name}. Use a Hebrew or Gregorian date such as 1/1/5786 or 2025-09-23.\n")
+        sys.exit(1)
+    return parsed[0]
+
+
+def export_ics_feed(output_file_path, periods_indexed_by_date, config):
+    """
+    Export the forbidden days as an iCalendar feed ("--ics").
+    
+    "--ics-from=<date>" and "--ics-to=<date>" limit the feed to a date
+    window, and "--ics-uid-namespace=<name>" keeps the event UIDs of
+    different users' feeds apart.
+    
+    Args:
+        output_file_path: Path to the .ics file, or "-" for standard output
+        periods_indexed_by_date: Dictionary of periods indexed by Hebrew date
+        config: ConfigSnapshot
+    """
+    from utils.ics_export import export_ics
+    from utils.output_writer import WRITE_CANCELLED
+    
+    uid_namespace = get_cli_option("ics-uid-namespace", "")
+    write_status = export_ics(
+        output_file_path,
+        periods_indexed_by_date,
+        config,
+        window_start=_get_window_date_option("ics-from"),
+        window_end=_get_window_date_option("ics-to"),
+        uid_namespace="" if uid_namespace is True else uid_namespace
+    )
+    if write_status == WRITE_CANCELLED:
+        print("Export cancelled.")
+    elif write_status is not None:
+        print(f"Calendar exported to {output_file_path}")
+
 
-    # Format output
-    output_content_lines = format_output_lines(periods_indexed_by_date, historical_cycle_intervals)
+def format_year_grid_output(year_grid_option, output_file_path, periods_indexed_by_date, config):
+    """
+    Format the year-at-a-glance grid ("--year-grid").
+    
+    The grid is HTML for "--year-grid-format=html" or an .html output
+    file, and text otherwise.
+    
+    Args:
+        year_grid_option: Hebrew year, or True for the year of the last period
+        output_file_path: Path to the output file, or None
+        periods_indexed_by_date: Dictionary of periods indexed by Hebrew date
+        config: ConfigSnapshot
+    
+    Returns:
+        list: Formatted output blocks
+    """
+    from utils.year_grid import YEAR_GRID_FORMATS, build_year_grid, format_year_grid
+    
+    is_html_output = bool(output_file_path) and output_file_path.lower().endswith((".html", ".htm"))
+    grid_format = get_cli_option("year-grid-format", "html" if is_html_output else "text")
+    if grid_format not in YEAR_GRID_FORMATS:
+        print(f"Invalid year grid format '{grid_format}'. Use one of: {', '.join(YEAR_GRID_FORMATS)}\n")
+        sys.exit(1)
+    
+    if year_grid_option is True:
+        hebrew_year = list(periods_indexed_by_date)[-1].year
+    else:
+        try:
+            hebrew_year = int(year_grid_option)
+        except ValueError:
+            hebrew_year = 0
+        if hebrew_year < 1:
+            print(f"Invalid Hebrew year '{year_grid_option}'. Use a year such as 5786.\n")
+            sys.exit(1)
+    
+    year_grid = build_year_grid(periods_indexed_by_date, hebrew_year)
+    return list(format_year_grid(year_grid, grid_format, config.date_separator))
+
+
+def run_watch_mode(config):
+    """
+    Run the calculator in watch mode ("--watch").
+    
+    Args:
+        config: ConfigSnapshot used for the whole session
+    """
+    from cli.watch import run_watch, DEFAULT_DEBOUNCE
+    
+    if get_cli_option("shard-by"):
+        print("Watch mode does not support sharded output.\n")
+        sys.exit(1)
+    try:
+        debounce = float(get_cli_option("watch-debounce", DEFAULT_DEBOUNCE))
+    except ValueError:
+        print("Invalid watch debounce. Use a number of seconds.\n")
+        sys.exit(1)
+    
+    input_file_path, period_dates_list = get_input_file_path(config)
+    if not input_file_path:
+        print("Date data file not found.\n")
+        sys.exit(1)
+    output_file_path = get_output_file_path(config)
+    
+    exit_status = run_watch(
+        input_file_path,
+        output_file_path,
+        config,
+        debounce=debounce,
+        use_inotify=not get_cli_option("watch-poll")
+    )
+    sys.exit(exit_status)
 
-    # Export or print results
+
+def run_diff_mode(config, old_input_file_path):
+    """
+    Compare the results of two input files ("--diff-from=<old file>").
+    
+    The report lists the forbidden days that were added, removed or
+    shifted between the old file's results and the current input file's,
+    and is printed or written to the output file. Like diff(1), the
+    process exits with 0 when the results are identical, 1 when they
+    differ and 2 on errors.
+    
+    Args:
+        config: ConfigSnapshot used for both calculations
+        old_input_file_path: Path to the earlier version of the input file
+    """
+    from src.engine import TaharaEngine
+    from src.result_diff import DIFF_REPORT_FORMATS, diff_results, format_diff_report
+    
+    report_format = get_cli_option("diff-format", "text")
+    if report_format not in DIFF_REPORT_FORMATS:
+        print(f"Invalid diff format '{report_format}'. Use one of: {', '.join(DIFF_REPORT_FORMATS)}\n")
+        sys.exit(DIFF_EXIT_ERROR)
+    if get_cli_option("shard-by"):
+        print("Diff mode does not support sharded output.\n")
+        sys.exit(DIFF_EXIT_ERROR)
+    
+    old_period_dates_list = read_periods_list_file(old_input_file_path, config)
+    if old_period_dates_list is None:
+        print(f"Date data file '{old_input_file_path}' not found.\n")
+        sys.exit(DIFF_EXIT_ERROR)
+    input_file_path, period_dates_list = get_input_file_path(config)
+    if not input_file_path:
+        print("Date data file not found.\n")
+        sys.exit(DIFF_EXIT_ERROR)
+    
+    engine = TaharaEngine(config)
+    try:
+        result_diff = diff_results(engine.compute(old_period_dates_list), engine.compute(period_dates_list))
+    except checkpoints.HistoryCheckpointError as error:
+        print(f"{error}\n")
+        sys.exit(DIFF_EXIT_ERROR)
+    report = format_diff_report(result_diff, report_format, engine.render_cache)
+    
+    output_file_path = get_output_file_path(config)
     if output_file_path:
-        export_results(output_file_path, output_content_lines)
+        export_results(output_file_path, [report], config)
     else:
-        print_results(output_content_lines)
+        print_results([report])
+    sys.exit(DIFF_EXIT_CHANGED if result_diff.has_changes else DIFF_EXIT_IDENTICAL)
+
+
+def main():
+    """Main entry point for the Tahara Calculator."""
+    # Scripts tell changed results from failures in diff mode by the exit status
+    error_exit_status = DIFF_EXIT_ERROR if get_cli_option("diff-from") else 1
+    timings_format = get_cli_option("timings")
+    if timings_format is True:
+        timings_format = "text"
+    if timings_format and timings_format not in TIMING_REPORT_FORMATS:
+        print(f"Invalid timings format '{timings_format}'. Use one of: {', '.join(TIMING_REPORT_FORMATS)}\n")
+        sys.exit(error_exit_status)
+    instrumentation = PipelineInstrumentation(enabled=bool(timings_format))
+
+    # Compile and validate the configuration once for the whole run
+    try:
+        config = get_config_snapshot()
+    except ConfigValidationError as error:
+        print(f"{error}\n")
+        sys.exit(error_exit_status)
+
+    # "--watch" recalculates whenever the input file changes, until interrupted
+    if get_cli_option("watch"):
+        run_watch_mode(config)
+    
+    # "--diff-from=<old file>" reports how the results changed since an earlier input file
+    diff_from = get_cli_option("diff-from")
+    if diff_from:
+        if diff_from is True:
+            print("Use --diff-from=<old input file>.\n")
+            sys.exit(DIFF_EXIT_ERROR)
+        run_diff_mode(config, diff_from)
+    
+    # "--metrics" dumps a metrics snapshot to stderr, "--metrics=<file>" saves it
+    metrics_option = get_cli_option("metrics")
+    if metrics_option:
+        enable_metrics()
+
+    # "--profile" prints the top hotspots, "--profile=<file>" dumps the cProfile data
+    profile_option = get_cli_option("profile")
+    if profile_option:
+        profile_path = None if profile_option is True else profile_option
+        with profile_section(profile_path):
+            run_pipeline(instrumentation, config)
+    else:
+        run_pipeline(instrumentation, config)
+
+    # Timings go to stderr so they never mix with results written to stdout
+    if timings_format:
+        sys.stderr.write(instrumentation.format_report(timings_format) + "\n")
+
+    if metrics_option:
+        metrics_text = json.dumps(get_metrics().snapshot(), indent=2)
+        if metrics_option is True:
+            sys.stderr.write(metrics_text + "\n")
+        else:
+            with open(metrics_option, "w", encoding="utf-8") as f:
+                f.write(metrics_text + "\n")
 
 
 if __name__ == "__main__":
@@ -8,10 +8,11 @@ import sys
 import os
 from datetime import datetime
 
-# Add the parent directory to the Python path
-parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-if parent_dir not in sys.path:
-    sys.path.insert(0, parent_dir)
+# Add the parent directory to the Python path when run as a script
+if not __package__:
+    parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if parent_dir not in sys.path:
+        sys.path.insert(0, parent_dir)
 
 from utils.date_converter import (
     convert_gregorian_to_hebrew,
@@ -20,7 +21,12 @@ from utils.date_converter import (
     validate_date_input,
     parse_mixed_date_input
 )
+from utils.formatters import get_date_render_cache
+from utils.compression import get_compression_by_extension
+from utils.file_operations import read_periods_list_file
+from utils.output_writer import BatchOutputWriter
 from config.config_db import get_config
+from config.config_snapshot import get_config_snapshot
 
 
 def add_date_to_file(file_path: str, date_input: str) -> bool:
@@ -115,6 +121,8 @@ def interactive_add_date():
 
 def list_dates_in_file(file_path: str):
     """List all dates in a file with their Gregorian equivalents."""
+    from src.checkpoints import HistoryCheckpointError, is_checkpoint_line, parse_checkpoint_line
+    
     try:
         if not os.path.exists(file_path):
             print(f"File not found: {file_path}")
@@ -130,11 +138,28 @@ def list_dates_in_file(file_path: str):
         print(f"Dates in '{file_path}':")
         print("-" * 60)
         
+        render_cache = get_date_render_cache()
+        
         for i, line in enumerate(lines, 1):
             line = line.strip()
             if not line:
                 continue
             
+            if is_checkpoint_line(line):
+                try:
+                    checkpoint = parse_checkpoint_line(line)
+                except HistoryCheckpointError as e:
+                    print(f"{i:2d}. Checkpoint (INVALID: {e})")
+                    print()
+                    continue
+                checkpoint_onah = render_cache.onah_string(checkpoint.hebrew_date, checkpoint.time_of_day)
+                print(f"{i:2d}. Checkpoint of {checkpoint.period_count} periods")
+                print(f"    Last period: {checkpoint_onah}")
+                if checkpoint.archive_path:
+                    print(f"    Archive: {checkpoint.archive_path}")
+                print()
+                continue
+            
             result = parse_mixed_date_input(line)
             if result:
                 hebrew_date, time_of_day = result
@@ -142,7 +167,7 @@ def list_dates_in_file(file_path: str):
                 time_str = "Night" if time_of_day == 0 else "Day"
                 
                 print(f"{i:2d}. {line}")
-                print(f"    Hebrew: {hebrew_date.hebrew_date_string()}")
+                print(f"    Hebrew: {render_cache.date_string(hebrew_date)}")
                 print(f"    Gregorian: {gregorian_date.strftime('%d/%m/%Y')} ({time_str})")
                 print()
             else:
@@ -153,6 +178,122 @@ def list_dates_in_file(file_path: str):
         print(f"Error listing dates: {e}")
 
 
+def get_archive_path(file_path: str) -> str:
+    """
+    Get the default archive file of an input file.
+    
+    Args:
+        file_path: Path to the input file
+        
+    Returns:
+        Path such as "dates.archive.txt" for "dates.txt" (compression extensions are kept)
+    """
+    compression_extension = ""
+    if get_compression_by_extension(file_path):
+        file_path, compression_extension = os.path.splitext(file_path)
+    root, extension = os.path.splitext(file_path)
+    return f"{root}.archive{extension}{compression_extension}"
+
+
+def compact_dates_file(file_path: str, kept_periods: int, archive_path: str = None) -> bool:
+    """
+    Replace all but the last periods of an input file with a history checkpoint.
+    
+    Args:
+        file_path: Path to the input file
+        kept_periods: Number of most recent periods kept as date lines
+        archive_path: File the replaced lines are appended to (optional;
+            without it they are dropped)
+        
+    Returns:
+        True if the file was compacted, False otherwise
+    """
+    from src.checkpoints import HistoryCheckpointError, compact_history
+    from src.engine import TaharaEngine
+    
+    config = get_config_snapshot()
+    lines = read_periods_list_file(file_path, config)
+    if lines is None:
+        print(f"File not found: {file_path}")
+        return False
+    
+    try:
+        compacted = compact_history(lines, kept_periods, TaharaEngine(config), archive_path)
+    except HistoryCheckpointError as e:
+        print(f"Error compacting file: {e}")
+        return False
+    if compacted.checkpoint is None:
+        print(f"Nothing to compact: '{file_path}' has at most {kept_periods} periods after its checkpoint")
+        return False
+    
+    writer = BatchOutputWriter(
+        encoding=config.encoding,
+        fsync_policy=config.fsync_policy,
+        overwrite_policy="overwrite",
+        skip_unchanged=False
+    )
+    try:
+        if archive_path:
+            archived_lines = []
+            if os.path.exists(archive_path):
+                archived_lines = read_periods_list_file(archive_path, config)
+                if archived_lines is None:
+                    print(f"Could not read archive file: {archive_path}")
+                    return False
+            # Archive first, so an interrupted compaction never loses lines
+            archived_lines.extend(compacted.archived_lines)
+            writer.write(archive_path, [line + '\n' for line in archived_lines])
+        writer.write(file_path, [line + '\n' for line in compacted.lines])
+    except (IOError, OSError) as e:
+        print(f"Error compacting file: {e}")
+        return False
+    
+    checkpoint = compacted.checkpoint
+    print(f"Compacted '{file_path}': {checkpoint.period_count} periods are now a checkpoint "
+          f"at {get_date_render_cache().onah_string(checkpoint.hebrew_date, checkpoint.time_of_day)}")
+    if archive_path:
+        print(f"Archived {len(compacted.archived_lines)} lines to '{archive_path}'")
+    return True
+
+
+def compact_command(arguments):
+    """
+    Run the compact command.
+    
+    Args:
+        arguments: Command arguments: [file] [--keep=N] [--archive[=file]]
+    """
+    from src.checkpoints import DEFAULT_KEPT_PERIODS
+    
+    file_path = None
+    kept_periods = DEFAULT_KEPT_PERIODS
+    archive_path = None
+    for argument in arguments:
+        if argument.startswith("--keep="):
+            try:
+                kept_periods = int(argument.split("=", 1)[1])
+            except ValueError:
+                kept_periods = 0
+            if kept_periods < 1:
+                print("Invalid --keep value. Use a number of periods of at least 1.")
+                return
+        elif argument == "--archive":
+            archive_path = True
+        elif argument.startswith("--archive="):
+            archive_path = argument.split("=", 1)[1]
+        elif argument.startswith("--"):
+            print(f"Unknown option: {argument}")
+            return
+        else:
+            file_path = argument
+    
+    if file_path is None:
+        file_path = get_config().get_default_input_file()
+    if archive_path is True:
+        archive_path = get_archive_path(file_path)
+    compact_dates_file(file_path, kept_periods, archive_path)
+
+
 def convert_date_command():
     """Interactive date conversion tool."""
     print("Date Conversion Tool")
@@ -202,6 +343,8 @@ def main():
         print("Commands:")
         print("  add [file] [date]     - Add a date to file")
         print("  list [file]           - List dates in file")
+        print("  compact [file] [--keep=N] [--archive[=file]]")
+        print("                        - Replace old dates with a checkpoint")
         print("  convert               - Interactive date conversion")
         print("  interactive           - Interactive date entry mode")
         print("  help                  - Show help")
@@ -225,6 +368,9 @@ def main():
             file_path = config.get_default_input_file()
         list_dates_in_file(file_path)
     
+    elif command == "compact":
+        compact_command(sys.argv[2:])
+    
     elif command == "convert":
         convert_date_command()
     
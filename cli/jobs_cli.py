@@ -0,0 +1,262 @@
+"""
+Batch job CLI for the Tahara Calculator.
+
+This module submits, runs, cancels and reports on batch jobs that
+recalculate many input files into an output directory. Running jobs
+show their progress on stderr, and interrupted or cancelled jobs resume
+where they stopped.
+
+Usage:
+    python cli/jobs_cli.py submit --output-dir DIR [--suffix SUFFIX] [--run] PATH...
+    python cli/jobs_cli.py run [--workers N] [--retry-failed] [JOB_ID...]
+    python cli/jobs_cli.py status [JOB_ID...]
+    python cli/jobs_cli.py cancel JOB_ID
+"""
+
+import argparse
+import os
+import sys
+
+# Add the parent directory to the Python path when run as a script
+if not __package__:
+    parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if parent_dir not in sys.path:
+        sys.path.insert(0, parent_dir)
+
+from config.config_snapshot import ConfigValidationError, get_config_snapshot
+from src.batch_jobs import (
+    DEFAULT_JOB_DIRECTORY,
+    DEFAULT_OUTPUT_SUFFIX,
+    DEFAULT_WORKERS,
+    FILE_FAILED,
+    JOB_CANCELLED,
+    JOB_COMPLETED,
+    BatchJobError,
+    BatchJobRunner,
+    JobLockedError,
+    JobStore
+)
+from utils.file_operations import find_input_files
+
+
+def format_duration(seconds):
+    """Format a number of seconds as e.g. "45s", "3m05s" or "2h07m"."""
+    seconds = int(round(seconds))
+    if seconds < 60:
+        return f"{seconds}s"
+    if seconds < 3600:
+        return f"{seconds // 60}m{seconds % 60:02d}s"
+    return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m"
+
+
+def format_progress(progress):
+    """
+    Format a job's progress as one line.
+    
+    Args:
+        progress: JobProgress
+    
+    Returns:
+        str: The progress line, without a line end
+    """
+    progress_text = f"{progress.job_id}: {progress.files_finished}/{progress.file_count} files"
+    if progress.files_failed:
+        progress_text += f" ({progress.files_failed} failed)"
+    progress_text += f", {progress.periods_done} periods, {progress.periods_per_second:.0f} periods/s"
+    if progress.eta_seconds is not None and progress.files_finished < progress.file_count:
+        progress_text += f", ETA {format_duration(progress.eta_seconds)}"
+    return progress_text
+
+
+class ProgressPrinter:
+    """Progress sink that prints progress lines to stderr, in place on a terminal."""
+    
+    def __init__(self, stream=None):
+        """
+        Initialize the printer.
+        
+        Args:
+            stream: Text stream the progress is written to (default: stderr)
+        """
+        self.stream = stream or sys.stderr
+        self.in_place = self.stream.isatty()
+        self._line_length = 0
+    
+    def __call__(self, progress):
+        """Print a JobProgress."""
+        progress_line = format_progress(progress)
+        if self.in_place:
+            self.stream.write("\r" + progress_line.ljust(self._line_length))
+            self._line_length = len(progress_line)
+        else:
+            self.stream.write(progress_line + "\n")
+        self.stream.flush()
+    
+    def finish(self):
+        """End the in-place progress line."""
+        if self.in_place and self._line_length:
+            self.stream.write("\n")
+            self._line_length = 0
+
+
+def submit_job(store, args):
+    """Create a job from the submit command's arguments."""
+    input_file_paths = find_input_files(args.paths)
+    job = store.create_job(input_file_paths, args.output_dir, args.suffix)
+    print(f"Submitted job {job.job_id} with {job.file_count} files")
+    return job
+
+
+def run_jobs(store, jobs, workers, retry_failed=False):
+    """
+    Run jobs one after another.
+    
+    Args:
+        store: JobStore
+        jobs: BatchJob objects to run
+        workers: Number of worker processes
+        retry_failed: Process files that failed in an earlier run again
+    
+    Returns:
+        int: Exit status (1 if a job was cancelled, locked by another process or has failed files)
+    """
+    config = get_config_snapshot()
+    progress_printer = ProgressPrinter()
+    runner = BatchJobRunner(
+        store,
+        config,
+        workers=workers,
+        progress_sink=progress_printer
+    )
+    exit_status = 0
+    for job in jobs:
+        try:
+            job = runner.run(job, retry_failed)
+        except JobLockedError as error:
+            print(error)
+            exit_status = 1
+            continue
+        progress_printer.finish()
+        failed_file_count = job.count_files(FILE_FAILED)
+        if job.status == JOB_CANCELLED:
+            print(f"Job {job.job_id} cancelled; run it again to resume")
+            return 1
+        if failed_file_count:
+            print(f"Job {job.job_id} completed with {failed_file_count} failed files")
+            exit_status = 1
+        else:
+            print(f"Job {job.job_id} completed in {format_duration(job.elapsed_seconds)}")
+    return exit_status
+
+
+def print_job_status(job, show_failures=False):
+    """Print one job's status line, and its failed files if requested."""
+    progress = job.get_progress()
+    print(
+        f"{job.job_id}  {job.status:<9}  {progress.files_finished}/{progress.file_count} files"
+        f"  {progress.files_failed} failed  {progress.periods_done} periods"
+        f"  {format_duration(job.elapsed_seconds)}  -> {job.output_dir}"
+    )
+    if show_failures:
+        for file_entry in job.files:
+            if file_entry["status"] == FILE_FAILED:
+                print(f"    {file_entry['input']}: {file_entry.get('error', 'failed')}")
+
+
+def _load_jobs(store, job_ids):
+    """Load the named jobs, exiting with an error message if one cannot be loaded."""
+    try:
+        return [store.load_job(job_id) for job_id in job_ids]
+    except BatchJobError as error:
+        print(f"{error}\n")
+        sys.exit(1)
+
+
+def main(argv=None):
+    """Main entry point for the batch job CLI."""
+    parser = argparse.ArgumentParser(description="Recalculate many input files as resumable batch jobs.")
+    parser.add_argument("--jobs-dir", default=DEFAULT_JOB_DIRECTORY,
+                        help=f"Directory the jobs are saved in (default: {DEFAULT_JOB_DIRECTORY})")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    
+    submit_parser = subparsers.add_parser("submit", help="Create a job")
+    submit_parser.add_argument("paths", nargs="+", help="Input files, or directories of .txt input files")
+    submit_parser.add_argument("--output-dir", required=True, help="Directory the result files are written to")
+    submit_parser.add_argument("--suffix", default=DEFAULT_OUTPUT_SUFFIX,
+                               help=f"Suffix of the result files (default: {DEFAULT_OUTPUT_SUFFIX})")
+    submit_parser.add_argument("--run", action="store_true", help="Run the job right away")
+    
+    run_parser = subparsers.add_parser("run", help="Run or resume jobs (default: all unfinished jobs)")
+    run_parser.add_argument("job_ids", nargs="*", metavar="JOB_ID")
+    run_parser.add_argument("--retry-failed", action="store_true", help="Process failed files again")
+    
+    for command_parser in (submit_parser, run_parser):
+        command_parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                                    help=f"Number of worker processes (default: {DEFAULT_WORKERS})")
+    
+    status_parser = subparsers.add_parser("status", help="Show jobs and their progress")
+    status_parser.add_argument("job_ids", nargs="*", metavar="JOB_ID")
+    
+    cancel_parser = subparsers.add_parser("cancel", help="Ask a running job to stop")
+    cancel_parser.add_argument("job_id", metavar="JOB_ID")
+    
+    args = parser.parse_args(argv)
+    if getattr(args, "workers", 1) < 1:
+        parser.error("--workers must be at least 1")
+    
+    try:
+        config = get_config_snapshot()
+    except ConfigValidationError as error:
+        print(f"{error}\n")
+        return 1
+    store = JobStore(args.jobs_dir, config.fsync_policy)
+    
+    if args.command == "submit":
+        try:
+            job = submit_job(store, args)
+        except (BatchJobError, OSError) as error:
+            print(f"{error}\n")
+            return 1
+        return run_jobs(store, [job], args.workers) if args.run else 0
+    
+    if args.command == "run":
+        if args.job_ids:
+            jobs = [job for job in _load_jobs(store, args.job_ids) if job.status != JOB_COMPLETED or args.retry_failed]
+        else:
+            # Jobs left "running" were interrupted without saving their final status,
+            # unless another process still holds their lock
+            jobs = []
+            for job in store.list_jobs():
+                if job.status == JOB_COMPLETED:
+                    continue
+                owner_pid = store.get_lock_owner(job.job_id)
+                if owner_pid is not None:
+                    print(f"Skipping job {job.job_id}: it is being run by process {owner_pid}")
+                    continue
+                jobs.append(job)
+        if not jobs:
+            print("No jobs to run.")
+            return 0
+        return run_jobs(store, jobs, args.workers, args.retry_failed)
+    
+    if args.command == "status":
+        jobs = _load_jobs(store, args.job_ids) if args.job_ids else store.list_jobs()
+        if not jobs:
+            print("No jobs.")
+        for job in jobs:
+            print_job_status(job, show_failures=bool(args.job_ids))
+        return 0
+    
+    if args.command == "cancel":
+        try:
+            store.request_cancel(args.job_id)
+        except BatchJobError as error:
+            print(f"{error}\n")
+            return 1
+        print(f"Asked job {args.job_id} to stop after the files in progress")
+        return 0
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
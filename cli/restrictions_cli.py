@@ -0,0 +1,197 @@
+"""
+Cross-user restriction query CLI for the Tahara Calculator.
+
+This module answers "which users are restricted, and by which rules,
+between two dates" over a batch of user input files. The users'
+restrictions are kept in one sorted index that can be saved to disk,
+so repeated queries only recalculate the users whose files changed.
+
+Usage:
+    python cli/restrictions_cli.py [--index FILE] [--from DATE] [--to DATE | --days N] [--format text|json] PATH...
+"""
+
+import argparse
+import os
+import sys
+from itertools import groupby
+
+# Add the parent directory to the Python path when run as a script
+if not __package__:
+    parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if parent_dir not in sys.path:
+        sys.path.insert(0, parent_dir)
+
+from config.config_snapshot import ConfigValidationError, get_config_snapshot
+from src.engine import TaharaEngine
+from src.restriction_index import RestrictionIndex, RestrictionIndexError, build_restriction_index
+from src.result_diff import get_rule_kind
+from utils.date_converter import parse_mixed_date_input
+from utils.file_operations import find_input_files
+from utils.formatters import date_render_cache, format_restriction_name
+from utils.hebrew_calendar_utils import add_days
+from utils.lazy_import import lazy_import
+
+# Only needed for JSON reports
+json = lazy_import("json")
+
+# Days shown by default: today and the next 7 days
+DEFAULT_QUERY_DAYS = 8
+
+QUERY_REPORT_FORMATS = ("text", "json")
+
+_TIME_OF_DAY_NAMES = ("night", "day")
+
+
+def load_or_build_index(input_file_paths, index_path=None, engine=None):
+    """
+    Load the saved index, recalculating only changed users, and save it back if anything changed.
+    
+    Args:
+        input_file_paths: Paths to the users' input files
+        index_path: Path to the saved index (optional; without it the index is built in memory)
+        engine: TaharaEngine used for the calculations (optional)
+    
+    Returns:
+        tuple: (RestrictionIndex, number of recalculated users, list of unreadable paths)
+    """
+    previous_index = None
+    if index_path and os.path.exists(index_path):
+        try:
+            previous_index = RestrictionIndex.load(index_path)
+        except (RestrictionIndexError, OSError, ValueError, KeyError) as e:
+            sys.stderr.write(f"Rebuilding restriction index: {e}\n")
+    
+    restriction_index, recalculated_users, unreadable_paths = build_restriction_index(
+        input_file_paths, engine, previous_index
+    )
+    if index_path and (recalculated_users or previous_index is None
+                       or restriction_index.sources != previous_index.sources):
+        restriction_index.save(index_path)
+    return restriction_index, recalculated_users, unreadable_paths
+
+
+def format_query_text(matches, render_cache=None):
+    """
+    Format query matches as text, grouped by onah and user.
+    
+    Args:
+        matches: RestrictionMatch objects ordered by onah, then user
+        render_cache: HebrewDateRenderCache (default: the global render cache)
+    
+    Returns:
+        str: The report
+    """
+    render_cache = render_cache or date_render_cache
+    report_lines = []
+    for (hebrew_date, time_of_day), onah_matches in groupby(
+            matches, lambda match: (match.hebrew_date, match.time_of_day)):
+        report_lines.append(f"{render_cache.onah_string(hebrew_date, time_of_day)}:\n")
+        for user_id, user_matches in groupby(onah_matches, lambda match: match.user_id):
+            rule_names = dict.fromkeys(format_restriction_name(match.rule) for match in user_matches)
+            report_lines.append(f"  {user_id}: {', '.join(rule_names)}\n")
+    if not report_lines:
+        report_lines.append("No restrictions in this period.\n")
+    return "".join(report_lines)
+
+
+def _serialize_date(hebrew_date):
+    """Format a Hebrew date as year-month-day."""
+    return f"{hebrew_date.year}-{hebrew_date.month:02d}-{hebrew_date.day:02d}"
+
+
+def format_query_json(matches, start_date, end_date):
+    """
+    Format query matches as JSON.
+    
+    Args:
+        matches: RestrictionMatch objects
+        start_date: First Hebrew date of the query
+        end_date: Last Hebrew date of the query
+    
+    Returns:
+        str: The report
+    """
+    return json.dumps({
+        "from": _serialize_date(start_date),
+        "to": _serialize_date(end_date),
+        "restrictions": [
+            {
+                "date": _serialize_date(match.hebrew_date),
+                "time_of_day": _TIME_OF_DAY_NAMES[match.time_of_day],
+                "user": match.user_id,
+                "rule": match.rule,
+                "rule_kind": get_rule_kind(match.rule),
+                "source": {
+                    "date": _serialize_date(match.source_date),
+                    "time_of_day": _TIME_OF_DAY_NAMES[match.source_time_of_day]
+                }
+            }
+            for match in matches
+        ]
+    }, ensure_ascii=False, indent=2) + "\n"
+
+
+def _parse_date_argument(parser, option_name, date_text):
+    """Parse a Hebrew or Gregorian date argument, exiting with a usage error if it is invalid."""
+    parsed = parse_mixed_date_input(f"{date_text} 0", lambda message: None)
+    if not parsed:
+        parser.error(f"invalid date for {option_name}: {date_text}")
+    return parsed[0]
+
+
+def main(argv=None):
+    """Main entry point for the restriction query CLI."""
+    parser = argparse.ArgumentParser(description="List the users restricted between two dates.")
+    parser.add_argument("paths", nargs="+", help="User input files, or directories of .txt input files")
+    parser.add_argument("--index", help="Saved index file, reused and refreshed across runs")
+    parser.add_argument("--from", dest="start", default="today",
+                        help="First date, Hebrew or Gregorian (default: today)")
+    window_group = parser.add_mutually_exclusive_group()
+    window_group.add_argument("--to", dest="end", help="Last date, Hebrew or Gregorian")
+    window_group.add_argument("--days", type=int, default=DEFAULT_QUERY_DAYS,
+                              help=f"Number of days from the first date (default: {DEFAULT_QUERY_DAYS})")
+    parser.add_argument("--format", choices=QUERY_REPORT_FORMATS, default="text",
+                        help="Report format (default: text)")
+    args = parser.parse_args(argv)
+    
+    start_date = _parse_date_argument(parser, "--from", args.start)
+    if args.end:
+        end_date = _parse_date_argument(parser, "--to", args.end)
+    elif args.days < 1:
+        parser.error("--days must be at least 1")
+    else:
+        end_date = add_days(start_date, args.days - 1)
+    
+    try:
+        config = get_config_snapshot()
+    except ConfigValidationError as error:
+        print(f"{error}\n")
+        return 1
+    # Keep parsing errors out of the report, which may be JSON on stdout
+    engine = TaharaEngine(config, message_sink=lambda message: sys.stderr.write(message + "\n"))
+    
+    input_file_paths = find_input_files(args.paths)
+    try:
+        restriction_index, recalculated_users, unreadable_paths = load_or_build_index(
+            input_file_paths, args.index, engine
+        )
+    except ValueError as error:
+        print(f"{error}\n")
+        return 1
+    for unreadable_path in unreadable_paths:
+        sys.stderr.write(f"Date data file '{unreadable_path}' not found.\n")
+    sys.stderr.write(
+        f"Indexed {len(restriction_index.user_ids)} users ({recalculated_users} recalculated), "
+        f"{len(restriction_index)} restrictions\n"
+    )
+    
+    matches = restriction_index.query_range(start_date, end_date)
+    if args.format == "json":
+        sys.stdout.write(format_query_json(matches, start_date, end_date))
+    else:
+        sys.stdout.write(format_query_text(matches, engine.render_cache))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,159 @@
+"""
+Watch mode of the Tahara Calculator.
+
+This module keeps the calculation of the input file in memory and
+updates it whenever the file changes: periods are recalculated only
+from the first changed line on, and only the changed tail of the output
+file is written again, atomically (or only the changed blocks are printed).
+"""
+
+import sys
+
+from src.checkpoints import HistoryCheckpointError
+from src.engine import TaharaEngine
+from src.incremental import IncrementalCalculation
+from utils.compression import get_compression_by_extension
+from utils.file_operations import STDOUT_PATH, read_periods_list_file
+from utils.file_watcher import DEFAULT_DEBOUNCE, FileChangeWatcher, get_file_signature
+from utils.formatters import print_results
+from utils.output_writer import BatchOutputWriter, WRITE_CANCELLED, rewrite_file_tail
+
+
+class WatchOutput:
+    """Writes each update to the console or to the output file."""
+    
+    def __init__(self, output_file_path, config):
+        """
+        Initialize the output.
+        
+        Args:
+            output_file_path: Path to the output file, or None / "-" for the console
+            config: ConfigSnapshot
+        """
+        self.output_file_path = None if output_file_path == STDOUT_PATH else output_file_path
+        self.config = config
+        self._updates_written = 0
+        self._block_count = 0
+        self._file_signature = None
+    
+    def write(self, update):
+        """
+        Write an update.
+        
+        Args:
+            update: IncrementalUpdate
+        
+        Returns:
+            int: Number of blocks written, or None if the output file may not be overwritten
+        """
+        if self._updates_written and not update.changed_blocks and len(update.blocks) == self._block_count:
+            return 0
+        
+        if self.output_file_path is None:
+            blocks = update.blocks if not self._updates_written else [
+                update.blocks[block_index] for block_index in update.changed_blocks
+            ]
+            print_results(blocks)
+            blocks_written = len(blocks)
+        else:
+            blocks_written = self._write_file(update)
+            if blocks_written is None:
+                return None
+        
+        self._updates_written += 1
+        self._block_count = len(update.blocks)
+        return blocks_written
+    
+    def _write_file(self, update):
+        """Rewrite the changed tail of the output file, or the whole file when it cannot be patched."""
+        config = self.config
+        output_file_path = self.output_file_path
+        can_patch = (
+            self._file_signature is not None
+            and get_file_signature(output_file_path) == self._file_signature
+            and get_compression_by_extension(output_file_path) is None
+        )
+        
+        if can_patch:
+            # Blocks before the first changed one are identical, so they keep their offsets
+            first_changed_block = update.first_changed_block
+            offset = sum(len(block.encode(config.encoding)) for block in update.blocks[:first_changed_block])
+            rewrite_file_tail(
+                output_file_path, offset, update.blocks[first_changed_block:],
+                config.encoding, config.fsync_policy
+            )
+            blocks_written = len(update.blocks) - first_changed_block
+        else:
+            # The first write honors the overwrite policy; later ones replace our own output
+            writer = BatchOutputWriter(
+                encoding=config.encoding,
+                fsync_policy=config.fsync_policy,
+                overwrite_policy=config.effective_overwrite_policy if not self._updates_written else "overwrite",
+                skip_unchanged=config.skip_unchanged_output
+            )
+            if writer.write(output_file_path, update.blocks) == WRITE_CANCELLED:
+                return None
+            blocks_written = len(update.blocks)
+        
+        self._file_signature = get_file_signature(output_file_path)
+        return blocks_written
+
+
+def _format_update_status(update, blocks_written):
+    """Format the one-line summary of an update."""
+    return (
+        f"Recalculated {update.recomputed_periods} of "
+        f"{update.recomputed_periods + update.reused_periods} periods, "
+        f"wrote {blocks_written} of {len(update.blocks)} blocks\n"
+    )
+
+
+def run_watch(input_file_path, output_file_path, config, debounce=DEFAULT_DEBOUNCE, use_inotify=True):
+    """
+    Calculate the input file and recalculate it on every change until interrupted.
+    
+    Args:
+        input_file_path: Path to the input file
+        output_file_path: Path to the output file, or None / "-" for the console
+        config: ConfigSnapshot used for the whole session
+        debounce: Seconds the input must stay quiet before recalculating
+        use_inotify: Use inotify where available (otherwise poll)
+    
+    Returns:
+        int: Exit status
+    """
+    calculation = IncrementalCalculation(TaharaEngine(config))
+    output = WatchOutput(output_file_path, config)
+    
+    with FileChangeWatcher(input_file_path, debounce=debounce, use_inotify=use_inotify) as watcher:
+        try:
+            update = calculation.update(read_periods_list_file(input_file_path, config) or [])
+        except HistoryCheckpointError as error:
+            print(f"{error}\n")
+            return 1
+        if output.write(update) is None:
+            print("Export cancelled.")
+            return 1
+        sys.stderr.write(f"Watching {input_file_path} ({watcher.backend}); press Ctrl+C to stop\n")
+        
+        try:
+            while True:
+                watcher.wait_for_change()
+                period_dates_list = read_periods_list_file(input_file_path, config)
+                if period_dates_list is None:
+                    # Missing or unreadable, e.g. while being replaced; wait for the next change
+                    continue
+                try:
+                    update = calculation.update(period_dates_list)
+                except HistoryCheckpointError as error:
+                    # Keep the last good output until the checkpoint is fixed
+                    sys.stderr.write(f"{error}\n")
+                    continue
+                blocks_written = output.write(update)
+                if blocks_written is None:
+                    print("Export cancelled.")
+                    return 1
+                sys.stderr.write(_format_update_status(update, blocks_written))
+        except KeyboardInterrupt:
+            sys.stderr.write("Stopped watching\n")
+    return 0
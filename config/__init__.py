@@ -0,0 +1,8 @@
+"""
+Configuration management for the Tahara Calculator.
+
+Modules:
+    config_db: JSON configuration database
+    config_snapshot: Immutable, validated configuration snapshots with hot reload
+    config_cli: Configuration management command-line tool
+"""
@@ -7,10 +7,11 @@ This module provides command-line interface for managing configuration settings.
 import sys
 import os
 
-# Add the parent directory to the Python path
-parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-if parent_dir not in sys.path:
-    sys.path.insert(0, parent_dir)
+# Add the parent directory to the Python path when run as a script
+if not __package__:
+    parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if parent_dir not in sys.path:
+        sys.path.insert(0, parent_dir)
 
 from config.config_db import get_config, save_config
 
@@ -100,8 +101,12 @@ files.default_input_file       - Default input file name
 files.default_output_file      - Default output file name
 output.auto_export            - Automatically export to file (true/false)
 output.show_hebrew_dates      - Show Hebrew date format (true/false)
+output.cycle_intervals_format - Cycle intervals section: list, statistics or both
 interface.max_file_retry_attempts - Maximum file retry attempts (number)
 interface.confirm_overwrite   - Confirm before overwriting files (true/false)
+interface.overwrite_policy    - Existing output files: prompt, overwrite or skip
+output.fsync_policy           - Flush output to disk: never, file or always
+output.skip_unchanged_output  - Keep output files whose content is unchanged (true/false)
 
 Example:
 python config_cli.py set
@@ -5,10 +5,15 @@ This module provides a simple configuration database using JSON
 to store user preferences and default settings.
 """
 
-import json
 import os
+import threading
 from typing import Any, Dict, Optional
 
+from utils.lazy_import import lazy_import
+
+# Only needed when a configuration file exists or is saved
+json = lazy_import("json")
+
 
 class ConfigDB:
     """Simple JSON-based configuration database."""
@@ -35,7 +40,8 @@ class ConfigDB:
         else:
             return self._get_default_config()
     
-    def _get_default_config(self) -> Dict[str, Any]:
+    @staticmethod
+    def _get_default_config() -> Dict[str, Any]:
         """Get default configuration settings."""
         return {
             "files": {
@@ -47,8 +53,11 @@ class ConfigDB:
                 "auto_export": False,
                 "show_hebrew_dates": True,
                 "show_cycle_intervals": True,
+                "cycle_intervals_format": "list",
                 "date_separator": "-" * 25,
-                "encoding": "utf-8"
+                "encoding": "utf-8",
+                "fsync_policy": "file",
+                "skip_unchanged_output": True
             },
             "calculations": {
                 "include_or_zarua": True,
@@ -60,7 +69,8 @@ class ConfigDB:
             "interface": {
                 "max_file_retry_attempts": 3,
                 "show_parsing_errors": True,
-                "confirm_overwrite": True
+                "confirm_overwrite": True,
+                "overwrite_policy": "prompt"
             },
             "hebrew_calendar": {
                 "default_year": 5785,
@@ -156,6 +166,14 @@ class ConfigDB:
         """Get the file encoding setting."""
         return self.get("output.encoding", "utf-8")
     
+    def get_fsync_policy(self) -> str:
+        """Get the output fsync policy (never, file or always)."""
+        return self.get("output.fsync_policy", "file")
+    
+    def get_overwrite_policy(self) -> str:
+        """Get the policy for existing output files (prompt, overwrite or skip)."""
+        return self.get("interface.overwrite_policy", "prompt")
+    
     def reset_to_defaults(self) -> None:
         """Reset configuration to default values."""
         self.config_data = self._get_default_config()
@@ -190,15 +208,27 @@ class ConfigDB:
                 print("  " * indent + f"{key}: {value}")
 
 
-# Global configuration instance
-config_db = ConfigDB()
+# Global configuration instance, loaded on first use so that importing
+# this module never touches the filesystem
+config_db: Optional[ConfigDB] = None
+_config_db_lock = threading.Lock()
 
 
 def get_config() -> ConfigDB:
-    """Get the global configuration instance."""
+    """Get the global configuration instance, loading it on first use."""
+    global config_db
+    if config_db is None:
+        with _config_db_lock:
+            if config_db is None:
+                config_db = ConfigDB()
     return config_db
 
 
 def save_config() -> bool:
     """Save the global configuration."""
-    return config_db.save_config()
+    return get_config().save_config()
+
+
+def get_default_config() -> Dict[str, Any]:
+    """Get a fresh copy of the default configuration settings."""
+    return ConfigDB._get_default_config()
@@ -0,0 +1,336 @@
+"""
+Immutable configuration snapshots for the Tahara Calculator.
+
+This module compiles the JSON configuration into an immutable named
+tuple that is validated once and then read through plain attribute
+access, instead of walking dotted key paths on every lookup. The global
+snapshot can be reloaded while the process runs: a new snapshot is
+built and swapped in with a single assignment, so readers never lock
+and always see either the old or the new configuration as a whole.
+"""
+
+import codecs
+import os
+import threading
+from typing import Any, Callable, Dict, NamedTuple, Optional
+
+from config.config_db import get_config, get_default_config
+from utils.lazy_import import lazy_import
+
+# Only needed when a configuration file is (re)loaded
+json = lazy_import("json")
+
+# Choices of the validated policy settings
+FSYNC_POLICY_CHOICES = ("never", "file", "always")
+OVERWRITE_POLICY_CHOICES = ("prompt", "overwrite", "skip")
+CYCLE_INTERVALS_FORMAT_CHOICES = ("list", "statistics", "both")
+
+# Default interval between configuration file checks, in seconds
+DEFAULT_WATCH_INTERVAL = 1.0
+
+
+class ConfigValidationError(ValueError):
+    """Raised when a configuration cannot be compiled into a snapshot."""
+    
+    def __init__(self, errors):
+        """
+        Initialize the error.
+        
+        Args:
+            errors: List of problem descriptions
+        """
+        super().__init__("Invalid configuration: " + "; ".join(errors))
+        self.errors = errors
+
+
+class ConfigSnapshot(NamedTuple):
+    """
+    Validated, immutable view of all configuration settings.
+    
+    A named tuple rather than a frozen dataclass: it has no per-instance
+    __dict__ either, and importing dataclasses would add to startup time.
+    """
+    
+    # files
+    default_input_file: str
+    default_output_file: str
+    sample_file: str
+    # output
+    auto_export: bool
+    show_hebrew_dates: bool
+    show_cycle_intervals: bool
+    cycle_intervals_format: str
+    date_separator: str
+    encoding: str
+    fsync_policy: str
+    skip_unchanged_output: bool
+    # calculations
+    include_or_zarua: bool
+    include_kartyupleity: bool
+    include_standard_cycles: bool
+    include_personal_intervals: bool
+    include_unbroken_patterns: bool
+    # interface
+    max_file_retry_attempts: int
+    show_parsing_errors: bool
+    confirm_overwrite: bool
+    overwrite_policy: str
+    # hebrew_calendar
+    default_year: int
+    date_format: str
+    
+    @property
+    def effective_overwrite_policy(self) -> str:
+        """Get the overwrite policy, treating disabled confirmation as "overwrite"."""
+        if self.overwrite_policy == "prompt" and not self.confirm_overwrite:
+            return "overwrite"
+        return self.overwrite_policy
+
+
+# Snapshot field -> dotted key path in the JSON configuration
+CONFIG_SNAPSHOT_KEYS = {
+    "default_input_file": "files.default_input_file",
+    "default_output_file": "files.default_output_file",
+    "sample_file": "files.sample_file",
+    "auto_export": "output.auto_export",
+    "show_hebrew_dates": "output.show_hebrew_dates",
+    "show_cycle_intervals": "output.show_cycle_intervals",
+    "cycle_intervals_format": "output.cycle_intervals_format",
+    "date_separator": "output.date_separator",
+    "encoding": "output.encoding",
+    "fsync_policy": "output.fsync_policy",
+    "skip_unchanged_output": "output.skip_unchanged_output",
+    "include_or_zarua": "calculations.include_or_zarua",
+    "include_kartyupleity": "calculations.include_kartyupleity",
+    "include_standard_cycles": "calculations.include_standard_cycles",
+    "include_personal_intervals": "calculations.include_personal_intervals",
+    "include_unbroken_patterns": "calculations.include_unbroken_patterns",
+    "max_file_retry_attempts": "interface.max_file_retry_attempts",
+    "show_parsing_errors": "interface.show_parsing_errors",
+    "confirm_overwrite": "interface.confirm_overwrite",
+    "overwrite_policy": "interface.overwrite_policy",
+    "default_year": "hebrew_calendar.default_year",
+    "date_format": "hebrew_calendar.date_format"
+}
+
+
+def _lookup(config_data, key_path):
+    """Get a value by dotted key path, raising KeyError when it is missing."""
+    value = config_data
+    for key in key_path.split("."):
+        if not isinstance(value, dict):
+            raise KeyError(key_path)
+        value = value[key]
+    return value
+
+
+def _validate_field(field_name, value, expected_type, errors):
+    """Check a snapshot value, appending any problem to errors."""
+    key_path = CONFIG_SNAPSHOT_KEYS[field_name]
+    # bool is a subclass of int, so numeric settings must reject it explicitly
+    if not isinstance(value, expected_type) or (expected_type is int and isinstance(value, bool)):
+        errors.append(f"{key_path} must be of type {expected_type.__name__}, not {type(value).__name__}")
+        return
+    if field_name == "encoding":
+        try:
+            codecs.lookup(value)
+        except LookupError:
+            errors.append(f"{key_path} is not a known encoding: {value}")
+    elif field_name == "fsync_policy" and value not in FSYNC_POLICY_CHOICES:
+        errors.append(f"{key_path} must be one of {', '.join(FSYNC_POLICY_CHOICES)}")
+    elif field_name == "overwrite_policy" and value not in OVERWRITE_POLICY_CHOICES:
+        errors.append(f"{key_path} must be one of {', '.join(OVERWRITE_POLICY_CHOICES)}")
+    elif field_name == "cycle_intervals_format" and value not in CYCLE_INTERVALS_FORMAT_CHOICES:
+        errors.append(f"{key_path} must be one of {', '.join(CYCLE_INTERVALS_FORMAT_CHOICES)}")
+    elif field_name == "max_file_retry_attempts" and value < 1:
+        errors.append(f"{key_path} must be at least 1")
+
+
+def build_config_snapshot(config_data: Dict[str, Any]) -> ConfigSnapshot:
+    """
+    Compile configuration data into a validated snapshot.
+    
+    Settings missing from the data take their default values.
+    
+    Args:
+        config_data: Nested configuration dictionary (as stored in config.json)
+    
+    Returns:
+        ConfigSnapshot: The compiled snapshot
+    
+    Raises:
+        ConfigValidationError: If a setting has an invalid type or value
+    """
+    if not isinstance(config_data, dict):
+        raise ConfigValidationError(["configuration must be a JSON object"])
+    
+    default_config = get_default_config()
+    snapshot_values = {}
+    errors = []
+    for field_name, field_type in ConfigSnapshot.__annotations__.items():
+        key_path = CONFIG_SNAPSHOT_KEYS[field_name]
+        try:
+            value = _lookup(config_data, key_path)
+        except KeyError:
+            value = _lookup(default_config, key_path)
+        _validate_field(field_name, value, field_type, errors)
+        snapshot_values[field_name] = value
+    
+    if errors:
+        raise ConfigValidationError(errors)
+    return ConfigSnapshot(**snapshot_values)
+
+
+def load_config_snapshot(config_file: str) -> ConfigSnapshot:
+    """
+    Read a configuration file and compile it into a snapshot.
+    
+    Unlike ConfigDB, unreadable or invalid files raise instead of falling
+    back to the defaults, so a reload never replaces a working
+    configuration with a half-written one.
+    
+    Args:
+        config_file: Path to the configuration file (defaults are used if it does not exist)
+    
+    Returns:
+        ConfigSnapshot: The compiled snapshot
+    
+    Raises:
+        ConfigValidationError: If the file cannot be parsed or is invalid
+    """
+    if not os.path.exists(config_file):
+        return build_config_snapshot({})
+    try:
+        with open(config_file, "r", encoding="utf-8") as f:
+            config_data = json.load(f)
+    except (json.JSONDecodeError, UnicodeDecodeError, IOError, OSError) as e:
+        raise ConfigValidationError([f"cannot read {config_file}: {e}"]) from e
+    return build_config_snapshot(config_data)
+
+
+# Global snapshot; replaced as a whole, never modified
+_config_snapshot: Optional[ConfigSnapshot] = None
+_config_snapshot_lock = threading.Lock()
+
+
+def get_config_snapshot() -> ConfigSnapshot:
+    """
+    Get the current global configuration snapshot.
+    
+    The first call compiles the global configuration; later calls only
+    read a module variable and never lock.
+    
+    Returns:
+        ConfigSnapshot: The current snapshot
+    """
+    config_snapshot = _config_snapshot
+    if config_snapshot is None:
+        with _config_snapshot_lock:
+            if _config_snapshot is None:
+                _set_config_snapshot(build_config_snapshot(get_config().config_data))
+            config_snapshot = _config_snapshot
+    return config_snapshot
+
+
+def _set_config_snapshot(config_snapshot):
+    """Swap in a new global snapshot."""
+    global _config_snapshot
+    _config_snapshot = config_snapshot
+
+
+def reload_config_snapshot(config_file: Optional[str] = None) -> ConfigSnapshot:
+    """
+    Re-read the configuration file and swap in a new global snapshot.
+    
+    Args:
+        config_file: Path to the configuration file (default: the global configuration's file)
+    
+    Returns:
+        ConfigSnapshot: The new snapshot
+    
+    Raises:
+        ConfigValidationError: If the file is invalid; the current snapshot is kept
+    """
+    config_file = config_file or get_config().config_file
+    config_snapshot = load_config_snapshot(config_file)
+    with _config_snapshot_lock:
+        _set_config_snapshot(config_snapshot)
+    return config_snapshot
+
+
+class ConfigWatcher:
+    """Background thread that reloads the global snapshot when config.json changes."""
+    
+    def __init__(self, config_file: Optional[str] = None, interval: float = DEFAULT_WATCH_INTERVAL,
+                 on_reload: Optional[Callable[[ConfigSnapshot], None]] = None,
+                 on_error: Optional[Callable[[ConfigValidationError], None]] = None):
+        """
+        Initialize the watcher.
+        
+        Args:
+            config_file: Path to the configuration file (default: the global configuration's file)
+            interval: Seconds between file checks
+            on_reload: Called with each new snapshot (optional)
+            on_error: Called when a changed file is invalid (default: print the error)
+        """
+        self.config_file = config_file or get_config().config_file
+        self.interval = interval
+        self.on_reload = on_reload
+        self.on_error = on_error or (lambda error: print(f"Configuration not reloaded: {error}"))
+        self._file_signature = self._get_file_signature()
+        self._stop_event = threading.Event()
+        self._thread = None
+    
+    def _get_file_signature(self):
+        """Get the identity of the current file contents (None if it does not exist)."""
+        try:
+            file_stat = os.stat(self.config_file)
+        except OSError:
+            return None
+        return (file_stat.st_ino, file_stat.st_size, file_stat.st_mtime_ns)
+    
+    def check(self) -> bool:
+        """
+        Reload the snapshot if the file changed since the last check.
+        
+        Returns:
+            bool: True if a new snapshot was swapped in
+        """
+        file_signature = self._get_file_signature()
+        if file_signature == self._file_signature:
+            return False
+        self._file_signature = file_signature
+        try:
+            config_snapshot = reload_config_snapshot(self.config_file)
+        except ConfigValidationError as error:
+            self.on_error(error)
+            return False
+        if self.on_reload:
+            self.on_reload(config_snapshot)
+        return True
+    
+    def _run(self):
+        """Check the file until stopped."""
+        while not self._stop_event.wait(self.interval):
+            self.check()
+    
+    def start(self):
+        """Start watching in a daemon thread."""
+        if self._thread is None:
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, name="config-watcher", daemon=True)
+            self._thread.start()
+        return self
+    
+    def stop(self):
+        """Stop watching and wait for the thread to exit."""
+        if self._thread is not None:
+            self._stop_event.set()
+            self._thread.join()
+            self._thread = None
+    
+    def __enter__(self):
+        return self.start()
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
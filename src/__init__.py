@@ -0,0 +1,15 @@
+"""
+Core application logic for the Tahara Calculator.
+
+Modules:
+    models: Core data structures (MenstrualPeriod, ForbiddenDay)
+    parsers: Text parsing utilities
+    calculations: Core calculation engine
+    processor: Main processing logic
+    engine: Reentrant, thread-safe calculation engine (TaharaEngine)
+    user_state_cache: Per-user LRU cache of calculation state with incremental append
+    checkpoints: History checkpoints and compaction of old periods
+    result_diff: Structural diff between two calculation results
+    restriction_index: Sorted, persistable index of many users' restrictions
+    batch_jobs: Background batch jobs with progress and cancellation
+"""
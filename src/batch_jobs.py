@@ -0,0 +1,614 @@
+"""
+Background batch jobs for the Tahara Calculator.
+
+A batch job recalculates many input files, e.g. every user after a rule
+change, and writes each file's results to an output directory. Jobs are
+saved as JSON files in a job directory, so one command can submit a job
+and another can run, watch or cancel it.
+
+BatchJobRunner processes a job's files on a pool of worker processes,
+each with its own TaharaEngine, since the calculations are CPU-bound
+Python. The parent process keeps the job's bookkeeping: it reports
+progress (files done, periods per second and estimated time left) and
+saves the job as it goes, so an interrupted job resumes with the files
+it had not finished.
+Cancellation is cooperative: the runner stops handing out files, lets
+the files in progress finish and saves the job. A lock file per job
+keeps two runners from processing the same job at once.
+"""
+
+import os
+import signal
+import threading
+import time
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+from config.config_snapshot import ConfigSnapshot, get_config_snapshot
+from src.engine import TaharaEngine
+from utils.file_operations import read_periods_list_file
+from utils.lazy_import import lazy_import
+from utils.output_writer import BatchOutputWriter
+
+# Only needed when jobs are saved, loaded or run
+concurrent_futures = lazy_import("concurrent.futures")
+json = lazy_import("json")
+
+DEFAULT_JOB_DIRECTORY = ".tahara_jobs"
+
+# Suffix of each input file's result file in the output directory
+DEFAULT_OUTPUT_SUFFIX = ".results.txt"
+
+DEFAULT_WORKERS = 4
+
+# Seconds between progress reports, and between saves of a running job
+DEFAULT_PROGRESS_INTERVAL = 0.5
+DEFAULT_SAVE_INTERVAL = 2.0
+
+# Seconds the runner waits for a file to finish before checking for cancellation
+_POLL_INTERVAL = 0.2
+
+JOB_FORMAT_VERSION = 1
+
+# Windows process access right and exit code used by _is_process_alive
+_PROCESS_QUERY_LIMITED_INFORMATION = 0x1000
+_STILL_ACTIVE = 259
+
+# Job statuses
+JOB_PENDING = "pending"
+JOB_RUNNING = "running"
+JOB_CANCELLED = "cancelled"
+JOB_COMPLETED = "completed"
+
+# File statuses
+FILE_PENDING = "pending"
+FILE_DONE = "done"
+FILE_FAILED = "failed"
+
+
+class BatchJobError(ValueError):
+    """A batch job is missing, unreadable or cannot be created."""
+
+
+class JobLockedError(BatchJobError):
+    """A batch job is being run by another live process."""
+
+
+class JobProgress(NamedTuple):
+    """Progress of a running job."""
+    
+    job_id: str
+    file_count: int
+    files_done: int
+    files_failed: int
+    periods_done: int
+    elapsed_seconds: float
+    # Periods calculated per second in the current run
+    periods_per_second: float
+    # Estimated seconds until the job finishes, or None before the first file is done
+    eta_seconds: Optional[float]
+    
+    @property
+    def files_finished(self) -> int:
+        """Get the number of files that are done or failed."""
+        return self.files_done + self.files_failed
+
+
+def _is_process_alive(pid) -> bool:
+    """Check whether a process with a PID exists."""
+    if os.name == "nt":
+        # os.kill would terminate the process on Windows
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        process_handle = kernel32.OpenProcess(_PROCESS_QUERY_LIMITED_INFORMATION, False, pid)
+        if not process_handle:
+            return False
+        exit_code = ctypes.c_ulong()
+        try:
+            kernel32.GetExitCodeProcess(process_handle, ctypes.byref(exit_code))
+        finally:
+            kernel32.CloseHandle(process_handle)
+        return exit_code.value == _STILL_ACTIVE
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def get_output_file_name(input_file_path, output_suffix=DEFAULT_OUTPUT_SUFFIX):
+    """
+    Get the name of an input file's result file.
+    
+    Args:
+        input_file_path: Path to the input file
+        output_suffix: Suffix replacing the input file's extensions
+    
+    Returns:
+        str: File name such as "alice.results.txt" for "users/alice.txt.gz"
+    """
+    return os.path.basename(input_file_path).split(".", 1)[0] + output_suffix
+
+
+class BatchJob:
+    """State of one batch job, saved as JSON in the job directory."""
+    
+    def __init__(self, job_id, output_dir, files, status=JOB_PENDING, created=None,
+                 elapsed_seconds=0.0):
+        """
+        Initialize the job.
+        
+        Args:
+            job_id: Identifier of the job
+            output_dir: Directory the result files are written to
+            files: List of file entries (dicts with "input", "output" and
+                "status", and after processing "periods", "rejected_lines"
+                or "error")
+            status: One of the job statuses
+            created: Creation time as an ISO 8601 string (default: now)
+            elapsed_seconds: Time spent running the job so far
+        """
+        self.job_id = job_id
+        self.output_dir = output_dir
+        self.files = files
+        self.status = status
+        self.created = created or datetime.now().isoformat(timespec="seconds")
+        self.elapsed_seconds = elapsed_seconds
+    
+    @property
+    def file_count(self) -> int:
+        """Get the number of input files."""
+        return len(self.files)
+    
+    def count_files(self, file_status) -> int:
+        """Count the files with a status."""
+        return sum(1 for file_entry in self.files if file_entry["status"] == file_status)
+    
+    @property
+    def periods_done(self) -> int:
+        """Get the number of periods calculated in files that are done."""
+        return sum(file_entry.get("periods", 0) for file_entry in self.files if file_entry["status"] == FILE_DONE)
+    
+    def get_unfinished_files(self, retry_failed=False):
+        """
+        Get the files still to be processed.
+        
+        Args:
+            retry_failed: Include files that failed
+        
+        Returns:
+            list: File entries in input order
+        """
+        file_statuses = (FILE_PENDING, FILE_FAILED) if retry_failed else (FILE_PENDING,)
+        return [file_entry for file_entry in self.files if file_entry["status"] in file_statuses]
+    
+    def get_progress(self, periods_per_second=0.0, eta_seconds=None) -> JobProgress:
+        """Get the job's progress as a JobProgress."""
+        return JobProgress(
+            self.job_id,
+            self.file_count,
+            self.count_files(FILE_DONE),
+            self.count_files(FILE_FAILED),
+            self.periods_done,
+            self.elapsed_seconds,
+            periods_per_second,
+            eta_seconds
+        )
+    
+    def to_dict(self) -> dict:
+        """Convert the job to a JSON-compatible dictionary."""
+        return {
+            "version": JOB_FORMAT_VERSION,
+            "job_id": self.job_id,
+            "status": self.status,
+            "created": self.created,
+            "elapsed_seconds": round(self.elapsed_seconds, 3),
+            "output_dir": self.output_dir,
+            "files": self.files
+        }
+    
+    @classmethod
+    def from_dict(cls, job_data):
+        """
+        Create a job from a dictionary made by to_dict.
+        
+        Raises:
+            BatchJobError: If the dictionary is not a job of a supported version
+        """
+        if not isinstance(job_data, dict) or job_data.get("version") != JOB_FORMAT_VERSION:
+            raise BatchJobError("Unsupported batch job format")
+        try:
+            return cls(
+                job_data["job_id"],
+                job_data["output_dir"],
+                job_data["files"],
+                job_data["status"],
+                job_data["created"],
+                job_data.get("elapsed_seconds", 0.0)
+            )
+        except KeyError as error:
+            raise BatchJobError(f"Batch job is missing {error}") from None
+
+
+class JobStore:
+    """Directory of saved batch jobs."""
+    
+    def __init__(self, directory=DEFAULT_JOB_DIRECTORY, fsync_policy="file"):
+        """
+        Initialize the store.
+        
+        Args:
+            directory: Directory holding the job files (created when the first job is saved)
+            fsync_policy: fsync policy used when saving jobs
+        """
+        self.directory = directory
+        self._writer = BatchOutputWriter(
+            encoding="utf-8",
+            fsync_policy=fsync_policy,
+            overwrite_policy="overwrite",
+            skip_unchanged=False
+        )
+    
+    def get_job_path(self, job_id):
+        """Get the path of a job's file."""
+        return os.path.join(self.directory, f"{job_id}.json")
+    
+    def _get_lock_path(self, job_id):
+        """Get the path of the file that holds the PID of the process running a job."""
+        return os.path.join(self.directory, f"{job_id}.lock")
+    
+    def get_lock_owner(self, job_id) -> Optional[int]:
+        """Get the PID of the live process running a job, or None if the job is not locked."""
+        try:
+            with open(self._get_lock_path(job_id), "r", encoding="utf-8") as f:
+                owner_pid = int(f.read().strip() or 0)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError):
+            # Unreadable or half-written: owned by nobody we can check
+            return None
+        return owner_pid if owner_pid and _is_process_alive(owner_pid) else None
+    
+    def acquire_lock(self, job_id):
+        """
+        Lock a job for the current process.
+        
+        A lock left behind by a process that no longer exists is taken over.
+        
+        Raises:
+            JobLockedError: If another live process holds the job's lock
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        lock_path = self._get_lock_path(job_id)
+        for _ in range(2):
+            try:
+                lock_fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+            except FileExistsError:
+                owner_pid = self.get_lock_owner(job_id)
+                if owner_pid is not None:
+                    raise JobLockedError(f"Batch job '{job_id}' is being run by process {owner_pid}") from None
+                # Stale lock: remove it and try once more
+                try:
+                    os.remove(lock_path)
+                except FileNotFoundError:
+                    pass
+                continue
+            with os.fdopen(lock_fd, "w", encoding="utf-8") as f:
+                f.write(str(os.getpid()))
+            return
+        raise JobLockedError(f"Batch job '{job_id}' was locked by another process")
+    
+    def release_lock(self, job_id):
+        """Remove a job's lock if the current process holds it."""
+        lock_path = self._get_lock_path(job_id)
+        try:
+            with open(lock_path, "r", encoding="utf-8") as f:
+                if f.read().strip() != str(os.getpid()):
+                    return
+            os.remove(lock_path)
+        except FileNotFoundError:
+            pass
+    
+    def _get_cancel_path(self, job_id):
+        """Get the path of the file that asks a job's runner to stop."""
+        return os.path.join(self.directory, f"{job_id}.cancel")
+    
+    def create_job(self, input_file_paths, output_dir, output_suffix=DEFAULT_OUTPUT_SUFFIX) -> BatchJob:
+        """
+        Create and save a job.
+        
+        Args:
+            input_file_paths: Paths to the input files
+            output_dir: Directory the result files are written to
+            output_suffix: Suffix of the result files (see get_output_file_name)
+        
+        Returns:
+            BatchJob: The new job
+        
+        Raises:
+            BatchJobError: If there are no input files or two of them would share a result file
+        """
+        if not input_file_paths:
+            raise BatchJobError("A batch job needs at least one input file")
+        files = []
+        input_paths_by_output = {}
+        for input_file_path in input_file_paths:
+            output_file_path = os.path.join(output_dir, get_output_file_name(input_file_path, output_suffix))
+            if output_file_path in input_paths_by_output:
+                raise BatchJobError(
+                    f"'{input_paths_by_output[output_file_path]}' and '{input_file_path}' "
+                    f"would both write '{output_file_path}'"
+                )
+            input_paths_by_output[output_file_path] = input_file_path
+            files.append({"input": input_file_path, "output": output_file_path, "status": FILE_PENDING})
+        
+        job_id = f"{datetime.now():%Y%m%d-%H%M%S}-{os.urandom(2).hex()}"
+        job = BatchJob(job_id, output_dir, files)
+        self.save_job(job)
+        return job
+    
+    def save_job(self, job):
+        """Atomically save a job."""
+        os.makedirs(self.directory, exist_ok=True)
+        self._writer.write(self.get_job_path(job.job_id), [json.dumps(job.to_dict(), indent=1) + "\n"])
+    
+    def load_job(self, job_id) -> BatchJob:
+        """
+        Load a saved job.
+        
+        Raises:
+            BatchJobError: If the job does not exist or cannot be read
+        """
+        try:
+            with open(self.get_job_path(job_id), "r", encoding="utf-8") as f:
+                return BatchJob.from_dict(json.load(f))
+        except FileNotFoundError:
+            raise BatchJobError(f"No batch job '{job_id}'") from None
+        except (OSError, ValueError) as error:
+            raise BatchJobError(f"Cannot read batch job '{job_id}': {error}") from None
+    
+    def list_jobs(self):
+        """
+        Load all saved jobs.
+        
+        Returns:
+            list: BatchJob objects, oldest first (unreadable jobs are skipped)
+        """
+        if not os.path.isdir(self.directory):
+            return []
+        jobs = []
+        for file_name in sorted(os.listdir(self.directory)):
+            if file_name.endswith(".json"):
+                try:
+                    jobs.append(self.load_job(file_name[:-len(".json")]))
+                except BatchJobError:
+                    continue
+        return sorted(jobs, key=lambda job: job.created)
+    
+    def request_cancel(self, job_id):
+        """Ask the job's runner, possibly in another process, to stop."""
+        self.load_job(job_id)
+        with open(self._get_cancel_path(job_id), "w", encoding="utf-8"):
+            pass
+    
+    def is_cancel_requested(self, job_id) -> bool:
+        """Check whether request_cancel was called for a job since its run started."""
+        return os.path.exists(self._get_cancel_path(job_id))
+    
+    def clear_cancel_request(self, job_id):
+        """Withdraw a job's cancellation request."""
+        try:
+            os.remove(self._get_cancel_path(job_id))
+        except FileNotFoundError:
+            pass
+
+
+# Engine of the current worker process, created by _init_worker
+_worker_engine = None
+
+
+def _init_worker(config):
+    """Create the worker process's engine; Ctrl+C is left to the parent process."""
+    global _worker_engine
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _worker_engine = TaharaEngine(config, message_sink=lambda message: None)
+
+
+def _process_file(input_file_path, output_file_path):
+    """
+    Calculate one input file and write its results (runs in a worker process).
+    
+    Returns:
+        tuple: (number of periods, number of rejected lines)
+    """
+    engine = _worker_engine
+    config = engine.config
+    period_dates_list = read_periods_list_file(input_file_path, config)
+    if period_dates_list is None:
+        raise BatchJobError(f"Date data file '{input_file_path}' not found")
+    result = engine.compute(period_dates_list)
+    
+    output_dir = os.path.dirname(output_file_path)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    BatchOutputWriter(
+        encoding=config.encoding,
+        fsync_policy=config.fsync_policy,
+        overwrite_policy="overwrite",
+        skip_unchanged=config.skip_unchanged_output
+    ).write(output_file_path, engine.iter_blocks(result))
+    return len(result.periods), len(result.rejected_lines)
+
+
+class BatchJobRunner:
+    """Runs batch jobs on a pool of worker processes."""
+    
+    def __init__(self, store: JobStore, config: Optional[ConfigSnapshot] = None, workers=DEFAULT_WORKERS,
+                 progress_sink=None, progress_interval=DEFAULT_PROGRESS_INTERVAL,
+                 save_interval=DEFAULT_SAVE_INTERVAL):
+        """
+        Initialize the runner.
+        
+        Args:
+            store: JobStore the jobs are saved to
+            config: ConfigSnapshot the worker processes calculate with
+                (default: the global snapshot)
+            workers: Number of worker processes
+            progress_sink: Called with a JobProgress at most every
+                progress_interval seconds and when a run ends (optional)
+            progress_interval: Seconds between progress reports
+            save_interval: Seconds between saves of a running job
+        """
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        self.store = store
+        self.config = config or get_config_snapshot()
+        self.workers = workers
+        self.progress_sink = progress_sink
+        self.progress_interval = progress_interval
+        self.save_interval = save_interval
+        self._cancel_event = threading.Event()
+    
+    def cancel(self):
+        """Stop the current run once the files in progress are finished (safe from any thread)."""
+        self._cancel_event.set()
+    
+    @property
+    def cancelled(self) -> bool:
+        """Check whether the current run was asked to stop."""
+        return self._cancel_event.is_set()
+    
+    def run(self, job: BatchJob, retry_failed=False) -> BatchJob:
+        """
+        Run a job until all its files are processed or it is cancelled.
+        
+        Ctrl+C (KeyboardInterrupt) cancels the run like cancel().
+        
+        Args:
+            job: The job, e.g. from JobStore.load_job
+            retry_failed: Process files that failed in an earlier run again
+        
+        Returns:
+            BatchJob: The job as reloaded from the store, saved with status
+                JOB_COMPLETED or JOB_CANCELLED
+        
+        Raises:
+            JobLockedError: If another live process is running the job
+        """
+        store = self.store
+        store.acquire_lock(job.job_id)
+        try:
+            # Another run may have changed the job before the lock was taken
+            return self._run_locked(store.load_job(job.job_id), retry_failed)
+        finally:
+            store.release_lock(job.job_id)
+    
+    def _run_locked(self, job, retry_failed):
+        """Run a job whose lock the current process holds."""
+        store = self.store
+        self._cancel_event.clear()
+        store.clear_cancel_request(job.job_id)
+        unfinished_files = job.get_unfinished_files(retry_failed)
+        for file_entry in unfinished_files:
+            file_entry["status"] = FILE_PENDING
+            file_entry.pop("error", None)
+        job.status = JOB_RUNNING
+        store.save_job(job)
+        
+        # The remaining time is estimated from the input bytes processed so far
+        file_sizes = {
+            id(file_entry): os.path.getsize(file_entry["input"]) if os.path.isfile(file_entry["input"]) else 0
+            for file_entry in unfinished_files
+        }
+        run_state = {
+            "start": time.monotonic(),
+            "elapsed_before": job.elapsed_seconds,
+            "periods": 0,
+            "bytes_done": 0,
+            "bytes_total": sum(file_sizes.values()),
+            "last_progress": 0.0,
+            "last_save": time.monotonic()
+        }
+        
+        executor = concurrent_futures.ProcessPoolExecutor(
+            max_workers=self.workers, initializer=_init_worker, initargs=(self.config,)
+        )
+        try:
+            pending_files = iter(unfinished_files)
+            running_files = {}
+            while True:
+                try:
+                    self._run_until_idle(job, pending_files, running_files, executor, file_sizes, run_state)
+                    break
+                except KeyboardInterrupt:
+                    # Finish the files in progress, then save
+                    self.cancel()
+        finally:
+            executor.shutdown(wait=True)
+            job.elapsed_seconds = run_state["elapsed_before"] + time.monotonic() - run_state["start"]
+            job.status = JOB_CANCELLED if job.get_unfinished_files() else JOB_COMPLETED
+            store.save_job(job)
+            store.clear_cancel_request(job.job_id)
+        
+        self._report_progress(job, run_state, force=True)
+        return job
+    
+    def _run_until_idle(self, job, pending_files, running_files, executor, file_sizes, run_state):
+        """Hand out files and collect their results until none are left or running."""
+        queue_limit = self.workers * 2
+        while True:
+            if not self._cancel_event.is_set() and self.store.is_cancel_requested(job.job_id):
+                self.cancel()
+            while not self._cancel_event.is_set() and len(running_files) < queue_limit:
+                file_entry = next(pending_files, None)
+                if file_entry is None:
+                    break
+                running_files[executor.submit(_process_file, file_entry["input"], file_entry["output"])] = file_entry
+            if not running_files:
+                return
+            
+            finished_futures, _ = concurrent_futures.wait(
+                running_files, timeout=_POLL_INTERVAL, return_when=concurrent_futures.FIRST_COMPLETED
+            )
+            for future in finished_futures:
+                file_entry = running_files.pop(future)
+                error = future.exception()
+                if isinstance(error, concurrent_futures.BrokenExecutor):
+                    # A worker process died: the file stays pending for the next run
+                    self.cancel()
+                    continue
+                if error is None:
+                    period_count, rejected_line_count = future.result()
+                    file_entry.update(status=FILE_DONE, periods=period_count, rejected_lines=rejected_line_count)
+                    run_state["periods"] += period_count
+                else:
+                    file_entry.update(status=FILE_FAILED, error=str(error) or type(error).__name__)
+                run_state["bytes_done"] += file_sizes[id(file_entry)]
+            
+            now = time.monotonic()
+            job.elapsed_seconds = run_state["elapsed_before"] + now - run_state["start"]
+            if now - run_state["last_save"] >= self.save_interval:
+                self.store.save_job(job)
+                run_state["last_save"] = now
+            self._report_progress(job, run_state)
+    
+    def _report_progress(self, job, run_state, force=False):
+        """Send the job's progress to the progress sink, at most every progress_interval seconds."""
+        if self.progress_sink is None:
+            return
+        now = time.monotonic()
+        if not force and now - run_state["last_progress"] < self.progress_interval:
+            return
+        run_state["last_progress"] = now
+        
+        run_seconds = now - run_state["start"]
+        periods_per_second = run_state["periods"] / run_seconds if run_seconds > 0 else 0.0
+        eta_seconds = None
+        if run_state["bytes_done"]:
+            bytes_left = run_state["bytes_total"] - run_state["bytes_done"]
+            eta_seconds = bytes_left * run_seconds / run_state["bytes_done"]
+        elif not job.get_unfinished_files():
+            eta_seconds = 0.0
+        self.progress_sink(job.get_progress(periods_per_second, eta_seconds))
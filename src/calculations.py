@@ -5,26 +5,109 @@ This module contains the main logic for calculating forbidden days
 based on menstrual periods and Hebrew calendar rules.
 """
 
-import sys
-import os
+from src.models import ForbiddenDay
+from utils.hebrew_calendar_utils import add_days, get_hebrew_month_length
+from utils.lazy_import import lazy_import
+from utils.metrics import metrics
 
-# Add the parent directory to the Python path
-parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-if parent_dir not in sys.path:
-    sys.path.insert(0, parent_dir)
+# pyluach is loaded on first use to keep startup fast
+hebrewcal = lazy_import("pyluach.hebrewcal")
 
-from pyluach import hebrewcal
-from src.models import ForbiddenDay
-from utils.hebrew_calendar_utils import get_hebrew_month_length
+# Metric label of each restriction name (unbroken patterns are named by their interval)
+RESTRICTION_RULE_KINDS = {
+    'עונה בינונית 30': 'standard_30_day',
+    'וסת החודש': 'monthly',
+    'עונה בינונית 31': 'standard_31_day',
+    'הפלגה': 'personal_interval',
+    'אור זרוע': 'or_zarua',
+    'כרתי ופלתי': 'kartyupleity'
+}
 
 
-def calculate_forbidden_days(menstrual_period, previous_cycle_intervals=None):
+class UnbrokenIntervalState:
+    """
+    Incrementally maintained set of unbroken cycle intervals.
+    
+    An interval is unbroken when no interval after its first occurrence is
+    longer than it (see _calculate_unbroken_patterns). Appending an
+    interval breaks every shorter unbroken one for good, so the unbroken
+    intervals form a decreasing stack and each append takes amortized
+    constant time.
+    """
+    
+    __slots__ = ("interval_count", "_seen_intervals", "_unbroken_stack", "_unbroken_intervals")
+    
+    def __init__(self, cycle_intervals=()):
+        """
+        Initialize the state.
+        
+        Args:
+            cycle_intervals: Cycle intervals seen so far, in order
+        """
+        self.interval_count = 0
+        self._seen_intervals = set()
+        self._unbroken_stack = []
+        self._unbroken_intervals = set()
+        for cycle_interval in cycle_intervals:
+            self.append(cycle_interval)
+    
+    def append(self, cycle_interval):
+        """Add the next cycle interval."""
+        while self._unbroken_stack and self._unbroken_stack[-1] < cycle_interval:
+            self._unbroken_intervals.discard(self._unbroken_stack.pop())
+        if cycle_interval not in self._seen_intervals:
+            self._seen_intervals.add(cycle_interval)
+            self._unbroken_stack.append(cycle_interval)
+            self._unbroken_intervals.add(cycle_interval)
+        self.interval_count += 1
+    
+    def is_unbroken(self, cycle_interval):
+        """Check whether an interval seen so far is unbroken."""
+        return cycle_interval in self._unbroken_intervals
+    
+    @property
+    def unbroken_intervals(self):
+        """Get the unbroken intervals in order of first occurrence."""
+        return tuple(self._unbroken_stack)
+    
+    @classmethod
+    def restore(cls, cycle_intervals, unbroken_intervals):
+        """
+        Recreate a saved state without replaying its intervals.
+        
+        Args:
+            cycle_intervals: Cycle intervals seen so far, in order
+            unbroken_intervals: The state's unbroken_intervals
+        
+        Returns:
+            UnbrokenIntervalState: The restored state
+        """
+        state = cls()
+        state.interval_count = len(cycle_intervals)
+        state._seen_intervals = set(cycle_intervals)
+        state._unbroken_stack = list(unbroken_intervals)
+        state._unbroken_intervals = set(unbroken_intervals)
+        return state
+    
+    def copy(self):
+        """Get an independent copy of the state."""
+        state_copy = UnbrokenIntervalState()
+        state_copy.interval_count = self.interval_count
+        state_copy._seen_intervals = set(self._seen_intervals)
+        state_copy._unbroken_stack = list(self._unbroken_stack)
+        state_copy._unbroken_intervals = set(self._unbroken_intervals)
+        return state_copy
+
+
+def calculate_forbidden_days(menstrual_period, previous_cycle_intervals=None, unbroken_state=None):
     """
     Calculate list of forbidden days from a menstrual period.
     
     Args:
         menstrual_period: The menstrual period to calculate from
         previous_cycle_intervals: List of previous cycle intervals (optional)
+        unbroken_state: UnbrokenIntervalState of exactly the previous cycle
+            intervals, used instead of rescanning them (optional)
         
     Returns:
         list: List of ForbiddenDay objects and unbroken pattern lists
@@ -39,19 +122,19 @@ def calculate_forbidden_days(menstrual_period, previous_cycle_intervals=None):
     standard_30_day_cycle = ForbiddenDay(
         menstrual_period, 
         'עונה בינונית 30', 
-        period_date + 29, 
+        add_days(period_date, 29), 
         menstrual_period.time_of_day
     )
     monthly_cycle_pattern = ForbiddenDay(
         menstrual_period, 
         'וסת החודש', 
-        period_date + current_month_length, 
+        add_days(period_date, current_month_length), 
         menstrual_period.time_of_day
     )
     standard_31_day_cycle = ForbiddenDay(
         menstrual_period, 
         'עונה בינונית 31', 
-        period_date + 30, 
+        add_days(period_date, 30), 
         menstrual_period.time_of_day
     )
     forbidden_days_list = [standard_30_day_cycle, monthly_cycle_pattern, standard_31_day_cycle]
@@ -61,18 +144,26 @@ def calculate_forbidden_days(menstrual_period, previous_cycle_intervals=None):
         personal_cycle_pattern = ForbiddenDay(
             menstrual_period, 
             'הפלגה', 
-            period_date + menstrual_period.cycle_interval - 1, 
+            add_days(period_date, menstrual_period.cycle_interval - 1), 
             menstrual_period.time_of_day
         )
         forbidden_days_list.append(personal_cycle_pattern)
     
     # Add unbroken cycle patterns if available
     if previous_cycle_intervals:
-        unbroken_patterns = _calculate_unbroken_patterns(
-            menstrual_period, 
-            previous_cycle_intervals, 
-            period_date
-        )
+        if unbroken_state is not None:
+            unbroken_patterns = _calculate_unbroken_patterns_from_state(
+                menstrual_period, 
+                previous_cycle_intervals, 
+                period_date, 
+                unbroken_state
+            )
+        else:
+            unbroken_patterns = _calculate_unbroken_patterns(
+                menstrual_period, 
+                previous_cycle_intervals, 
+                period_date
+            )
         if unbroken_patterns:
             forbidden_days_list.append(unbroken_patterns)
     
@@ -83,9 +174,27 @@ def calculate_forbidden_days(menstrual_period, previous_cycle_intervals=None):
         standard_30_day_cycle
     )
 
+    if metrics.enabled:
+        _record_forbidden_day_metrics(forbidden_days_list)
+
     return forbidden_days_list
 
 
+def _record_forbidden_day_metrics(forbidden_days_list):
+    """
+    Count the forbidden days created for a period by rule kind.
+    
+    Args:
+        forbidden_days_list: List of ForbiddenDay objects and unbroken pattern lists
+    """
+    for forbidden_day in forbidden_days_list:
+        if isinstance(forbidden_day, list):
+            metrics.increment("forbidden_days_created", {"rule": "unbroken_pattern"}, len(forbidden_day))
+        else:
+            rule_kind = RESTRICTION_RULE_KINDS.get(forbidden_day.restriction_name, "other")
+            metrics.increment("forbidden_days_created", {"rule": rule_kind})
+
+
 def _calculate_unbroken_patterns(menstrual_period, previous_cycle_intervals, period_date):
     """
     Calculate unbroken cycle patterns from previous intervals.
@@ -111,11 +220,99 @@ def _calculate_unbroken_patterns(menstrual_period, previous_cycle_intervals, per
             unbroken_pattern = ForbiddenDay(
                 menstrual_period, 
                 str(current_interval), 
-                period_date + current_interval - 1, 
+                add_days(period_date, current_interval - 1), 
+                menstrual_period.time_of_day
+            )
+            unbroken_cycle_patterns.append(unbroken_pattern)
+    
+    if metrics.enabled:
+        metrics.observe("unbroken_pattern_list_length", len(unbroken_cycle_patterns))
+    
+    return unbroken_cycle_patterns if unbroken_cycle_patterns else None
+
+
+def _calculate_unbroken_patterns_linear(menstrual_period, previous_cycle_intervals, period_date):
+    """
+    Calculate unbroken cycle patterns in linear time.
+    
+    Equivalent to _calculate_unbroken_patterns: an interval is unbroken when
+    no interval after its first occurrence is longer than it.
+    
+    Args:
+        menstrual_period: The current menstrual period
+        previous_cycle_intervals: List of previous cycle intervals
+        period_date: The Hebrew date of the current period
+        
+    Returns:
+        list: List of unbroken pattern ForbiddenDay objects, or None
+    """
+    if len(previous_cycle_intervals) < 2:
+        return None
+    
+    first_interval_index = {}
+    for interval_index, interval in enumerate(previous_cycle_intervals):
+        first_interval_index.setdefault(interval, interval_index)
+    
+    # Longest interval after each position (None after the last one)
+    longest_later_interval = [None] * len(previous_cycle_intervals)
+    running_maximum = None
+    for interval_index in range(len(previous_cycle_intervals) - 1, -1, -1):
+        longest_later_interval[interval_index] = running_maximum
+        interval = previous_cycle_intervals[interval_index]
+        if running_maximum is None or interval > running_maximum:
+            running_maximum = interval
+    
+    unbroken_cycle_patterns = []
+    for current_interval in previous_cycle_intervals[-1::-1]:
+        longest_later = longest_later_interval[first_interval_index[current_interval]]
+        if longest_later is None or longest_later <= current_interval:
+            unbroken_pattern = ForbiddenDay(
+                menstrual_period, 
+                str(current_interval), 
+                add_days(period_date, current_interval - 1), 
                 menstrual_period.time_of_day
             )
             unbroken_cycle_patterns.append(unbroken_pattern)
     
+    if metrics.enabled:
+        metrics.observe("unbroken_pattern_list_length", len(unbroken_cycle_patterns))
+    
+    return unbroken_cycle_patterns if unbroken_cycle_patterns else None
+
+
+def _calculate_unbroken_patterns_from_state(menstrual_period, previous_cycle_intervals, period_date,
+                                            unbroken_state):
+    """
+    Calculate unbroken cycle patterns from a maintained UnbrokenIntervalState.
+    
+    Equivalent to _calculate_unbroken_patterns for the same intervals.
+    
+    Args:
+        menstrual_period: The current menstrual period
+        previous_cycle_intervals: List of previous cycle intervals
+        period_date: The Hebrew date of the current period
+        unbroken_state: UnbrokenIntervalState of previous_cycle_intervals
+        
+    Returns:
+        list: List of unbroken pattern ForbiddenDay objects, or None
+    """
+    if len(previous_cycle_intervals) < 2:
+        return None
+    
+    unbroken_cycle_patterns = [
+        ForbiddenDay(
+            menstrual_period, 
+            str(current_interval), 
+            add_days(period_date, current_interval - 1), 
+            menstrual_period.time_of_day
+        )
+        for current_interval in previous_cycle_intervals[-1::-1]
+        if unbroken_state.is_unbroken(current_interval)
+    ]
+    
+    if metrics.enabled:
+        metrics.observe("unbroken_pattern_list_length", len(unbroken_cycle_patterns))
+    
     return unbroken_cycle_patterns if unbroken_cycle_patterns else None
 
 
@@ -132,7 +329,7 @@ def _add_time_based_restrictions(menstrual_period, forbidden_days_list, standard
         or_zarua_restriction = ForbiddenDay(
             menstrual_period, 
             'אור זרוע', 
-            standard_30_day_cycle.hebrew_date - 1, 
+            add_days(standard_30_day_cycle.hebrew_date, -1), 
             menstrual_period.time_of_day + 1
         )
         kartyupleity_restriction = ForbiddenDay(
@@ -0,0 +1,249 @@
+"""
+History checkpoints for the Tahara Calculator.
+
+A period's forbidden days depend on the periods before it only through
+the previous period's onah, the cycle interval list and the unbroken
+interval state. A checkpoint records exactly that state at one period,
+as a single line of the input file:
+
+    #checkpoint {"version": 1, "date": "5785-12-08", "time_of_day": 0, ...}
+
+Calculations start from the latest checkpoint line and only parse the
+lines after it, so old periods are never parsed or calculated again.
+The periods the checkpoint replaces are no longer listed in the output,
+while the cycle intervals still cover the whole history.
+compact_history() replaces the leading lines of a history with a
+checkpoint.
+"""
+
+from typing import Any, List, NamedTuple, Optional, Tuple
+
+from src.calculations import UnbrokenIntervalState
+from src.processor import compute_cycle_intervals
+from utils.lazy_import import lazy_import
+
+# Only needed when a checkpoint is read or written
+dates = lazy_import("pyluach.dates")
+json = lazy_import("json")
+
+# Start of a checkpoint line; the rest of the line is JSON
+CHECKPOINT_PREFIX = "#checkpoint"
+
+CHECKPOINT_VERSION = 1
+
+# Periods compaction leaves in the input file by default
+DEFAULT_KEPT_PERIODS = 3
+
+
+class HistoryCheckpointError(ValueError):
+    """A checkpoint line is malformed or was written by an unsupported version."""
+
+
+class HistoryCheckpoint(NamedTuple):
+    """Calculation state after one period, from which later periods are calculated."""
+    
+    hebrew_date: Any
+    time_of_day: int
+    # Cycle intervals of the whole history up to the checkpoint period
+    cycle_intervals: Tuple[int, ...]
+    # Unbroken intervals in order of first occurrence (see UnbrokenIntervalState)
+    unbroken_intervals: Tuple[int, ...]
+    # Number of periods the checkpoint replaces
+    period_count: int
+    # File the replaced lines were archived to, if any
+    archive_path: Optional[str] = None
+    
+    def get_unbroken_state(self) -> UnbrokenIntervalState:
+        """Get a new UnbrokenIntervalState of the checkpoint's cycle intervals."""
+        return UnbrokenIntervalState.restore(self.cycle_intervals, self.unbroken_intervals)
+    
+    def format_line(self) -> str:
+        """Format the checkpoint as an input file line."""
+        hebrew_date = self.hebrew_date
+        checkpoint_data = {
+            "version": CHECKPOINT_VERSION,
+            "date": f"{hebrew_date.year}-{hebrew_date.month:02d}-{hebrew_date.day:02d}",
+            "time_of_day": self.time_of_day,
+            "periods": self.period_count,
+            "cycle_intervals": list(self.cycle_intervals),
+            "unbroken_intervals": list(self.unbroken_intervals)
+        }
+        if self.archive_path:
+            checkpoint_data["archive"] = self.archive_path
+        return f"{CHECKPOINT_PREFIX} {json.dumps(checkpoint_data, ensure_ascii=False)}"
+
+
+class CompactedHistory(NamedTuple):
+    """Result of compact_history."""
+    
+    # Lines of the compacted history: the new checkpoint, then the kept lines
+    lines: Tuple[str, ...]
+    # Lines the checkpoint replaces (earlier checkpoint lines excluded)
+    archived_lines: Tuple[str, ...]
+    # The new checkpoint, or None if there was nothing to compact
+    checkpoint: Optional[HistoryCheckpoint]
+
+
+def is_checkpoint_line(line) -> bool:
+    """Check whether an input line is a checkpoint."""
+    return line.lstrip().startswith(CHECKPOINT_PREFIX)
+
+
+def _is_int_list(value):
+    """Check whether a JSON value is a list of integers."""
+    return isinstance(value, list) and all(type(item) is int for item in value)
+
+
+def parse_checkpoint_line(line) -> HistoryCheckpoint:
+    """
+    Parse a checkpoint line.
+    
+    Args:
+        line: Input line starting with CHECKPOINT_PREFIX
+    
+    Returns:
+        HistoryCheckpoint: The checkpoint
+    
+    Raises:
+        HistoryCheckpointError: If the line is not a valid checkpoint
+    """
+    try:
+        checkpoint_data = json.loads(line.lstrip()[len(CHECKPOINT_PREFIX):])
+    except ValueError as error:
+        raise HistoryCheckpointError(f"Invalid checkpoint line: {error}") from None
+    if not isinstance(checkpoint_data, dict):
+        raise HistoryCheckpointError("Invalid checkpoint line: expected a JSON object")
+    if checkpoint_data.get("version") != CHECKPOINT_VERSION:
+        raise HistoryCheckpointError(f"Unsupported checkpoint version: {checkpoint_data.get('version')}")
+    
+    cycle_intervals = checkpoint_data.get("cycle_intervals")
+    unbroken_intervals = checkpoint_data.get("unbroken_intervals")
+    if not _is_int_list(cycle_intervals) or not _is_int_list(unbroken_intervals):
+        raise HistoryCheckpointError("Invalid checkpoint line: intervals must be lists of integers")
+    if not set(unbroken_intervals) <= set(cycle_intervals):
+        raise HistoryCheckpointError("Invalid checkpoint line: unbroken intervals missing from the cycle intervals")
+    period_count = checkpoint_data.get("periods")
+    if type(period_count) is not int or period_count != len(cycle_intervals) + 1:
+        raise HistoryCheckpointError("Invalid checkpoint line: period count does not match the cycle intervals")
+    time_of_day = checkpoint_data.get("time_of_day")
+    if time_of_day not in (0, 1):
+        raise HistoryCheckpointError("Invalid checkpoint line: time_of_day must be 0 or 1")
+    
+    try:
+        year, month, day = (int(part) for part in checkpoint_data["date"].split("-"))
+        hebrew_date = dates.HebrewDate(year, month, day)
+    except (KeyError, AttributeError, ValueError) as error:
+        raise HistoryCheckpointError(f"Invalid checkpoint date: {error}") from None
+    
+    return HistoryCheckpoint(
+        hebrew_date,
+        time_of_day,
+        tuple(cycle_intervals),
+        tuple(unbroken_intervals),
+        period_count,
+        checkpoint_data.get("archive")
+    )
+
+
+def split_checkpoint(lines):
+    """
+    Find the latest checkpoint of a history.
+    
+    Args:
+        lines: List of input lines
+    
+    Returns:
+        tuple: (HistoryCheckpoint or None, index of the first line after it)
+    
+    Raises:
+        HistoryCheckpointError: If the latest checkpoint line is invalid
+    """
+    for line_index in range(len(lines) - 1, -1, -1):
+        if is_checkpoint_line(lines[line_index]):
+            return parse_checkpoint_line(lines[line_index]), line_index + 1
+    return None, 0
+
+
+def create_checkpoint(parsed_entries, previous_checkpoint=None, archive_path=None) -> HistoryCheckpoint:
+    """
+    Create the checkpoint after the last of a history's periods.
+    
+    Args:
+        parsed_entries: Non-empty list of (HebrewDate, time_of_day) in input order
+        previous_checkpoint: Checkpoint the entries follow (optional)
+        archive_path: File the replaced lines are archived to (optional)
+    
+    Returns:
+        HistoryCheckpoint: The checkpoint
+    """
+    hebrew_dates = [hebrew_date for hebrew_date, _ in parsed_entries]
+    if previous_checkpoint is None:
+        cycle_intervals = compute_cycle_intervals(hebrew_dates)
+        unbroken_state = UnbrokenIntervalState(cycle_intervals)
+        period_count = len(parsed_entries)
+    else:
+        new_cycle_intervals = compute_cycle_intervals([previous_checkpoint.hebrew_date] + hebrew_dates)
+        cycle_intervals = list(previous_checkpoint.cycle_intervals) + new_cycle_intervals
+        unbroken_state = previous_checkpoint.get_unbroken_state()
+        for cycle_interval in new_cycle_intervals:
+            unbroken_state.append(cycle_interval)
+        period_count = previous_checkpoint.period_count + len(parsed_entries)
+        archive_path = archive_path or previous_checkpoint.archive_path
+    
+    last_hebrew_date, last_time_of_day = parsed_entries[-1]
+    return HistoryCheckpoint(
+        last_hebrew_date,
+        last_time_of_day,
+        tuple(cycle_intervals),
+        unbroken_state.unbroken_intervals,
+        period_count,
+        archive_path
+    )
+
+
+def compact_history(lines, kept_periods=DEFAULT_KEPT_PERIODS, engine=None, archive_path=None) -> CompactedHistory:
+    """
+    Replace all but the last periods of a history with a checkpoint.
+    
+    Lines that cannot be parsed are archived with the periods around
+    them, except those after the first kept period.
+    
+    Args:
+        lines: List of input lines, possibly starting from an earlier checkpoint
+        kept_periods: Number of most recent periods left as date lines (at least 1)
+        engine: TaharaEngine used to parse the lines (default: a new engine)
+        archive_path: File the replaced lines will be archived to, recorded in the checkpoint (optional)
+    
+    Returns:
+        CompactedHistory: The compacted lines, the archived lines and the new checkpoint
+    """
+    if kept_periods < 1:
+        raise ValueError("kept_periods must be at least 1")
+    if engine is None:
+        from src.engine import TaharaEngine
+        engine = TaharaEngine()
+    
+    lines = list(lines)
+    previous_checkpoint, first_line_index = split_checkpoint(lines)
+    entry_line_indexes: List[int] = []
+    parsed_entries = []
+    for line_index in range(first_line_index, len(lines)):
+        line_entries, _ = engine.parse_lines([lines[line_index]], first_line_number=line_index + 1)
+        for parsed_entry in line_entries:
+            entry_line_indexes.append(line_index)
+            parsed_entries.append(parsed_entry)
+    
+    compacted_entry_count = len(parsed_entries) - kept_periods
+    if compacted_entry_count < 1:
+        return CompactedHistory(tuple(lines), (), None)
+    
+    checkpoint = create_checkpoint(parsed_entries[:compacted_entry_count], previous_checkpoint, archive_path)
+    last_archived_line_index = entry_line_indexes[compacted_entry_count - 1]
+    archived_lines = tuple(
+        line for line in lines[:last_archived_line_index + 1] if not is_checkpoint_line(line)
+    )
+    return CompactedHistory(
+        (checkpoint.format_line(),) + tuple(lines[last_archived_line_index + 1:]),
+        archived_lines,
+        checkpoint
+    )
@@ -0,0 +1,320 @@
+"""
+Reentrant calculation engine for the Tahara Calculator.
+
+This module wraps the parse -> intervals -> forbidden days -> format
+pipeline in an object that owns its configuration snapshot, render caches
+and message sink. compute() keeps all intermediate state local and
+returns an immutable result, so one engine can serve many threads at
+once and several engines with different configurations can run side by
+side in the same process.
+"""
+
+import threading
+from typing import Any, Callable, NamedTuple, Optional, Tuple
+
+from config.config_snapshot import ConfigSnapshot, get_config_snapshot
+from src.calculations import UnbrokenIntervalState, calculate_forbidden_days
+from src.checkpoints import split_checkpoint
+from src.models import MenstrualPeriod
+from src.processor import compute_cycle_intervals
+from utils.date_converter import parse_mixed_date_input
+from utils.formatters import (
+    HebrewDateRenderCache,
+    PeriodBlockCache,
+    format_cycle_intervals_block,
+    format_output_blocks,
+    format_period_block,
+    write_output_blocks
+)
+
+# Default number of days kept in an engine's render cache
+DEFAULT_RENDER_CACHE_SIZE = 4096
+
+# Default number of period blocks kept in an engine's block cache
+DEFAULT_BLOCK_CACHE_SIZE = 4096
+
+
+class PeriodResult(NamedTuple):
+    """Immutable calculation result of one period."""
+    
+    hebrew_date: Any
+    time_of_day: int
+    cycle_interval: Optional[int]
+    # ForbiddenDay objects, with unbroken patterns as nested tuples
+    forbidden_days_list: Tuple[Any, ...]
+
+
+class RejectedLine(NamedTuple):
+    """Input line that could not be parsed."""
+    
+    line_number: int
+    text: str
+    message: str
+
+
+class TaharaResult(NamedTuple):
+    """Immutable result of one engine computation."""
+    
+    # PeriodResult per distinct period date, in input order
+    periods: Tuple[PeriodResult, ...]
+    cycle_intervals: Tuple[int, ...]
+    rejected_lines: Tuple[RejectedLine, ...]
+    config: ConfigSnapshot
+    # Date of the last parsed period, which the next appended period's interval starts from
+    last_hebrew_date: Any = None
+    
+    @property
+    def periods_indexed_by_date(self):
+        """Get the periods as a dictionary keyed by Hebrew date (as create_periods_index)."""
+        return {period.hebrew_date: period for period in self.periods}
+    
+    @property
+    def forbidden_day_count(self) -> int:
+        """Get the total number of forbidden days, counting each unbroken pattern entry."""
+        return sum(
+            len(forbidden_day) if isinstance(forbidden_day, tuple) else 1
+            for period in self.periods
+            for forbidden_day in period.forbidden_days_list
+        )
+
+
+def _freeze_forbidden_days(forbidden_days_list):
+    """Convert a forbidden days list (with nested pattern lists) into tuples."""
+    return tuple(
+        tuple(forbidden_day) if isinstance(forbidden_day, list) else forbidden_day
+        for forbidden_day in forbidden_days_list
+    )
+
+
+class TaharaEngine:
+    """Thread-safe calculator that owns its configuration, caches and output sinks."""
+    
+    def __init__(self, config: Optional[ConfigSnapshot] = None,
+                 render_cache_size: int = DEFAULT_RENDER_CACHE_SIZE,
+                 message_sink: Optional[Callable[[str], None]] = None,
+                 block_cache_size: int = DEFAULT_BLOCK_CACHE_SIZE):
+        """
+        Initialize the engine.
+        
+        Args:
+            config: ConfigSnapshot (default: the current global snapshot)
+            render_cache_size: Maximum number of days kept in the engine's render cache
+            message_sink: Called with each parsing error message when
+                show_parsing_errors is enabled (default: print)
+            block_cache_size: Maximum number of period blocks kept in the
+                engine's block cache, which lets re-rendering skip unchanged periods
+        """
+        self._config = config or get_config_snapshot()
+        self._config_lock = threading.Lock()
+        self.render_cache = HebrewDateRenderCache(render_cache_size)
+        self.block_cache = PeriodBlockCache(block_cache_size)
+        self.message_sink = message_sink or print
+    
+    @property
+    def config(self) -> ConfigSnapshot:
+        """Get the engine's configuration snapshot."""
+        return self._config
+    
+    def replace_config(self, config: ConfigSnapshot) -> ConfigSnapshot:
+        """
+        Swap in a new configuration snapshot.
+        
+        Computations already running keep the snapshot they started with.
+        
+        Args:
+            config: The new ConfigSnapshot
+        
+        Returns:
+            ConfigSnapshot: The previous snapshot
+        """
+        with self._config_lock:
+            previous_config, self._config = self._config, config
+        return previous_config
+    
+    def parse_lines(self, lines, config=None, first_line_number=1):
+        """
+        Parse input lines, reporting errors to the message sink.
+        
+        Args:
+            lines: Iterable of date text lines (blank lines are skipped)
+            config: ConfigSnapshot (default: the engine's snapshot)
+            first_line_number: Line number of the first line
+        
+        Returns:
+            tuple: (list of (HebrewDate, time_of_day), list of RejectedLine)
+        """
+        config = config or self._config
+        parsed_entries = []
+        rejected_lines = []
+        for line_number, line in enumerate(lines, first_line_number):
+            date_text = line.strip()
+            if not date_text:
+                continue
+            
+            messages = []
+            try:
+                parsed = parse_mixed_date_input(date_text, messages.append)
+            except (ValueError, IndexError) as error:
+                parsed = None
+                messages.append(f"Error parsing date '{date_text}': {error}")
+            
+            if parsed:
+                parsed_entries.append(parsed)
+                continue
+            message = messages[-1] if messages else f"Unrecognized date '{date_text}'"
+            rejected_lines.append(RejectedLine(line_number, date_text, message))
+            if config.show_parsing_errors:
+                for message in messages:
+                    self.message_sink(message)
+        return parsed_entries, rejected_lines
+    
+    def compute(self, lines) -> TaharaResult:
+        """
+        Calculate the forbidden days of a list of period dates.
+        
+        Args:
+            lines: Iterable of date text lines (blank lines are skipped),
+                possibly starting from a history checkpoint
+        
+        Returns:
+            TaharaResult: The immutable calculation result
+        """
+        config = self._config
+        lines = list(lines)
+        # Only the lines after the latest history checkpoint are parsed
+        checkpoint, first_line_index = split_checkpoint(lines)
+        parsed_entries, rejected_lines = self.parse_lines(lines[first_line_index:], config, first_line_index + 1)
+        hebrew_dates = [hebrew_date for hebrew_date, _ in parsed_entries]
+        
+        if checkpoint is None:
+            cycle_intervals = compute_cycle_intervals(hebrew_dates)
+            unbroken_state = UnbrokenIntervalState()
+            first_interval_count = 0
+            last_hebrew_date = None
+        else:
+            cycle_intervals = list(checkpoint.cycle_intervals)
+            cycle_intervals += compute_cycle_intervals([checkpoint.hebrew_date] + hebrew_dates)
+            unbroken_state = checkpoint.get_unbroken_state()
+            first_interval_count = len(checkpoint.cycle_intervals) + 1
+            last_hebrew_date = checkpoint.hebrew_date
+        
+        period_results = {}
+        for period_index, (hebrew_date, time_of_day) in enumerate(parsed_entries):
+            # Every period sees the intervals up to and including its own
+            interval_count = first_interval_count + period_index
+            while unbroken_state.interval_count < interval_count:
+                unbroken_state.append(cycle_intervals[unbroken_state.interval_count])
+            cycle_interval = cycle_intervals[interval_count - 1] if interval_count else None
+            # Same dedup as create_periods_index: first position, last value
+            period_results[hebrew_date] = self.compute_period(
+                hebrew_date, time_of_day, cycle_interval, cycle_intervals[:interval_count], unbroken_state
+            )
+        
+        return TaharaResult(
+            tuple(period_results.values()),
+            tuple(cycle_intervals),
+            tuple(rejected_lines),
+            config,
+            hebrew_dates[-1] if hebrew_dates else last_hebrew_date
+        )
+    
+    @staticmethod
+    def compute_period(hebrew_date, time_of_day, cycle_interval, previous_cycle_intervals,
+                       unbroken_state=None) -> PeriodResult:
+        """
+        Calculate the forbidden days of one period.
+        
+        Args:
+            hebrew_date: Hebrew date of the period
+            time_of_day: 0 for night, 1 for day
+            cycle_interval: Interval since the previous period (None for the first)
+            previous_cycle_intervals: Cycle intervals before this period
+            unbroken_state: UnbrokenIntervalState of previous_cycle_intervals (optional)
+        
+        Returns:
+            PeriodResult: The immutable period result
+        """
+        # A private period object, created with its interval instead of assigned one later
+        menstrual_period = MenstrualPeriod(hebrew_date, time_of_day, cycle_interval)
+        forbidden_days_list = calculate_forbidden_days(
+            menstrual_period, previous_cycle_intervals, unbroken_state
+        )
+        return PeriodResult(
+            hebrew_date, time_of_day, cycle_interval, _freeze_forbidden_days(forbidden_days_list)
+        )
+    
+    def render_period(self, period: PeriodResult, config: Optional[ConfigSnapshot] = None) -> str:
+        """
+        Format one period into its output block.
+        
+        Args:
+            period: PeriodResult to format
+            config: ConfigSnapshot (default: the engine's snapshot)
+        
+        Returns:
+            str: Formatted output block
+        """
+        return format_period_block(
+            period.hebrew_date, period, config=config or self._config, render_cache=self.render_cache,
+            block_cache=self.block_cache
+        )
+    
+    @staticmethod
+    def render_cycle_intervals(result: TaharaResult) -> Optional[str]:
+        """
+        Format the cycle intervals section of a result.
+        
+        Args:
+            result: TaharaResult from compute()
+        
+        Returns:
+            str: Formatted output block, or None if the configuration hides it
+        """
+        if not result.config.show_cycle_intervals:
+            return None
+        return format_cycle_intervals_block(
+            list(result.cycle_intervals), result.config.date_separator, result.config.cycle_intervals_format
+        )
+    
+    def iter_blocks(self, result: TaharaResult):
+        """
+        Lazily format a result into output blocks.
+        
+        Args:
+            result: TaharaResult from compute()
+        
+        Yields:
+            str: Formatted output block
+        """
+        return format_output_blocks(
+            result.periods_indexed_by_date,
+            list(result.cycle_intervals),
+            result.config,
+            render_cache=self.render_cache,
+            block_cache=self.block_cache
+        )
+    
+    def render(self, result: TaharaResult) -> str:
+        """
+        Format a result into the complete output text.
+        
+        Args:
+            result: TaharaResult from compute()
+        
+        Returns:
+            str: The formatted output
+        """
+        return "".join(self.iter_blocks(result))
+    
+    def write(self, result: TaharaResult, output_stream) -> int:
+        """
+        Write a formatted result to a text or binary stream.
+        
+        Args:
+            result: TaharaResult from compute()
+            output_stream: Writable text or binary stream
+        
+        Returns:
+            int: Number of blocks written
+        """
+        return write_output_blocks(output_stream, self.iter_blocks(result), result.config.encoding)
@@ -0,0 +1,183 @@
+"""
+Incremental recalculation of an edited history for the Tahara Calculator.
+
+A period's forbidden days depend only on the periods before it, so when
+a history is edited, every period parsed from the unchanged leading
+lines keeps its result. IncrementalCalculation remembers the last
+processed lines and, on update, recalculates only the periods from the
+first changed line on and renders only the blocks of new or changed
+periods.
+"""
+
+import bisect
+from typing import NamedTuple, Optional, Tuple
+
+from src.calculations import UnbrokenIntervalState
+from src.checkpoints import split_checkpoint
+from src.engine import TaharaEngine, TaharaResult
+
+
+class IncrementalUpdate(NamedTuple):
+    """Result of one incremental update."""
+    
+    result: TaharaResult
+    # Complete rendered output blocks
+    blocks: Tuple[str, ...]
+    # Indexes of blocks that differ from the previous update's blocks
+    changed_blocks: Tuple[int, ...]
+    recomputed_periods: int
+    reused_periods: int
+    
+    @property
+    def first_changed_block(self) -> int:
+        """Get the index of the first changed block (len(blocks) if only blocks were removed or none changed)."""
+        return self.changed_blocks[0] if self.changed_blocks else len(self.blocks)
+
+
+def _common_prefix_length(old_lines, new_lines):
+    """Get the number of leading lines two histories share."""
+    prefix_length = 0
+    for old_line, new_line in zip(old_lines, new_lines):
+        if old_line != new_line:
+            break
+        prefix_length += 1
+    return prefix_length
+
+
+class IncrementalCalculation:
+    """Calculation state of one history that is updated as the history is edited."""
+    
+    def __init__(self, engine: Optional[TaharaEngine] = None):
+        """
+        Initialize the calculation.
+        
+        Args:
+            engine: TaharaEngine used for calculation and rendering (default: a new engine)
+        """
+        self.engine = engine or TaharaEngine()
+        self._reset(None)
+    
+    def _reset(self, config):
+        """Forget all state, e.g. after the engine's configuration changed."""
+        self._config = config
+        self._lines = []
+        # Lines up to and including the latest history checkpoint
+        self._checkpoint_lines = []
+        # Per parsed line: its line number, (date, time of day) and PeriodResult
+        self._entry_line_numbers = []
+        self._entries = []
+        self._entry_results = []
+        self._cycle_intervals = []
+        self._rejected_lines = []
+        self._blocks = ()
+        # id(PeriodResult) -> (PeriodResult, rendered block)
+        self._rendered_periods = {}
+    
+    def update(self, lines) -> IncrementalUpdate:
+        """
+        Bring the calculation up to date with the history's current lines.
+        
+        Args:
+            lines: The complete current history, possibly starting from a history checkpoint
+        
+        Returns:
+            IncrementalUpdate: The new result and blocks, and what changed
+        """
+        engine = self.engine
+        config = engine.config
+        lines = list(lines)
+        checkpoint, first_line_index = split_checkpoint(lines)
+        # A new checkpoint changes every period after it
+        if config is not self._config or lines[:first_line_index] != self._checkpoint_lines:
+            self._reset(config)
+            self._checkpoint_lines = lines[:first_line_index]
+            if checkpoint is not None:
+                self._cycle_intervals = list(checkpoint.cycle_intervals)
+        
+        prefix_length = max(_common_prefix_length(self._lines, lines), first_line_index)
+        kept_entry_count = bisect.bisect_right(self._entry_line_numbers, prefix_length)
+        
+        entry_line_numbers = self._entry_line_numbers[:kept_entry_count]
+        entries = self._entries[:kept_entry_count]
+        entry_results = self._entry_results[:kept_entry_count]
+        rejected_lines = [
+            rejected_line for rejected_line in self._rejected_lines
+            if rejected_line.line_number <= prefix_length
+        ]
+        
+        if checkpoint is None:
+            cycle_intervals = self._cycle_intervals[:max(kept_entry_count - 1, 0)]
+            unbroken_state = UnbrokenIntervalState(cycle_intervals)
+            last_hebrew_date = None
+        else:
+            # After a checkpoint every period has an interval
+            checkpoint_interval_count = len(checkpoint.cycle_intervals)
+            cycle_intervals = self._cycle_intervals[:checkpoint_interval_count + kept_entry_count]
+            unbroken_state = checkpoint.get_unbroken_state()
+            for cycle_interval in cycle_intervals[checkpoint_interval_count:]:
+                unbroken_state.append(cycle_interval)
+            last_hebrew_date = checkpoint.hebrew_date
+        if entries:
+            last_hebrew_date = entries[-1][0]
+        for line_number, line in enumerate(lines[prefix_length:], prefix_length + 1):
+            parsed_entries, line_rejections = engine.parse_lines([line], config, line_number)
+            rejected_lines.extend(line_rejections)
+            for hebrew_date, time_of_day in parsed_entries:
+                cycle_interval = None
+                if last_hebrew_date is not None:
+                    cycle_interval = int(hebrew_date - last_hebrew_date + 1)
+                    cycle_intervals.append(cycle_interval)
+                    unbroken_state.append(cycle_interval)
+                last_hebrew_date = hebrew_date
+                entry_line_numbers.append(line_number)
+                entries.append((hebrew_date, time_of_day))
+                entry_results.append(engine.compute_period(
+                    hebrew_date, time_of_day, cycle_interval, cycle_intervals, unbroken_state
+                ))
+        
+        # Same dedup as create_periods_index: first position, last value
+        periods_indexed_by_date = {}
+        for period in entry_results:
+            periods_indexed_by_date[period.hebrew_date] = period
+        result = TaharaResult(
+            tuple(periods_indexed_by_date.values()),
+            tuple(cycle_intervals),
+            tuple(rejected_lines),
+            config,
+            last_hebrew_date
+        )
+        
+        # Render only periods that were recalculated
+        blocks = []
+        interval_block = engine.render_cycle_intervals(result)
+        if interval_block is not None:
+            blocks.append(interval_block)
+        rendered_periods = {}
+        for period in result.periods:
+            rendered_period = self._rendered_periods.get(id(period))
+            if rendered_period is None or rendered_period[0] is not period:
+                rendered_period = (period, engine.render_period(period, config))
+            rendered_periods[id(period)] = rendered_period
+            blocks.append(rendered_period[1])
+        
+        previous_blocks = self._blocks
+        changed_blocks = tuple(
+            block_index for block_index, block in enumerate(blocks)
+            if block_index >= len(previous_blocks) or block != previous_blocks[block_index]
+        )
+        
+        self._lines = lines
+        self._entry_line_numbers = entry_line_numbers
+        self._entries = entries
+        self._entry_results = entry_results
+        self._cycle_intervals = cycle_intervals
+        self._rejected_lines = rejected_lines
+        self._blocks = tuple(blocks)
+        self._rendered_periods = rendered_periods
+        return IncrementalUpdate(
+            result,
+            self._blocks,
+            changed_blocks,
+            len(entries) - kept_entry_count,
+            kept_entry_count
+        )
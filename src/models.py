@@ -5,8 +5,6 @@ This module contains the core data structures for representing
 menstrual periods and forbidden days in Hebrew calendar calculations.
 """
 
-from pyluach import dates
-
 
 class MenstrualPeriod:
     """Represents a menstrual period with Hebrew calendar date and timing."""
@@ -5,24 +5,19 @@ This module contains the main processing logic that coordinates
 all the other modules to perform the calculations.
 """
 
-import sys
-import os
-
-# Add the parent directory to the Python path
-parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-if parent_dir not in sys.path:
-    sys.path.insert(0, parent_dir)
+import itertools
 
 from src.parsers import convert_text_to_menstrual_period
 from src.calculations import calculate_forbidden_days
 
 
-def process_periods_data(period_dates_list):
+def process_periods_data(period_dates_list, config=None):
     """
     Process raw period data into menstrual period objects.
     
     Args:
         period_dates_list: List of raw date text entries
+        config: ConfigSnapshot (default: the global snapshot)
         
     Returns:
         list: List of MenstrualPeriod objects
@@ -31,7 +26,7 @@ def process_periods_data(period_dates_list):
     
     for date_text_entry in period_dates_list:
         try:
-            menstrual_period = convert_text_to_menstrual_period(date_text_entry)
+            menstrual_period = convert_text_to_menstrual_period(date_text_entry, config)
             if menstrual_period:
                 menstrual_periods_list.append(menstrual_period)
         except NameError as parsing_error:
@@ -40,25 +35,50 @@ def process_periods_data(period_dates_list):
     return menstrual_periods_list
 
 
-def calculate_cycle_intervals(menstrual_periods_list):
+def compute_cycle_intervals(hebrew_dates):
+    """
+    Compute cycle intervals between consecutive period dates without modifying anything.
+    
+    Args:
+        hebrew_dates: List of period Hebrew dates in input order
+        
+    Returns:
+        list: List of cycle intervals (one fewer than the dates)
+    """
+    return [
+        int(current_date - previous_date + 1)
+        for previous_date, current_date in zip(hebrew_dates, itertools.islice(hebrew_dates, 1, None))
+    ]
+
+
+def calculate_cycle_intervals(menstrual_periods_list, checkpoint=None):
     """
     Calculate cycle intervals between consecutive periods.
     
     Args:
         menstrual_periods_list: List of menstrual periods
+        checkpoint: HistoryCheckpoint the periods follow (optional)
         
     Returns:
-        list: List of cycle intervals
+        list: List of cycle intervals, starting with the checkpoint's
     """
-    # Calculate the cycle intervals between consecutive periods
-    for period_index, current_period in enumerate(menstrual_periods_list[1:]):
-        cycle_interval = (
-            current_period.hebrew_date - 
-            menstrual_periods_list[period_index].hebrew_date + 1
-        )
-        current_period.cycle_interval = int(cycle_interval)
+    if checkpoint is None:
+        cycle_intervals = []
+        previous_date = None
+    else:
+        # The first period's interval starts at the checkpoint's period
+        cycle_intervals = list(checkpoint.cycle_intervals)
+        previous_date = checkpoint.hebrew_date
+    
+    # Store each interval on the period it ends
+    for current_period in menstrual_periods_list:
+        if previous_date is not None:
+            cycle_interval = int(current_period.hebrew_date - previous_date + 1)
+            current_period.cycle_interval = cycle_interval
+            cycle_intervals.append(cycle_interval)
+        previous_date = current_period.hebrew_date
     
-    return [period.cycle_interval for period in menstrual_periods_list[1:]]
+    return cycle_intervals
 
 
 def calculate_all_forbidden_days(menstrual_periods_list, historical_cycle_intervals):
@@ -67,13 +87,16 @@ def calculate_all_forbidden_days(menstrual_periods_list, historical_cycle_interv
     
     Args:
         menstrual_periods_list: List of menstrual periods
-        historical_cycle_intervals: List of historical cycle intervals
+        historical_cycle_intervals: List of historical cycle intervals, including
+            those of a checkpoint the periods follow
     """
+    # Intervals before the first period (its own included when it follows a checkpoint)
+    first_interval_count = len(historical_cycle_intervals) - len(menstrual_periods_list) + 1
     for period_index, current_period in enumerate(menstrual_periods_list):
         if historical_cycle_intervals:
             current_period.forbidden_days_list = calculate_forbidden_days(
                 current_period, 
-                historical_cycle_intervals[:period_index]
+                historical_cycle_intervals[:first_interval_count + period_index]
             )
         else:
             current_period.forbidden_days_list = calculate_forbidden_days(current_period)
@@ -0,0 +1,430 @@
+"""
+Cross-user index of restricted onot for the Tahara Calculator.
+
+This module answers "who is restricted on date X" over a batch of user
+histories. The forbidden days of every user are flattened into one
+index of (target onah, user, rule, source onah) entries, stored as
+parallel typed arrays sorted by target onah, so a point or range query
+is two binary searches plus a scan of the k matches: O(log n + k).
+
+The index can be saved to a binary file together with the signature of
+every input file it was built from. Loading it back and refreshing it
+only recalculates the users whose input files changed.
+"""
+
+import heapq
+import json
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Any, NamedTuple
+
+from src.engine import TaharaEngine
+from utils.file_operations import read_periods_list_file
+from utils.file_watcher import get_file_signature
+from utils.hebrew_calendar_utils import get_day_ordinal, ordinal_to_hebrew_date
+from utils.lazy_import import lazy_import
+
+# Only needed when an index is saved or loaded
+tempfile = lazy_import("tempfile")
+zlib = lazy_import("zlib")
+
+RESTRICTION_INDEX_MAGIC = b"TRIX"
+RESTRICTION_INDEX_FORMAT_VERSION = 1
+
+# Header: magic, format version, entry count, metadata length, CRC-32 of
+# everything after the header
+_HEADER = struct.Struct("<4sHQII")
+
+# Typecode of each entry array, in file order
+_ARRAY_TYPECODES = (("onah_keys", "q"), ("source_keys", "q"), ("user_indexes", "I"), ("rule_indexes", "I"))
+
+
+class RestrictionIndexError(ValueError):
+    """Raised when an index file is missing, damaged or of another format."""
+
+
+class RestrictionMatch(NamedTuple):
+    """One restriction of one user on one onah."""
+    
+    hebrew_date: Any
+    time_of_day: int
+    user_id: str
+    rule: str
+    # Onah of the period the restriction derives from
+    source_date: Any
+    source_time_of_day: int
+
+
+def get_onah_key(hebrew_date, time_of_day) -> int:
+    """
+    Get the sort key of an onah: the night of a day sorts before its day.
+    
+    Args:
+        hebrew_date: Hebrew date of the onah
+        time_of_day: 0 for night, 1 for day
+    
+    Returns:
+        int: The onah key
+    """
+    return get_day_ordinal(hebrew_date) * 2 + time_of_day
+
+
+def collect_result_entries(result):
+    """
+    Flatten a result's forbidden days into index entries.
+    
+    Repeated unbroken intervals that produce the same entry are kept once.
+    
+    Args:
+        result: TaharaResult
+    
+    Returns:
+        set: (target onah key, rule, source onah key) tuples
+    """
+    entries = set()
+    for period in result.periods:
+        source_key = get_onah_key(period.hebrew_date, period.time_of_day)
+        for forbidden_day in period.forbidden_days_list:
+            # Unbroken patterns are nested lists of ForbiddenDay objects
+            entry_days = forbidden_day if isinstance(forbidden_day, (list, tuple)) else (forbidden_day,)
+            for entry_day in entry_days:
+                entries.add((
+                    get_onah_key(entry_day.hebrew_date, entry_day.time_of_day),
+                    entry_day.restriction_name,
+                    source_key
+                ))
+    return entries
+
+
+def get_user_id(input_file_path):
+    """Get the user id of an input file: its name without directory and extensions."""
+    return os.path.basename(input_file_path).split(".")[0]
+
+
+class RestrictionIndex:
+    """Immutable index of every user's restricted onot, sorted by onah."""
+    
+    def __init__(self, onah_keys, source_keys, user_indexes, rule_indexes, user_ids, rule_names,
+                 sources=None):
+        """
+        Initialize the index from sorted entry arrays.
+        
+        Use build() or load() rather than calling this directly.
+        
+        Args:
+            onah_keys: array("q") of target onah keys, ascending
+            source_keys: array("q") of source onah keys
+            user_indexes: array("I") of positions in user_ids
+            rule_indexes: array("I") of positions in rule_names
+            user_ids: List of user ids
+            rule_names: List of restriction names
+            sources: Input file path -> [user id, file signature] (optional)
+        """
+        self.onah_keys = onah_keys
+        self.source_keys = source_keys
+        self.user_indexes = user_indexes
+        self.rule_indexes = rule_indexes
+        self.user_ids = user_ids
+        self.rule_names = rule_names
+        self.sources = sources or {}
+    
+    def __len__(self):
+        return len(self.onah_keys)
+    
+    @classmethod
+    def build(cls, entries_by_user, sources=None):
+        """
+        Build an index from each user's entries.
+        
+        Args:
+            entries_by_user: Dictionary of user id -> iterable of
+                (target onah key, rule, source onah key) tuples
+            sources: Input file path -> [user id, file signature] (optional)
+        
+        Returns:
+            RestrictionIndex: The index
+        """
+        user_ids = sorted(entries_by_user)
+        rule_names = sorted({rule for entries in entries_by_user.values() for _, rule, _ in entries})
+        rule_positions = {rule: rule_index for rule_index, rule in enumerate(rule_names)}
+        rows = [
+            (onah_key, user_index, rule_positions[rule], source_key)
+            for user_index, user_id in enumerate(user_ids)
+            for onah_key, rule, source_key in entries_by_user[user_id]
+        ]
+        rows.sort()
+        return cls(
+            array("q", [row[0] for row in rows]),
+            array("q", [row[3] for row in rows]),
+            array("I", [row[1] for row in rows]),
+            array("I", [row[2] for row in rows]),
+            user_ids,
+            rule_names,
+            sources
+        )
+    
+    def replace_users(self, entries_by_user, removed_user_ids=(), sources=None):
+        """
+        Get a copy of the index with some users' entries replaced.
+        
+        The remaining entries keep their sorted order and the new entries
+        are merged in, so the index is not sorted again: O(n + k log k)
+        for k new entries.
+        
+        Args:
+            entries_by_user: Dictionary of user id -> iterable of (target onah
+                key, rule, source onah key) tuples, replacing those users' entries
+            removed_user_ids: User ids whose entries are dropped
+            sources: Input file path -> [user id, file signature] (optional)
+        
+        Returns:
+            RestrictionIndex: The new index
+        """
+        dropped_user_ids = set(entries_by_user) | set(removed_user_ids)
+        user_ids = sorted((set(self.user_ids) - dropped_user_ids) | set(entries_by_user))
+        rule_names = sorted(
+            set(self.rule_names) | {rule for entries in entries_by_user.values() for _, rule, _ in entries}
+        )
+        user_positions = {user_id: user_index for user_index, user_id in enumerate(user_ids)}
+        rule_positions = {rule: rule_index for rule_index, rule in enumerate(rule_names)}
+        
+        # Both name lists stay sorted, so the remapped old rows stay in order
+        user_index_map = [
+            None if user_id in dropped_user_ids else user_positions[user_id] for user_id in self.user_ids
+        ]
+        rule_index_map = [rule_positions[rule] for rule in self.rule_names]
+        kept_rows = (
+            (onah_key, user_index_map[user_index], rule_index_map[rule_index], source_key)
+            for onah_key, source_key, user_index, rule_index in zip(
+                self.onah_keys, self.source_keys, self.user_indexes, self.rule_indexes)
+            if user_index_map[user_index] is not None
+        )
+        new_rows = sorted(
+            (onah_key, user_positions[user_id], rule_positions[rule], source_key)
+            for user_id, entries in entries_by_user.items()
+            for onah_key, rule, source_key in entries
+        )
+        rows = list(heapq.merge(kept_rows, new_rows))
+        return RestrictionIndex(
+            array("q", [row[0] for row in rows]),
+            array("q", [row[3] for row in rows]),
+            array("I", [row[1] for row in rows]),
+            array("I", [row[2] for row in rows]),
+            user_ids,
+            rule_names,
+            sources
+        )
+    
+    def get_user_entries(self):
+        """
+        Get every user's entries back from the index.
+        
+        Returns:
+            dict: User id -> list of (target onah key, rule, source onah key) tuples
+        """
+        entries_by_user = {user_id: [] for user_id in self.user_ids}
+        for onah_key, source_key, user_index, rule_index in zip(
+                self.onah_keys, self.source_keys, self.user_indexes, self.rule_indexes):
+            entries_by_user[self.user_ids[user_index]].append((onah_key, self.rule_names[rule_index], source_key))
+        return entries_by_user
+    
+    def _iter_matches(self, first_position, last_position):
+        """Yield the matches stored between two positions."""
+        dates_by_ordinal = {}
+        for position in range(first_position, last_position):
+            onah_key = self.onah_keys[position]
+            source_key = self.source_keys[position]
+            for ordinal in (onah_key >> 1, source_key >> 1):
+                if ordinal not in dates_by_ordinal:
+                    dates_by_ordinal[ordinal] = ordinal_to_hebrew_date(ordinal)
+            yield RestrictionMatch(
+                hebrew_date=dates_by_ordinal[onah_key >> 1],
+                time_of_day=onah_key & 1,
+                user_id=self.user_ids[self.user_indexes[position]],
+                rule=self.rule_names[self.rule_indexes[position]],
+                source_date=dates_by_ordinal[source_key >> 1],
+                source_time_of_day=source_key & 1
+            )
+    
+    def count_range(self, first_onah_key, last_onah_key) -> int:
+        """Count the entries whose onah key lies in an inclusive range, in O(log n)."""
+        return bisect_right(self.onah_keys, last_onah_key) - bisect_left(self.onah_keys, first_onah_key)
+    
+    def query_range(self, start_date, end_date, start_time_of_day=0, end_time_of_day=1):
+        """
+        Find every restriction between two onot, inclusive.
+        
+        Args:
+            start_date: Hebrew date of the first onah
+            end_date: Hebrew date of the last onah
+            start_time_of_day: Time of day of the first onah (default: its night)
+            end_time_of_day: Time of day of the last onah (default: its day)
+        
+        Returns:
+            Iterator of RestrictionMatch, by onah, then user, then rule
+        """
+        first_position = bisect_left(self.onah_keys, get_onah_key(start_date, start_time_of_day))
+        last_position = bisect_right(self.onah_keys, get_onah_key(end_date, end_time_of_day))
+        return self._iter_matches(first_position, max(first_position, last_position))
+    
+    def query_onah(self, hebrew_date, time_of_day):
+        """
+        Find every restriction on one onah.
+        
+        Args:
+            hebrew_date: Hebrew date of the onah
+            time_of_day: 0 for night, 1 for day
+        
+        Returns:
+            list: RestrictionMatch objects
+        """
+        return list(self.query_range(hebrew_date, hebrew_date, time_of_day, time_of_day))
+    
+    def save(self, path):
+        """
+        Atomically write the index to a file.
+        
+        Args:
+            path: Path to the index file
+        """
+        metadata = json.dumps({
+            "byteorder": sys.byteorder,
+            "user_ids": self.user_ids,
+            "rule_names": self.rule_names,
+            "sources": self.sources
+        }, ensure_ascii=False).encode("utf-8")
+        body = [metadata] + [getattr(self, name).tobytes() for name, _ in _ARRAY_TYPECODES]
+        checksum = 0
+        for body_part in body:
+            checksum = zlib.crc32(body_part, checksum)
+        header = _HEADER.pack(
+            RESTRICTION_INDEX_MAGIC, RESTRICTION_INDEX_FORMAT_VERSION, len(self), len(metadata), checksum
+        )
+        
+        target_dir = os.path.dirname(os.path.abspath(path))
+        temp_fd, temp_path = tempfile.mkstemp(dir=target_dir, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+        try:
+            with os.fdopen(temp_fd, "wb") as f:
+                f.write(header)
+                for body_part in body:
+                    f.write(body_part)
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
+    
+    @classmethod
+    def load(cls, path):
+        """
+        Read an index file.
+        
+        Args:
+            path: Path to the index file
+        
+        Returns:
+            RestrictionIndex: The index
+        
+        Raises:
+            RestrictionIndexError: If the file is not an intact index of the current format
+            OSError: If the file cannot be read
+        """
+        with open(path, "rb") as f:
+            data = f.read()
+        if len(data) < _HEADER.size:
+            raise RestrictionIndexError(f"{path} is too short")
+        magic, format_version, entry_count, metadata_length, checksum = _HEADER.unpack_from(data)
+        if magic != RESTRICTION_INDEX_MAGIC:
+            raise RestrictionIndexError(f"{path} is not a restriction index")
+        if format_version != RESTRICTION_INDEX_FORMAT_VERSION:
+            raise RestrictionIndexError(f"{path} has format version {format_version}")
+        body = memoryview(data)[_HEADER.size:]
+        if zlib.crc32(body) != checksum:
+            raise RestrictionIndexError(f"{path} failed its checksum")
+        
+        metadata = json.loads(bytes(body[:metadata_length]).decode("utf-8"))
+        arrays = {}
+        offset = metadata_length
+        for name, typecode in _ARRAY_TYPECODES:
+            entry_array = array(typecode)
+            array_size = entry_array.itemsize * entry_count
+            if offset + array_size > len(body):
+                raise RestrictionIndexError(f"{path} is truncated")
+            entry_array.frombytes(body[offset:offset + array_size])
+            if metadata["byteorder"] != sys.byteorder:
+                entry_array.byteswap()
+            arrays[name] = entry_array
+            offset += array_size
+        
+        return cls(
+            user_ids=metadata["user_ids"],
+            rule_names=metadata["rule_names"],
+            sources=metadata["sources"],
+            **arrays
+        )
+
+
+def _compute_user_entries(input_file_path, engine):
+    """Calculate one input file and flatten its results, or return None if it cannot be read."""
+    period_dates_list = read_periods_list_file(input_file_path, engine.config)
+    if period_dates_list is None:
+        return None
+    return collect_result_entries(engine.compute(period_dates_list))
+
+
+def build_restriction_index(input_file_paths, engine=None, previous_index=None):
+    """
+    Build the index of a batch of user input files.
+    
+    Users whose input file has the same signature as when previous_index
+    was built keep their entries from it instead of being recalculated.
+    When no user changed, previous_index itself is returned; otherwise
+    only the changed users' entries are replaced (see replace_users).
+    
+    Args:
+        input_file_paths: Paths to the users' input files (user id: file name without extensions)
+        engine: TaharaEngine used for the calculations (default: a new engine)
+        previous_index: RestrictionIndex to reuse unchanged users from (optional)
+    
+    Returns:
+        tuple: (RestrictionIndex, number of recalculated users, list of unreadable paths)
+    """
+    previous_sources = previous_index.sources if previous_index is not None else {}
+    previous_user_ids = set(previous_index.user_ids) if previous_index is not None else set()
+    
+    changed_entries = {}
+    kept_user_ids = set()
+    sources = {}
+    user_paths = {}
+    unreadable_paths = []
+    for input_file_path in input_file_paths:
+        user_id = get_user_id(input_file_path)
+        if user_id in user_paths:
+            raise ValueError(
+                f"Input files {user_paths[user_id]} and {input_file_path} have the same user id '{user_id}'"
+            )
+        user_paths[user_id] = input_file_path
+        file_signature = list(get_file_signature(input_file_path) or ())
+        
+        previous_source = previous_sources.get(input_file_path)
+        if previous_source == [user_id, file_signature] and user_id in previous_user_ids:
+            kept_user_ids.add(user_id)
+        else:
+            engine = engine or TaharaEngine()
+            entries = _compute_user_entries(input_file_path, engine)
+            if entries is None:
+                unreadable_paths.append(input_file_path)
+                continue
+            changed_entries[user_id] = entries
+        sources[input_file_path] = [user_id, file_signature]
+    
+    if previous_index is None:
+        return RestrictionIndex.build(changed_entries, sources), len(changed_entries), unreadable_paths
+    removed_user_ids = previous_user_ids - kept_user_ids - set(changed_entries)
+    if not changed_entries and not removed_user_ids and sources == previous_sources:
+        return previous_index, 0, unreadable_paths
+    restriction_index = previous_index.replace_users(changed_entries, removed_user_ids, sources)
+    return restriction_index, len(changed_entries), unreadable_paths
@@ -0,0 +1,318 @@
+"""
+Structural diff between two calculation results.
+
+This module compares the forbidden days of two TaharaResult objects
+instead of their rendered text. Each forbidden day becomes an entry
+keyed by (source period onah, rule, target onah); both runs' entries are
+sorted once and compared in a single merge pass, so even histories with
+hundreds of thousands of entries diff in a few seconds. Entries whose
+source onah and rule exist in both runs but whose target onah moved are
+reported as shifted rather than as a removal plus an addition.
+"""
+
+from itertools import groupby
+from operator import itemgetter
+from typing import Any, NamedTuple, Optional, Tuple
+
+from src.calculations import RESTRICTION_RULE_KINDS
+from utils.formatters import date_render_cache, format_restriction_name
+from utils.hebrew_calendar_utils import get_day_ordinal
+from utils.lazy_import import lazy_import
+
+# Only needed for JSON reports
+json = lazy_import("json")
+
+# Kinds of differences, in report order
+DIFF_CHANGE_KINDS = ("added", "removed", "shifted")
+
+# Output formats of a diff report
+DIFF_REPORT_FORMATS = ("text", "json")
+
+# Line prefix of each kind of difference in text reports
+_TEXT_CHANGE_MARKERS = {"added": "+", "removed": "-", "shifted": "~"}
+
+_TIME_OF_DAY_NAMES = ("night", "day")
+
+
+class DiffEntry(NamedTuple):
+    """One forbidden day that was added, removed or shifted between two runs."""
+    
+    change: str
+    source_date: Any
+    source_time_of_day: int
+    rule: str
+    # Target onah in the old run (None when added)
+    old_date: Any
+    old_time_of_day: Optional[int]
+    # Target onah in the new run (None when removed)
+    new_date: Any
+    new_time_of_day: Optional[int]
+
+
+class ResultDiff(NamedTuple):
+    """Differences between two calculation results, sorted by source onah and rule."""
+    
+    entries: Tuple[DiffEntry, ...]
+    unchanged_count: int
+    
+    def count(self, change: str) -> int:
+        """Get the number of entries of one kind of difference."""
+        return sum(1 for entry in self.entries if entry.change == change)
+    
+    @property
+    def has_changes(self) -> bool:
+        """Check whether the two results differ."""
+        return bool(self.entries)
+
+
+def get_rule_kind(rule: str) -> str:
+    """
+    Get the metric-style label of a restriction name.
+    
+    Args:
+        rule: Restriction name of a forbidden day
+    
+    Returns:
+        str: Label such as "standard_30_day", or "unbroken_pattern" for interval names
+    """
+    if rule.isdigit():
+        return "unbroken_pattern"
+    return RESTRICTION_RULE_KINDS.get(rule, "other")
+
+
+def collect_diff_entries(result):
+    """
+    Flatten a result's forbidden days into sorted diff entries.
+    
+    Args:
+        result: TaharaResult
+    
+    Returns:
+        list: ((source ordinal, source time of day, rule, target ordinal,
+            target time of day), source date, target date) tuples, sorted
+    """
+    entries = []
+    append_entry = entries.append
+    for period in result.periods:
+        source_date = period.hebrew_date
+        source_ordinal = get_day_ordinal(source_date)
+        source_time_of_day = period.time_of_day
+        for forbidden_day in period.forbidden_days_list:
+            # Unbroken patterns are nested lists of ForbiddenDay objects
+            entry_days = forbidden_day if isinstance(forbidden_day, (list, tuple)) else (forbidden_day,)
+            for entry_day in entry_days:
+                target_date = entry_day.hebrew_date
+                append_entry((
+                    (source_ordinal, source_time_of_day, entry_day.restriction_name,
+                     get_day_ordinal(target_date), entry_day.time_of_day),
+                    source_date,
+                    target_date
+                ))
+    # Sort by key only; the dates are determined by it
+    entries.sort(key=itemgetter(0))
+    return entries
+
+
+def _diff_group(old_group, new_group, diff_entries):
+    """
+    Compare the entries of one (source onah, rule) group.
+    
+    Args:
+        old_group: Sorted entries of the group in the old run
+        new_group: Sorted entries of the group in the new run
+        diff_entries: List the differences are appended to
+    
+    Returns:
+        int: Number of unchanged entries
+    """
+    if len(old_group) == 1 and len(new_group) == 1 and old_group[0][0] == new_group[0][0]:
+        return 1
+    
+    removed = []
+    added = []
+    unchanged_count = 0
+    old_index = new_index = 0
+    while old_index < len(old_group) and new_index < len(new_group):
+        old_key = old_group[old_index][0]
+        new_key = new_group[new_index][0]
+        if old_key == new_key:
+            unchanged_count += 1
+            old_index += 1
+            new_index += 1
+        elif old_key < new_key:
+            removed.append(old_group[old_index])
+            old_index += 1
+        else:
+            added.append(new_group[new_index])
+            new_index += 1
+    removed.extend(old_group[old_index:])
+    added.extend(new_group[new_index:])
+    
+    # Pair moved targets in order; whatever is left was added or removed
+    for position in range(max(len(removed), len(added))):
+        old_entry = removed[position] if position < len(removed) else None
+        new_entry = added[position] if position < len(added) else None
+        reference_entry = old_entry or new_entry
+        _, source_time_of_day, rule = reference_entry[0][:3]
+        diff_entries.append(DiffEntry(
+            change="shifted" if old_entry and new_entry else ("removed" if old_entry else "added"),
+            source_date=reference_entry[1],
+            source_time_of_day=source_time_of_day,
+            rule=rule,
+            old_date=old_entry[2] if old_entry else None,
+            old_time_of_day=old_entry[0][4] if old_entry else None,
+            new_date=new_entry[2] if new_entry else None,
+            new_time_of_day=new_entry[0][4] if new_entry else None
+        ))
+    return unchanged_count
+
+
+def _group_key(entry):
+    """Get the (source ordinal, source time of day, rule) group of an entry."""
+    return entry[0][:3]
+
+
+def diff_entry_lists(old_entries, new_entries) -> ResultDiff:
+    """
+    Diff two sorted entry lists from collect_diff_entries in one merge pass.
+    
+    Args:
+        old_entries: Sorted entries of the old run
+        new_entries: Sorted entries of the new run
+    
+    Returns:
+        ResultDiff: The differences
+    """
+    diff_entries = []
+    unchanged_count = 0
+    old_groups = groupby(old_entries, _group_key)
+    new_groups = groupby(new_entries, _group_key)
+    old_group_key, old_group = next(old_groups, (None, None))
+    new_group_key, new_group = next(new_groups, (None, None))
+    
+    while old_group is not None or new_group is not None:
+        if new_group is None or (old_group is not None and old_group_key < new_group_key):
+            unchanged_count += _diff_group(list(old_group), [], diff_entries)
+            old_group_key, old_group = next(old_groups, (None, None))
+        elif old_group is None or new_group_key < old_group_key:
+            unchanged_count += _diff_group([], list(new_group), diff_entries)
+            new_group_key, new_group = next(new_groups, (None, None))
+        else:
+            unchanged_count += _diff_group(list(old_group), list(new_group), diff_entries)
+            old_group_key, old_group = next(old_groups, (None, None))
+            new_group_key, new_group = next(new_groups, (None, None))
+    
+    return ResultDiff(tuple(diff_entries), unchanged_count)
+
+
+def diff_results(old_result, new_result) -> ResultDiff:
+    """
+    Compare the forbidden days of two calculation results.
+    
+    Args:
+        old_result: TaharaResult of the earlier run
+        new_result: TaharaResult of the later run
+    
+    Returns:
+        ResultDiff: Added, removed and shifted forbidden days
+    """
+    return diff_entry_lists(collect_diff_entries(old_result), collect_diff_entries(new_result))
+
+
+def format_diff_text(result_diff, render_cache=None):
+    """
+    Format a diff as text, one line per difference plus a summary line.
+    
+    Args:
+        result_diff: ResultDiff to format
+        render_cache: HebrewDateRenderCache (default: the global render cache)
+    
+    Returns:
+        str: The text report
+    """
+    render_cache = render_cache or date_render_cache
+    lines = []
+    for entry in result_diff.entries:
+        source_onah = render_cache.onah_string(entry.source_date, entry.source_time_of_day)
+        if entry.change == "shifted":
+            target = (
+                f"{render_cache.onah_string(entry.old_date, entry.old_time_of_day)} -> "
+                f"{render_cache.onah_string(entry.new_date, entry.new_time_of_day)}"
+            )
+        elif entry.change == "removed":
+            target = render_cache.onah_string(entry.old_date, entry.old_time_of_day)
+        else:
+            target = render_cache.onah_string(entry.new_date, entry.new_time_of_day)
+        lines.append(
+            f"{_TEXT_CHANGE_MARKERS[entry.change]} {source_onah} | "
+            f"{format_restriction_name(entry.rule)} - {target}\n"
+        )
+    lines.append(_format_diff_summary(result_diff) + "\n")
+    return "".join(lines)
+
+
+def _format_diff_summary(result_diff):
+    """Format the counts of a diff as one line."""
+    return ", ".join(
+        [f"{change.capitalize()}: {result_diff.count(change)}" for change in DIFF_CHANGE_KINDS]
+        + [f"Unchanged: {result_diff.unchanged_count}"]
+    )
+
+
+def _serialize_onah(hebrew_date, time_of_day):
+    """Convert an onah into a JSON-compatible dictionary."""
+    if hebrew_date is None:
+        return None
+    return {
+        "date": f"{hebrew_date.year}-{hebrew_date.month:02d}-{hebrew_date.day:02d}",
+        "time_of_day": _TIME_OF_DAY_NAMES[time_of_day]
+    }
+
+
+def format_diff_json(result_diff):
+    """
+    Format a diff as JSON.
+    
+    Hebrew dates are written as "year-month-day" with pyluach's month
+    numbering (Nisan is month 1).
+    
+    Args:
+        result_diff: ResultDiff to format
+    
+    Returns:
+        str: The JSON report
+    """
+    summary = {change: result_diff.count(change) for change in DIFF_CHANGE_KINDS}
+    summary["unchanged"] = result_diff.unchanged_count
+    report = {
+        "summary": summary,
+        "entries": [
+            {
+                "change": entry.change,
+                "source": _serialize_onah(entry.source_date, entry.source_time_of_day),
+                "rule": entry.rule,
+                "rule_kind": get_rule_kind(entry.rule),
+                "old_target": _serialize_onah(entry.old_date, entry.old_time_of_day),
+                "new_target": _serialize_onah(entry.new_date, entry.new_time_of_day)
+            }
+            for entry in result_diff.entries
+        ]
+    }
+    return json.dumps(report, ensure_ascii=False, indent=2) + "\n"
+
+
+def format_diff_report(result_diff, report_format="text", render_cache=None):
+    """
+    Format a diff in one of DIFF_REPORT_FORMATS.
+    
+    Args:
+        result_diff: ResultDiff to format
+        report_format: "text" or "json"
+        render_cache: HebrewDateRenderCache used by text reports (optional)
+    
+    Returns:
+        str: The report
+    """
+    if report_format == "json":
+        return format_diff_json(result_diff)
+    return format_diff_text(result_diff, render_cache)
@@ -0,0 +1,353 @@
+"""
+Multi-tenant cache of per-user calculation state for the Tahara Calculator.
+
+A service answering the same active users over and over keeps each
+user's parsed periods, cycle intervals, unbroken interval state and
+rendered output blocks here, keyed by user id and history version.
+Entries are evicted least recently used first once their estimated size
+exceeds the memory budget. Appending dates to a cached history only
+calculates and renders the new periods instead of the whole history.
+"""
+
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, NamedTuple, Optional, Tuple
+
+from src.calculations import UnbrokenIntervalState
+from src.engine import TaharaEngine, TaharaResult
+from utils.metrics import get_metrics
+
+# Default memory budget of a cache, in bytes
+DEFAULT_MEMORY_BUDGET_BYTES = 256 * 1024 * 1024
+
+# Estimated memory of one period result and one forbidden day (objects and
+# their Hebrew dates), measured with tracemalloc on CPython 3.11
+PERIOD_SIZE_ESTIMATE = 400
+FORBIDDEN_DAY_SIZE_ESTIMATE = 600
+
+
+class UserState(NamedTuple):
+    """Immutable cached calculation state of one user."""
+    
+    user_id: Hashable
+    version: Any
+    # Input lines of the history, as given
+    lines: Tuple[str, ...]
+    result: TaharaResult
+    # Rendered output blocks (cycle intervals first if shown, then one per period)
+    blocks: Tuple[str, ...]
+    # Estimated memory use in bytes
+    size: int
+    
+    @property
+    def output(self) -> str:
+        """Get the complete rendered output."""
+        return "".join(self.blocks)
+
+
+class _CacheEntry:
+    """Cached state plus the private data needed to extend it."""
+    
+    __slots__ = ("state", "unbroken_state", "period_positions")
+    
+    def __init__(self, state, unbroken_state, period_positions):
+        self.state = state
+        self.unbroken_state = unbroken_state
+        self.period_positions = period_positions
+
+
+def _estimate_period_size(period):
+    """Estimate the memory of one period result."""
+    forbidden_day_count = sum(
+        len(forbidden_day) if isinstance(forbidden_day, tuple) else 1
+        for forbidden_day in period.forbidden_days_list
+    )
+    return PERIOD_SIZE_ESTIMATE + FORBIDDEN_DAY_SIZE_ESTIMATE * forbidden_day_count
+
+
+def estimate_state_size(lines, result, blocks) -> int:
+    """
+    Estimate the memory used by a user's cached state.
+    
+    Args:
+        lines: Input lines
+        result: TaharaResult of the lines
+        blocks: Rendered output blocks
+    
+    Returns:
+        int: Estimated size in bytes
+    """
+    return (
+        sum(sys.getsizeof(line) for line in lines)
+        + sum(sys.getsizeof(block) for block in blocks)
+        + sum(_estimate_period_size(period) for period in result.periods)
+    )
+
+
+class UserStateCache:
+    """Thread-safe LRU cache of per-user calculation state with a memory budget."""
+    
+    def __init__(self, engine: Optional[TaharaEngine] = None,
+                 memory_budget_bytes: int = DEFAULT_MEMORY_BUDGET_BYTES,
+                 metrics_name: Optional[str] = None):
+        """
+        Initialize the cache.
+        
+        Args:
+            engine: TaharaEngine used for calculation and rendering (default: a new engine)
+            memory_budget_bytes: Maximum estimated size of all cached states
+            metrics_name: Name the cache's hit/miss counters are reported under (optional)
+        """
+        self.engine = engine or TaharaEngine()
+        self.memory_budget_bytes = memory_budget_bytes
+        self.memory_used = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.incremental_updates = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        if metrics_name:
+            get_metrics().register_cache(metrics_name, self)
+    
+    def __len__(self):
+        return len(self._entries)
+    
+    def __contains__(self, user_id):
+        return user_id in self._entries
+    
+    def _get_entry(self, user_id, version=None):
+        """Get a current entry (moving it to the LRU end), dropping it if stale; call with the lock held."""
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+        # States computed with another version or configuration are stale
+        if ((version is not None and entry.state.version != version)
+                or entry.state.result.config is not self.engine.config):
+            self._remove_entry(user_id)
+            return None
+        self._entries.move_to_end(user_id)
+        return entry
+    
+    def _remove_entry(self, user_id):
+        """Remove an entry; call with the lock held."""
+        entry = self._entries.pop(user_id)
+        self.memory_used -= entry.state.size
+    
+    def _store_entry(self, entry, replaced_entry=None):
+        """
+        Store an entry and evict until the budget is met.
+        
+        Args:
+            entry: _CacheEntry to store
+            replaced_entry: Entry the new one was derived from (None for a
+                full calculation)
+        """
+        user_id = entry.state.user_id
+        with self._lock:
+            current_entry = self._entries.get(user_id)
+            if current_entry is not replaced_entry:
+                # Another update of the user won the race; keep it only if it has the same version
+                if current_entry is not None and current_entry.state.version != entry.state.version:
+                    self._remove_entry(user_id)
+                return
+            if current_entry is not None:
+                self._remove_entry(user_id)
+            if entry.state.size > self.memory_budget_bytes:
+                return
+            self._entries[user_id] = entry
+            self.memory_used += entry.state.size
+            while self.memory_used > self.memory_budget_bytes:
+                evicted_user_id = next(iter(self._entries))
+                self._remove_entry(evicted_user_id)
+                self.evictions += 1
+    
+    def get(self, user_id: Hashable, version: Any = None) -> Optional[UserState]:
+        """
+        Get a user's cached state.
+        
+        Args:
+            user_id: User identifier
+            version: Required history version (default: any cached version)
+        
+        Returns:
+            UserState: The cached state, or None if missing or stale
+        """
+        with self._lock:
+            entry = self._get_entry(user_id, version)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry.state
+    
+    def get_or_compute(self, user_id: Hashable, version: Any, lines) -> UserState:
+        """
+        Get a user's state, calculating and caching it on a miss.
+        
+        Args:
+            user_id: User identifier
+            version: Version of the user's history
+            lines: The user's complete history (only read on a miss)
+        
+        Returns:
+            UserState: The user's state
+        """
+        with self._lock:
+            entry = self._get_entry(user_id, version)
+            if entry is not None:
+                self.hits += 1
+                return entry.state
+            self.misses += 1
+        
+        entry = self._compute_entry(user_id, version, tuple(lines))
+        # A stale entry was dropped above, so any entry present now is a concurrent update
+        self._store_entry(entry)
+        return entry.state
+    
+    def _compute_entry(self, user_id, version, lines):
+        """Calculate and render a user's complete history."""
+        engine = self.engine
+        result = engine.compute(lines)
+        blocks = tuple(engine.iter_blocks(result))
+        
+        period_positions = {period.hebrew_date: position for position, period in enumerate(result.periods)}
+        state = UserState(user_id, version, lines, result, blocks, estimate_state_size(lines, result, blocks))
+        return _CacheEntry(state, UnbrokenIntervalState(result.cycle_intervals), period_positions)
+    
+    def append(self, user_id: Hashable, new_lines, version: Any,
+               base_version: Any = None) -> Optional[UserState]:
+        """
+        Add dates to the end of a cached user's history.
+        
+        Only the new periods are calculated and rendered; existing period
+        blocks are reused. A date equal to an existing period replaces
+        that period in place, as in a full calculation.
+        
+        Args:
+            user_id: User identifier
+            new_lines: Date text lines added to the history
+            version: Version of the history after the append
+            base_version: Version the lines were added to; if the cached
+                state has another version it is invalidated (optional)
+        
+        Returns:
+            UserState: The updated state, or None if the user was not cached
+            (calculate the full history with get_or_compute instead)
+        """
+        with self._lock:
+            entry = self._get_entry(user_id, base_version)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        
+        new_entry = self._extend_entry(entry, tuple(new_lines), version)
+        self._store_entry(new_entry, entry)
+        return new_entry.state
+    
+    def _extend_entry(self, entry, new_lines, version):
+        """Calculate and render only the periods of appended lines."""
+        engine = self.engine
+        state = entry.state
+        result = state.result
+        config = result.config
+        parsed_entries, rejected_lines = engine.parse_lines(
+            new_lines, config, first_line_number=len(state.lines) + 1
+        )
+        
+        unbroken_state = entry.unbroken_state.copy()
+        cycle_intervals = list(result.cycle_intervals)
+        periods = list(result.periods)
+        period_positions = dict(entry.period_positions)
+        blocks = list(state.blocks)
+        block_offset = 1 if config.show_cycle_intervals else 0
+        last_hebrew_date = result.last_hebrew_date
+        size = state.size + sum(sys.getsizeof(line) for line in new_lines)
+        
+        for hebrew_date, time_of_day in parsed_entries:
+            cycle_interval = None
+            if last_hebrew_date is not None:
+                cycle_interval = int(hebrew_date - last_hebrew_date + 1)
+                cycle_intervals.append(cycle_interval)
+                unbroken_state.append(cycle_interval)
+            last_hebrew_date = hebrew_date
+            
+            period = engine.compute_period(
+                hebrew_date, time_of_day, cycle_interval, cycle_intervals, unbroken_state
+            )
+            block = engine.render_period(period, config)
+            position = period_positions.get(hebrew_date)
+            if position is None:
+                period_positions[hebrew_date] = len(periods)
+                periods.append(period)
+                blocks.append(block)
+            else:
+                size -= _estimate_period_size(periods[position]) + sys.getsizeof(blocks[position + block_offset])
+                periods[position] = period
+                blocks[position + block_offset] = block
+            size += _estimate_period_size(period) + sys.getsizeof(block)
+        
+        new_result = TaharaResult(
+            tuple(periods),
+            tuple(cycle_intervals),
+            result.rejected_lines + tuple(rejected_lines),
+            config,
+            last_hebrew_date
+        )
+        if block_offset:
+            size -= sys.getsizeof(blocks[0])
+            blocks[0] = engine.render_cycle_intervals(new_result)
+            size += sys.getsizeof(blocks[0])
+        
+        with self._lock:
+            self.incremental_updates += 1
+        new_state = UserState(
+            state.user_id, version, state.lines + new_lines, new_result, tuple(blocks), size
+        )
+        return _CacheEntry(new_state, unbroken_state, period_positions)
+    
+    def invalidate(self, user_id: Hashable) -> bool:
+        """
+        Drop a user's cached state, e.g. after a date was edited or removed.
+        
+        Args:
+            user_id: User identifier
+        
+        Returns:
+            bool: True if a state was cached
+        """
+        with self._lock:
+            if user_id not in self._entries:
+                return False
+            self._remove_entry(user_id)
+            return True
+    
+    def clear(self):
+        """Remove all cached states and reset the statistics."""
+        with self._lock:
+            self._entries.clear()
+            self.memory_used = 0
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+            self.incremental_updates = 0
+    
+    def stats(self) -> dict:
+        """
+        Get the cache statistics.
+        
+        Returns:
+            dict: Users, memory use and budget, hits, misses, evictions and incremental updates
+        """
+        with self._lock:
+            return {
+                "users": len(self._entries),
+                "memory_used_bytes": self.memory_used,
+                "memory_budget_bytes": self.memory_budget_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "incremental_updates": self.incremental_updates
+            }
@@ -0,0 +1,7 @@
+"""
+Build tools for the Tahara Calculator.
+
+Modules:
+    build_zipapp: Self-contained zipapp build target
+    build_calendar_table: Shared Hebrew calendar table builder
+"""
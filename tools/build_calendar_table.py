@@ -0,0 +1,86 @@
+"""
+Build and inspect the shared Hebrew calendar table of the Tahara Calculator.
+
+The table is a memory-mapped binary file that parallel workers and
+separate calculator runs share instead of deriving dates through
+pyluach. Point the TAHARA_CALENDAR_TABLE environment variable at it to
+enable it.
+
+Usage:
+    python tools/build_calendar_table.py [build|verify|info] [--path FILE] [--first-year 5600] [--last-year 6000]
+"""
+
+import argparse
+import os
+import sys
+
+# Add the parent directory to the Python path when run as a script
+if not __package__:
+    parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if parent_dir not in sys.path:
+        sys.path.insert(0, parent_dir)
+
+from utils.calendar_table import (
+    CALENDAR_TABLE_ENV,
+    DEFAULT_CALENDAR_TABLE_PATH,
+    DEFAULT_FIRST_YEAR,
+    DEFAULT_LAST_YEAR,
+    CalendarTableError,
+    HebrewCalendarTable,
+    write_calendar_table
+)
+
+
+def format_table_info(calendar_table):
+    """
+    Describe a mapped calendar table.
+    
+    Args:
+        calendar_table: HebrewCalendarTable to describe
+    
+    Returns:
+        str: Human readable description
+    """
+    size_kb = os.path.getsize(calendar_table.path) / 1024
+    return "\n".join([
+        f"Path:       {calendar_table.path}",
+        f"Years:      {calendar_table.first_year}-{calendar_table.last_year}",
+        f"Days:       {calendar_table.day_count} (ordinals {calendar_table.first_ordinal}-"
+        f"{calendar_table.first_ordinal + calendar_table.day_count - 1})",
+        f"Built with: {calendar_table.generator_version}",
+        f"Size:       {size_kb:.1f} KB"
+    ])
+
+
+def main(argv=None):
+    """Main entry point for the calendar table tool."""
+    parser = argparse.ArgumentParser(description="Build and inspect the shared Hebrew calendar table.")
+    parser.add_argument("command", nargs="?", choices=("build", "verify", "info"), default="build",
+                        help="build the table, verify an existing one, or describe it (default: build)")
+    parser.add_argument("--path", default=os.environ.get(CALENDAR_TABLE_ENV) or DEFAULT_CALENDAR_TABLE_PATH,
+                        help=f"Table file (default: ${CALENDAR_TABLE_ENV} or {DEFAULT_CALENDAR_TABLE_PATH})")
+    parser.add_argument("--first-year", type=int, default=DEFAULT_FIRST_YEAR,
+                        help=f"First Hebrew year covered (default: {DEFAULT_FIRST_YEAR})")
+    parser.add_argument("--last-year", type=int, default=DEFAULT_LAST_YEAR,
+                        help=f"Last Hebrew year covered (default: {DEFAULT_LAST_YEAR})")
+    args = parser.parse_args(argv)
+    
+    if args.command == "build":
+        try:
+            write_calendar_table(args.path, args.first_year, args.last_year)
+        except ValueError as e:
+            parser.error(str(e))
+    
+    try:
+        with HebrewCalendarTable(args.path, verify=args.command != "info") as calendar_table:
+            print(format_table_info(calendar_table))
+    except (CalendarTableError, OSError) as e:
+        print(f"Invalid calendar table: {e}")
+        return 1
+    if args.command == "verify":
+        print("Checksum OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
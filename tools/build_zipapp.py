@@ -0,0 +1,281 @@
+"""
+Zipapp build target for the Tahara Calculator.
+
+This module packs the src/, utils/, cli/ and config/ packages and a
+vendored copy of pyluach into self-contained, executable zip archives,
+one per command line entry point. Modules are stored as precompiled,
+optimized bytecode at the archive root, so a cold start neither
+compiles sources nor searches beyond the archive for project modules.
+
+Usage:
+    python tools/build_zipapp.py [--entry-point all] [--output-dir dist] [--measure]
+"""
+
+import argparse
+import importlib.metadata
+import importlib.util
+import marshal
+import os
+import shutil
+import sys
+import tempfile
+import zipfile
+
+# Add the parent directory to the Python path when run as a script
+if not __package__:
+    parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if parent_dir not in sys.path:
+        sys.path.insert(0, parent_dir)
+
+from benchmarks.startup import measure_command_ms
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Project packages bundled into every archive
+BUNDLED_PACKAGES = ("src", "utils", "cli", "config")
+
+# Third-party packages vendored into every archive
+VENDORED_PACKAGES = ("pyluach",)
+
+# Entry point name -> (module with a main() function, archive file name)
+ZIPAPP_ENTRY_POINTS = {
+    "calculator": ("cli.cli", "tahara.pyz"),
+    "dates_cli": ("cli.dates_cli", "tahara-dates.pyz"),
+    "config_cli": ("config.config_cli", "tahara-config.pyz")
+}
+
+DEFAULT_OUTPUT_DIR = os.path.join(PROJECT_DIR, "dist")
+DEFAULT_INTERPRETER = "/usr/bin/env python3"
+DEFAULT_OPTIMIZE = 2
+
+# Fixed timestamp of archive entries, so that builds are reproducible
+ARCHIVE_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+
+# Hash-based pyc flags (PEP 552): the bytecode is used without checking the source
+_UNCHECKED_HASH_PYC_FLAGS = 0b01
+
+_MAIN_MODULE_TEMPLATE = '''"""Zipapp entry point of the Tahara Calculator {entry_point}."""
+
+from {module_name} import main
+
+main()
+'''
+
+
+def compile_to_pyc(source_bytes, archive_path, optimize=DEFAULT_OPTIMIZE):
+    """
+    Compile a module to unchecked hash-based pyc bytes.
+    
+    Args:
+        source_bytes: Module source code
+        archive_path: Path of the source inside the archive (used in tracebacks)
+        optimize: Optimization level (0, 1 or 2; 2 also strips docstrings)
+    
+    Returns:
+        bytes: Contents of the pyc file
+    """
+    code = compile(source_bytes, archive_path, "exec", dont_inherit=True, optimize=optimize)
+    return (
+        importlib.util.MAGIC_NUMBER
+        + _UNCHECKED_HASH_PYC_FLAGS.to_bytes(4, "little")
+        + importlib.util.source_hash(source_bytes)
+        + marshal.dumps(code)
+    )
+
+
+def _iter_package_sources(package_dir, archive_prefix):
+    """Yield (source path, archive path) for every module of a package."""
+    for directory, subdirectories, file_names in os.walk(package_dir):
+        subdirectories[:] = sorted(name for name in subdirectories if name != "__pycache__")
+        for file_name in sorted(file_names):
+            if file_name.endswith(".py"):
+                source_path = os.path.join(directory, file_name)
+                relative_path = os.path.relpath(source_path, package_dir).replace(os.sep, "/")
+                yield source_path, f"{archive_prefix}/{relative_path}"
+
+
+def collect_modules():
+    """
+    Collect the bundled project modules and vendored packages.
+    
+    Returns:
+        list: (source path, archive path) pairs
+    """
+    modules = []
+    for package_name in BUNDLED_PACKAGES:
+        modules.extend(_iter_package_sources(os.path.join(PROJECT_DIR, package_name), package_name))
+    for package_name in VENDORED_PACKAGES:
+        package_spec = importlib.util.find_spec(package_name)
+        if package_spec is None or not package_spec.submodule_search_locations:
+            raise RuntimeError(f"Cannot vendor {package_name}: package is not installed")
+        package_dir = list(package_spec.submodule_search_locations)[0]
+        modules.extend(_iter_package_sources(package_dir, package_name))
+    return modules
+
+
+def _get_vendored_metadata():
+    """Get (archive path, contents) of the vendored packages' metadata (license and version)."""
+    metadata_files = []
+    for package_name in VENDORED_PACKAGES:
+        distribution = importlib.metadata.distribution(package_name)
+        metadata_text = distribution.read_text("METADATA")
+        if metadata_text:
+            dist_info_name = f"{package_name}-{distribution.version}.dist-info"
+            metadata_files.append((f"{dist_info_name}/METADATA", metadata_text.encode("utf-8")))
+    return metadata_files
+
+
+def _write_entry(archive, archive_path, data, compression):
+    """Write one file to the archive with a fixed timestamp."""
+    zip_info = zipfile.ZipInfo(archive_path, date_time=ARCHIVE_DATE_TIME)
+    zip_info.compress_type = compression
+    zip_info.external_attr = 0o644 << 16
+    archive.writestr(zip_info, data)
+
+
+def build_zipapp(entry_point, output_dir=DEFAULT_OUTPUT_DIR, optimize=DEFAULT_OPTIMIZE,
+                 include_source=False, interpreter=DEFAULT_INTERPRETER, compress=False):
+    """
+    Build the zipapp of one entry point.
+    
+    Args:
+        entry_point: One of ZIPAPP_ENTRY_POINTS
+        output_dir: Directory the archive is written to
+        optimize: Bytecode optimization level
+        include_source: Also bundle the .py sources (for tracebacks with source lines)
+        interpreter: Interpreter for the shebang line, or None for no shebang
+        compress: Deflate the archive entries (smaller, slightly slower to start)
+    
+    Returns:
+        str: Path to the archive
+    """
+    module_name, archive_name = ZIPAPP_ENTRY_POINTS[entry_point]
+    compression = zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED
+    os.makedirs(output_dir, exist_ok=True)
+    archive_file_path = os.path.join(output_dir, archive_name)
+    
+    main_source = _MAIN_MODULE_TEMPLATE.format(entry_point=entry_point, module_name=module_name)
+    modules = [(None, "__main__.py", main_source.encode("utf-8"))]
+    for source_path, archive_path in collect_modules():
+        with open(source_path, "rb") as f:
+            modules.append((source_path, archive_path, f.read()))
+    
+    with tempfile.NamedTemporaryFile(dir=output_dir, suffix=".tmp", delete=False) as temp_file:
+        if interpreter:
+            temp_file.write(b"#!" + interpreter.encode("utf-8") + b"\n")
+        with zipfile.ZipFile(temp_file, "w", compression=compression) as archive:
+            for _, archive_path, source_bytes in modules:
+                # zipimport loads "module.pyc" stored next to where "module.py" would be
+                _write_entry(archive, archive_path[:-3] + ".pyc",
+                             compile_to_pyc(source_bytes, archive_path, optimize), compression)
+                if include_source:
+                    _write_entry(archive, archive_path, source_bytes, compression)
+            for archive_path, metadata_bytes in _get_vendored_metadata():
+                _write_entry(archive, archive_path, metadata_bytes, compression)
+    
+    os.chmod(temp_file.name, 0o755)
+    os.replace(temp_file.name, archive_file_path)
+    return archive_file_path
+
+
+def measure_startup_improvement(archive_file_path, input_path, repeats=7):
+    """
+    Compare the cold start of the calculator zipapp with the source tree.
+    
+    The source tree is measured from a clean copy without bytecode caches
+    and with bytecode writing disabled, as in a fresh container, and again
+    with warm bytecode caches.
+    
+    Args:
+        archive_file_path: Path to the calculator zipapp
+        input_path: Input file to calculate
+        repeats: Number of timed runs per variant
+    
+    Returns:
+        dict: Median wall time in milliseconds per variant
+    """
+    with tempfile.TemporaryDirectory() as work_dir:
+        source_copy_dir = os.path.join(work_dir, "source")
+        shutil.copytree(PROJECT_DIR, source_copy_dir,
+                        ignore=shutil.ignore_patterns("__pycache__", "dist", ".git"))
+        run_dir = os.path.join(work_dir, "run")
+        os.makedirs(run_dir)
+        shutil.copy(input_path, os.path.join(run_dir, "dates.txt"))
+        
+        cold_environment = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+        cold_environment.pop("PYTHONPATH", None)
+        source_command = [sys.executable, os.path.join(source_copy_dir, "main.py"), "dates.txt"]
+        results = {
+            "source_cold_ms": measure_command_ms(source_command, repeats, run_dir, cold_environment)
+        }
+        
+        # Warm the bytecode caches once, then measure with them in place
+        warm_environment = dict(cold_environment)
+        del warm_environment["PYTHONDONTWRITEBYTECODE"]
+        measure_command_ms(source_command, 1, run_dir, warm_environment)
+        results["source_warm_ms"] = measure_command_ms(source_command, repeats, run_dir, warm_environment)
+        
+        zipapp_command = [sys.executable, os.path.abspath(archive_file_path), "dates.txt"]
+        results["zipapp_ms"] = measure_command_ms(zipapp_command, repeats, run_dir, cold_environment)
+    
+    results["improvement_vs_cold"] = 1 - results["zipapp_ms"] / results["source_cold_ms"]
+    return results
+
+
+def format_startup_improvement(results):
+    """
+    Format the result of measure_startup_improvement.
+    
+    Returns:
+        str: Human readable report
+    """
+    return "\n".join([
+        f"Source tree, no bytecode cache: {results['source_cold_ms']:8.1f} ms",
+        f"Source tree, warm bytecode:     {results['source_warm_ms']:8.1f} ms",
+        f"Zipapp:                         {results['zipapp_ms']:8.1f} ms",
+        f"Cold start improvement:         {results['improvement_vs_cold']:8.1%}"
+    ])
+
+
+def main(argv=None):
+    """Main entry point for the zipapp build target."""
+    parser = argparse.ArgumentParser(description="Build self-contained zipapps of the Tahara Calculator.")
+    parser.add_argument("--entry-point", choices=("all",) + tuple(ZIPAPP_ENTRY_POINTS), default="all",
+                        help="Entry point to build (default: all)")
+    parser.add_argument("--output-dir", default=DEFAULT_OUTPUT_DIR, help="Output directory (default: dist)")
+    parser.add_argument("--optimize", type=int, choices=(0, 1, 2), default=DEFAULT_OPTIMIZE,
+                        help="Bytecode optimization level (default: 2)")
+    parser.add_argument("--include-source", action="store_true",
+                        help="Also bundle the .py sources, for tracebacks with source lines")
+    parser.add_argument("--python", default=DEFAULT_INTERPRETER,
+                        help=f"Interpreter for the shebang line (default: {DEFAULT_INTERPRETER})")
+    parser.add_argument("--compress", action="store_true", help="Deflate the archive entries")
+    parser.add_argument("--measure", action="store_true",
+                        help="Compare the calculator's cold start with the source tree")
+    parser.add_argument("--measure-input", default=os.path.join(PROJECT_DIR, "tests", "sample_dates.txt"),
+                        help="Input file used by --measure (default: tests/sample_dates.txt)")
+    args = parser.parse_args(argv)
+    
+    entry_points = ZIPAPP_ENTRY_POINTS if args.entry_point == "all" else (args.entry_point,)
+    archive_paths = {}
+    for entry_point in entry_points:
+        archive_paths[entry_point] = build_zipapp(
+            entry_point,
+            output_dir=args.output_dir,
+            optimize=args.optimize,
+            include_source=args.include_source,
+            interpreter=args.python,
+            compress=args.compress
+        )
+        size_kb = os.path.getsize(archive_paths[entry_point]) / 1024
+        print(f"Built {archive_paths[entry_point]} ({size_kb:.1f} KB)")
+    
+    if args.measure:
+        if "calculator" not in archive_paths:
+            parser.error("--measure requires the calculator entry point")
+        results = measure_startup_improvement(archive_paths["calculator"], args.measure_input)
+        print(format_startup_improvement(results))
+
+
+if __name__ == "__main__":
+    main()
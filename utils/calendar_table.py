@@ -0,0 +1,410 @@
+"""
+Shared, memory-mapped Hebrew calendar table for the Tahara Calculator.
+
+This module precomputes the Hebrew calendar for a range of years into a
+compact binary file: for every day ordinal its year, month, day and
+weekday, and for every month its first day ordinal and length. The file
+is memory-mapped read-only, so parallel workers and separate calculator
+runs share one copy of its pages instead of each deriving dates through
+pyluach. A format version, the pyluach version that generated it and a
+CRC-32 checksum are stored in the header; a table that does not match is
+rebuilt.
+
+The table is used by utils.hebrew_calendar_utils once enabled, either by
+setting the TAHARA_CALENDAR_TABLE environment variable to the table path
+(inherited by worker processes) or by calling use_calendar_table().
+"""
+
+import os
+import struct
+import sys
+import threading
+
+from utils.lazy_import import lazy_import
+
+# Only needed once a table is built or mapped, so loaded on first use
+mmap = lazy_import("mmap")
+zlib = lazy_import("zlib")
+tempfile = lazy_import("tempfile")
+
+# pyluach is only needed to build the table and to check its version
+pyluach = lazy_import("pyluach")
+dates = lazy_import("pyluach.dates")
+hebrewcal = lazy_import("pyluach.hebrewcal")
+
+# Environment variable holding the path of the table to use
+CALENDAR_TABLE_ENV = "TAHARA_CALENDAR_TABLE"
+
+# Default location of the table file
+DEFAULT_CALENDAR_TABLE_PATH = os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"),
+    "tahara",
+    "hebrew_calendar.bin"
+)
+
+# Hebrew years covered by default (1839-2240 CE)
+DEFAULT_FIRST_YEAR = 5600
+DEFAULT_LAST_YEAR = 6000
+
+CALENDAR_TABLE_MAGIC = b"THCT"
+CALENDAR_TABLE_FORMAT_VERSION = 1
+
+# Header: magic, format version, first year, year count, first day ordinal,
+# day count, pyluach version, CRC-32 of the sections; padded to 48 bytes
+# so that the sections after it stay aligned
+_HEADER = struct.Struct("<4sHHHIIx16sI")
+_HEADER_SIZE = 48
+
+# Months per year slot in the month sections (month numbers 1-13)
+_MONTH_SLOTS = 13
+
+# Day field layout: day of month in the low 5 bits, weekday (1-7) above it
+_DAY_BITS = 5
+_DAY_MASK = (1 << _DAY_BITS) - 1
+
+
+class CalendarTableError(ValueError):
+    """Raised when a calendar table file is invalid, stale or corrupt."""
+
+
+def _get_generator_version():
+    """Get the version of the calendar implementation the table is derived from."""
+    return f"pyluach {pyluach.__version__}".encode("ascii")[:16]
+
+
+def _get_section_layout(year_count, day_count):
+    """Get (name, typecode, offset, item count) of each section, in file order."""
+    month_count = year_count * _MONTH_SLOTS
+    layout = []
+    offset = _HEADER_SIZE
+    # Widest items first, so every section is aligned to its item size
+    for name, typecode, item_size, item_count in (
+        ("month_first_ordinals", "I", 4, month_count),
+        ("day_years", "H", 2, day_count),
+        ("month_lengths", "B", 1, month_count),
+        ("day_months", "B", 1, day_count),
+        ("day_days", "B", 1, day_count)
+    ):
+        layout.append((name, typecode, offset, item_count))
+        offset += item_size * item_count
+    return layout, offset
+
+
+def build_calendar_table_bytes(first_year=DEFAULT_FIRST_YEAR, last_year=DEFAULT_LAST_YEAR):
+    """
+    Compute the calendar table for a range of Hebrew years.
+    
+    Args:
+        first_year: First Hebrew year covered
+        last_year: Last Hebrew year covered (inclusive)
+    
+    Returns:
+        bytes: Contents of the table file
+    """
+    if not 1 <= first_year <= last_year < 1 << 16:
+        raise ValueError(f"Invalid year range: {first_year}-{last_year}")
+    year_count = last_year - first_year + 1
+    
+    def get_first_ordinal(year, month):
+        return int(dates.HebrewDate(year, month, 1).jd + .5)
+    
+    first_ordinal = get_first_ordinal(first_year, 7)
+    day_count = get_first_ordinal(last_year + 1, 7) - first_ordinal
+    month_first_ordinals = [0] * (year_count * _MONTH_SLOTS)
+    month_lengths = bytearray(year_count * _MONTH_SLOTS)
+    day_years = [0] * day_count
+    day_months = bytearray(day_count)
+    day_days = bytearray(day_count)
+    
+    for year in range(first_year, last_year + 1):
+        # Months in calendar order (Tishrei first), then the next year's Tishrei
+        month_numbers = [month.month for month in hebrewcal.Year(year).itermonths()]
+        month_starts = [get_first_ordinal(year, month) for month in month_numbers]
+        month_starts.append(get_first_ordinal(year + 1, 7))
+        for month_index, month in enumerate(month_numbers):
+            month_slot = (year - first_year) * _MONTH_SLOTS + month - 1
+            month_start = month_starts[month_index]
+            month_length = month_starts[month_index + 1] - month_start
+            month_first_ordinals[month_slot] = month_start
+            month_lengths[month_slot] = month_length
+            for day in range(1, month_length + 1):
+                ordinal = month_start + day - 1
+                day_index = ordinal - first_ordinal
+                day_years[day_index] = year
+                day_months[day_index] = month
+                # Same weekday numbering as HebrewDate.weekday(): Sunday = 1
+                day_days[day_index] = day | ((ordinal + 1) % 7 + 1) << _DAY_BITS
+    
+    sections = (
+        struct.pack(f"<{len(month_first_ordinals)}I", *month_first_ordinals)
+        + struct.pack(f"<{day_count}H", *day_years)
+        + bytes(month_lengths)
+        + bytes(day_months)
+        + bytes(day_days)
+    )
+    header = _HEADER.pack(
+        CALENDAR_TABLE_MAGIC,
+        CALENDAR_TABLE_FORMAT_VERSION,
+        first_year,
+        year_count,
+        first_ordinal,
+        day_count,
+        _get_generator_version(),
+        zlib.crc32(sections)
+    )
+    return header.ljust(_HEADER_SIZE, b"\0") + sections
+
+
+def write_calendar_table(path=DEFAULT_CALENDAR_TABLE_PATH, first_year=DEFAULT_FIRST_YEAR,
+                         last_year=DEFAULT_LAST_YEAR):
+    """
+    Build the calendar table and atomically write it to a file.
+    
+    Processes that mapped a previous version of the file keep reading it
+    until they reopen the path.
+    
+    Args:
+        path: Path to the table file
+        first_year: First Hebrew year covered
+        last_year: Last Hebrew year covered (inclusive)
+    
+    Returns:
+        str: Path to the table file
+    """
+    table_bytes = build_calendar_table_bytes(first_year, last_year)
+    target_dir = os.path.dirname(os.path.abspath(path))
+    os.makedirs(target_dir, exist_ok=True)
+    temp_fd, temp_path = tempfile.mkstemp(dir=target_dir, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(temp_fd, "wb") as f:
+            f.write(table_bytes)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
+    return path
+
+
+class HebrewCalendarTable:
+    """Read-only view of a memory-mapped calendar table file."""
+    
+    def __init__(self, path, verify=True):
+        """
+        Map a table file.
+        
+        Args:
+            path: Path to the table file
+            verify: Check the sections' CRC-32 (reads every page once)
+        
+        Raises:
+            CalendarTableError: If the file is not a current, intact table
+            OSError: If the file cannot be opened
+        """
+        if sys.byteorder != "little":
+            raise CalendarTableError("calendar tables can only be mapped on little-endian hosts")
+        self.path = path
+        with open(path, "rb") as f:
+            try:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError as e:
+                raise CalendarTableError(f"{path} is empty") from e
+        try:
+            self._load(verify)
+        except BaseException:
+            self._mmap.close()
+            raise
+    
+    def _load(self, verify):
+        """Check the header and create typed views of the sections."""
+        if len(self._mmap) < _HEADER_SIZE:
+            raise CalendarTableError(f"{self.path} is too short")
+        (magic, format_version, self.first_year, self.year_count, self.first_ordinal,
+         self.day_count, generator_version, checksum) = _HEADER.unpack_from(self._mmap)
+        if magic != CALENDAR_TABLE_MAGIC:
+            raise CalendarTableError(f"{self.path} is not a calendar table")
+        if format_version != CALENDAR_TABLE_FORMAT_VERSION:
+            raise CalendarTableError(f"{self.path} has format version {format_version}")
+        self.generator_version = generator_version.rstrip(b"\0").decode("ascii", "replace")
+        if generator_version.rstrip(b"\0") != _get_generator_version():
+            raise CalendarTableError(f"{self.path} was built with {self.generator_version}")
+        
+        layout, table_size = _get_section_layout(self.year_count, self.day_count)
+        if len(self._mmap) != table_size:
+            raise CalendarTableError(f"{self.path} has {len(self._mmap)} bytes, expected {table_size}")
+        table_view = memoryview(self._mmap)
+        if verify and zlib.crc32(table_view[_HEADER_SIZE:]) != checksum:
+            table_view.release()
+            raise CalendarTableError(f"{self.path} failed its checksum")
+        self._views = [table_view]
+        for name, typecode, offset, item_count in layout:
+            item_size = struct.calcsize(typecode)
+            section_view = table_view[offset:offset + item_size * item_count].cast(typecode)
+            self._views.append(section_view)
+            setattr(self, f"_{name}", section_view)
+        self.last_year = self.first_year + self.year_count - 1
+    
+    def has_ordinal(self, ordinal) -> bool:
+        """Check whether a day ordinal is covered by the table."""
+        return 0 <= ordinal - self.first_ordinal < self.day_count
+    
+    def has_year(self, year) -> bool:
+        """Check whether a Hebrew year is covered by the table."""
+        return self.first_year <= year <= self.last_year
+    
+    def ordinal_to_date(self, ordinal):
+        """
+        Get the Hebrew date of a day ordinal.
+        
+        Args:
+            ordinal: Day ordinal (see get_day_ordinal)
+        
+        Returns:
+            tuple: (year, month, day, weekday), weekday 1 = Sunday
+        
+        Raises:
+            IndexError: If the ordinal is not covered by the table
+        """
+        day_index = ordinal - self.first_ordinal
+        if not 0 <= day_index < self.day_count:
+            raise IndexError(f"Day ordinal {ordinal} is not covered by the calendar table")
+        day_field = self._day_days[day_index]
+        return (
+            self._day_years[day_index],
+            self._day_months[day_index],
+            day_field & _DAY_MASK,
+            day_field >> _DAY_BITS
+        )
+    
+    def _get_month_slot(self, year, month):
+        """Get the month sections' index of a month, raising IndexError for unknown months."""
+        if not self.has_year(year) or not 1 <= month <= _MONTH_SLOTS:
+            raise IndexError(f"Month {month}/{year} is not covered by the calendar table")
+        month_slot = (year - self.first_year) * _MONTH_SLOTS + month - 1
+        if not self._month_lengths[month_slot]:
+            raise IndexError(f"Year {year} has no month {month}")
+        return month_slot
+    
+    def date_to_ordinal(self, year, month, day) -> int:
+        """
+        Get the day ordinal of a Hebrew date.
+        
+        Args:
+            year: Hebrew year
+            month: Hebrew month (1 = Nisan, 13 = Adar II)
+            day: Day of the month
+        
+        Returns:
+            int: Day ordinal
+        
+        Raises:
+            IndexError: If the date is not covered by the table
+        """
+        month_slot = self._get_month_slot(year, month)
+        if not 1 <= day <= self._month_lengths[month_slot]:
+            raise IndexError(f"Month {month}/{year} has no day {day}")
+        return self._month_first_ordinals[month_slot] + day - 1
+    
+    def month_length(self, year, month) -> int:
+        """
+        Get the number of days in a Hebrew month.
+        
+        Raises:
+            IndexError: If the month is not covered by the table
+        """
+        return self._month_lengths[self._get_month_slot(year, month)]
+    
+    def weekday(self, ordinal) -> int:
+        """Get the weekday (1 = Sunday) of a day ordinal."""
+        return self.ordinal_to_date(ordinal)[3]
+    
+    def close(self):
+        """Unmap the file (lookups fail afterwards)."""
+        for section_view in reversed(self._views):
+            section_view.release()
+        self._views = []
+        self._mmap.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def load_calendar_table(path=DEFAULT_CALENDAR_TABLE_PATH, first_year=DEFAULT_FIRST_YEAR,
+                        last_year=DEFAULT_LAST_YEAR, verify=True):
+    """
+    Map a calendar table, (re)building it first if it is missing or stale.
+    
+    Args:
+        path: Path to the table file
+        first_year: First Hebrew year of a rebuilt table
+        last_year: Last Hebrew year of a rebuilt table
+        verify: Check the checksum of an existing table
+    
+    Returns:
+        HebrewCalendarTable: The mapped table
+    """
+    try:
+        return HebrewCalendarTable(path, verify)
+    except (CalendarTableError, FileNotFoundError):
+        write_calendar_table(path, first_year, last_year)
+        return HebrewCalendarTable(path, verify=False)
+
+
+# Table used by the calendar utilities, or None
+_calendar_table = None
+_calendar_table_initialized = False
+_calendar_table_lock = threading.Lock()
+
+
+def get_calendar_table():
+    """
+    Get the calendar table used by the calendar utilities.
+    
+    On first use, the table named by the TAHARA_CALENDAR_TABLE environment
+    variable is mapped (and built if missing or stale).
+    
+    Returns:
+        HebrewCalendarTable: The table, or None if no table is enabled
+    """
+    if _calendar_table_initialized:
+        return _calendar_table
+    with _calendar_table_lock:
+        if not _calendar_table_initialized:
+            table_path = os.environ.get(CALENDAR_TABLE_ENV)
+            _set_calendar_table(load_calendar_table(table_path) if table_path else None)
+        return _calendar_table
+
+
+def _set_calendar_table(calendar_table):
+    """Set the table used by the calendar utilities."""
+    global _calendar_table, _calendar_table_initialized
+    _calendar_table = calendar_table
+    _calendar_table_initialized = True
+
+
+def use_calendar_table(path=DEFAULT_CALENDAR_TABLE_PATH, export=True):
+    """
+    Enable a calendar table for this process (and, by default, its workers).
+    
+    Args:
+        path: Path to the table file (built if missing or stale), or None to disable the table
+        export: Also set TAHARA_CALENDAR_TABLE so worker processes map the same file
+    
+    Returns:
+        HebrewCalendarTable: The enabled table, or None
+    """
+    calendar_table = load_calendar_table(path) if path else None
+    with _calendar_table_lock:
+        _set_calendar_table(calendar_table)
+    if export:
+        if path:
+            os.environ[CALENDAR_TABLE_ENV] = os.path.abspath(path)
+        else:
+            os.environ.pop(CALENDAR_TABLE_ENV, None)
+    return calendar_table
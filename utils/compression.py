@@ -0,0 +1,206 @@
+"""
+Transparent compression support for the Tahara Calculator.
+
+This module detects gzip, bz2 and xz files by extension or magic bytes
+and streams them through the standard library codecs, so compressed
+archives are read and written without extracting them to disk.
+"""
+
+import bz2
+import gzip
+import lzma
+import os
+import queue
+import threading
+
+# Codec modules by compression name
+COMPRESSION_CODECS = {
+    "gzip": gzip,
+    "bz2": bz2,
+    "xz": lzma
+}
+
+# File extensions of compressed files
+COMPRESSION_EXTENSIONS = {
+    ".gz": "gzip",
+    ".gzip": "gzip",
+    ".bz2": "bz2",
+    ".xz": "xz",
+    ".lzma": "xz"
+}
+
+# Leading bytes of compressed files
+COMPRESSION_MAGIC_BYTES = {
+    b"\x1f\x8b": "gzip",
+    b"BZh": "bz2",
+    b"\xfd7zXZ\x00": "xz"
+}
+
+# Errors raised when reading corrupt or truncated compressed data
+DECOMPRESSION_ERRORS = (OSError, EOFError, lzma.LZMAError)
+
+# Approximate number of characters read per batch by the background reader
+READER_BATCH_SIZE = 1 << 16
+
+
+def get_compression_by_extension(file_path):
+    """
+    Get the compression implied by a file's extension.
+    
+    Args:
+        file_path: Path to the file
+    
+    Returns:
+        str: Compression name, or None for uncompressed files
+    """
+    extension = os.path.splitext(file_path)[1].lower()
+    return COMPRESSION_EXTENSIONS.get(extension)
+
+
+def detect_compression(file_path):
+    """
+    Detect the compression of an existing file by extension or magic bytes.
+    
+    Args:
+        file_path: Path to the file
+    
+    Returns:
+        str: Compression name, or None for uncompressed files
+    """
+    compression = get_compression_by_extension(file_path)
+    if compression:
+        return compression
+    
+    with open(file_path, "rb") as f:
+        file_header = f.read(max(len(magic) for magic in COMPRESSION_MAGIC_BYTES))
+    for magic, compression in COMPRESSION_MAGIC_BYTES.items():
+        if file_header.startswith(magic):
+            return compression
+    return None
+
+
+def open_text_file(file_path, mode="r", encoding="utf-8", compression=None):
+    """
+    Open a possibly compressed file in text mode.
+    
+    Args:
+        file_path: Path to the file
+        mode: "r" to read or "w" to write
+        encoding: Text encoding
+        compression: Compression name, detected from the file when None
+    
+    Returns:
+        A text stream
+    """
+    if compression is None:
+        if "r" in mode:
+            compression = detect_compression(file_path)
+        else:
+            compression = get_compression_by_extension(file_path)
+    
+    if compression is None:
+        return open(file_path, mode, encoding=encoding)
+    return COMPRESSION_CODECS[compression].open(file_path, mode + "t", encoding=encoding)
+
+
+def open_binary_file(file_path, compression=None):
+    """
+    Open a possibly compressed file for reading its decompressed bytes.
+    
+    Args:
+        file_path: Path to the file
+        compression: Compression name, detected from the file when None
+    
+    Returns:
+        A readable binary stream
+    """
+    if compression is None:
+        compression = detect_compression(file_path)
+    if compression is None:
+        return open(file_path, "rb")
+    return COMPRESSION_CODECS[compression].open(file_path, "rb")
+
+
+def wrap_binary_stream(binary_stream, compression):
+    """
+    Wrap a writable binary stream with a compressor.
+    
+    Gzip output leaves out the file name and timestamp, so identical
+    content always compresses to identical bytes.
+    
+    Args:
+        binary_stream: Writable binary stream
+        compression: Compression name, or None to return the stream as-is
+    
+    Returns:
+        A writable binary stream
+    """
+    if compression is None:
+        return binary_stream
+    if compression == "gzip":
+        return gzip.GzipFile(filename="", mode="wb", fileobj=binary_stream, mtime=0)
+    return COMPRESSION_CODECS[compression].open(binary_stream, "wb")
+
+
+def iter_text_lines(file_path, encoding="utf-8"):
+    """
+    Iterate over the lines of a possibly compressed text file.
+    
+    Compressed files are decompressed by a background reader thread, so
+    decompression overlaps with whatever the caller does with each line.
+    
+    Args:
+        file_path: Path to the file
+        encoding: Text encoding
+    
+    Yields:
+        str: Lines of the file
+    """
+    compression = detect_compression(file_path)
+    if compression is None:
+        with open(file_path, "r", encoding=encoding) as f:
+            yield from f
+        return
+    
+    yield from _iter_lines_in_background(file_path, encoding, compression)
+
+
+def _iter_lines_in_background(file_path, encoding, compression):
+    """Decompress a file in a background thread and yield its lines."""
+    line_batches = queue.Queue(maxsize=4)
+    stop_event = threading.Event()
+    
+    def put(item):
+        while not stop_event.is_set():
+            try:
+                line_batches.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+    
+    def read_batches():
+        try:
+            with open_text_file(file_path, "r", encoding, compression) as f:
+                while True:
+                    line_batch = f.readlines(READER_BATCH_SIZE)
+                    if not line_batch or not put(line_batch):
+                        break
+            put(None)
+        except BaseException as error:
+            # Any error must end the consumer's wait, e.g. an unknown encoding
+            put(error)
+    
+    reader_thread = threading.Thread(target=read_batches, daemon=True)
+    reader_thread.start()
+    try:
+        while True:
+            line_batch = line_batches.get()
+            if line_batch is None:
+                break
+            if isinstance(line_batch, BaseException):
+                raise line_batch
+            yield from line_batch
+    finally:
+        stop_event.set()
+        reader_thread.join()
@@ -5,25 +5,24 @@ This module provides functions to convert between Gregorian and Hebrew dates,
 making it easier for users to input dates in familiar formats.
 """
 
-import sys
-import os
+from __future__ import annotations
+
 from datetime import datetime
 from typing import Optional, Tuple
 
-# Add the parent directory to the Python path
-parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-if parent_dir not in sys.path:
-    sys.path.insert(0, parent_dir)
+from utils.lazy_import import lazy_import
 
-from pyluach import dates
+# pyluach is loaded on first use to keep startup fast
+dates = lazy_import("pyluach.dates")
 
 
-def convert_gregorian_to_hebrew(gregorian_date_str: str) -> Optional[dates.HebrewDate]:
+def convert_gregorian_to_hebrew(gregorian_date_str: str, report_error=print) -> Optional[dates.HebrewDate]:
     """
     Convert a Gregorian date string to Hebrew date.
     
     Args:
         gregorian_date_str: Date string in format "DD/MM/YYYY", "DD-MM-YYYY", or "YYYY-MM-DD"
+        report_error: Called with the error message when conversion fails (default: print)
         
     Returns:
         HebrewDate object or None if conversion failed
@@ -53,7 +52,7 @@ def convert_gregorian_to_hebrew(gregorian_date_str: str) -> Optional[dates.Hebre
         return hebrew_date
         
     except (ValueError, IndexError) as e:
-        print(f"Error converting date '{gregorian_date_str}': {e}")
+        report_error(f"Error converting date '{gregorian_date_str}': {e}")
         return None
 
 
@@ -71,12 +70,13 @@ def format_hebrew_date_for_input(hebrew_date: dates.HebrewDate, time_of_day: int
     return f"{hebrew_date.day}/{hebrew_date.month}/{hebrew_date.year} {time_of_day}"
 
 
-def parse_mixed_date_input(date_input: str) -> Optional[Tuple[dates.HebrewDate, int]]:
+def parse_mixed_date_input(date_input: str, report_error=print) -> Optional[Tuple[dates.HebrewDate, int]]:
     """
     Parse date input that could be either Hebrew or Gregorian format.
     
     Args:
         date_input: Date string with time_of_day (e.g., "15/03/2024 1", "8/12/5785 0", or "today 1")
+        report_error: Called with the error message when parsing fails (default: print)
         
     Returns:
         Tuple of (HebrewDate, time_of_day) or None if parsing failed
@@ -110,14 +110,14 @@ def parse_mixed_date_input(date_input: str) -> Optional[Tuple[dates.HebrewDate,
             pass
         
         # Try to parse as Gregorian date
-        hebrew_date = convert_gregorian_to_hebrew(date_part)
+        hebrew_date = convert_gregorian_to_hebrew(date_part, report_error)
         if hebrew_date:
             return hebrew_date, time_of_day
         
         return None
         
     except (ValueError, IndexError) as e:
-        print(f"Error parsing mixed date input '{date_input}': {e}")
+        report_error(f"Error parsing mixed date input '{date_input}': {e}")
         return None
 
 
@@ -7,59 +7,106 @@ This module handles reading input files and exporting results.
 import os
 import sys
 
-# Add the parent directory to the Python path
-parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-if parent_dir not in sys.path:
-    sys.path.insert(0, parent_dir)
+from config.config_snapshot import get_config_snapshot
+from utils.formatters import write_output_blocks
+from utils.output_writer import BatchOutputWriter, WRITE_CANCELLED, WRITE_UNCHANGED
+from utils.compression import get_compression_by_extension, iter_text_lines, DECOMPRESSION_ERRORS
 
-from config.config_db import get_config
+# Output path meaning "write to standard output"
+STDOUT_PATH = "-"
 
 
-def read_periods_list_file(file_path: str):
+def read_periods_list_file(file_path: str, config=None):
     """
     Read dates from file and return list of date strings.
+    Compressed files (gzip, bz2, xz) are decompressed on the fly.
     
     Args:
         file_path: Path to the input file containing period dates
+        config: ConfigSnapshot (default: the global snapshot)
         
     Returns:
         list: List of date strings, or None if file couldn't be read
     """
-    config = get_config()
-    encoding = config.get_encoding()
+    config = config or get_config_snapshot()
+    encoding = config.encoding
     
     try:
         if os.path.isfile(file_path):
-            with open(file_path, "r", encoding=encoding) as f:
-                date_list = f.readlines()
-            return [line.strip() for line in date_list if line.strip()]
+            return list(iter_periods_list_file(file_path, encoding))
         return None
-    except (IOError, OSError) as e:
+    except DECOMPRESSION_ERRORS as e:
         print(f"Error reading file {file_path}: {e}")
         return None
 
 
-def export_results(file_name, lines):
+def iter_periods_list_file(file_path: str, encoding: str = "utf-8"):
+    """
+    Lazily read dates from a possibly compressed file.
+    
+    Args:
+        file_path: Path to the input file containing period dates
+        encoding: Text encoding of the file
+        
+    Yields:
+        str: Non-empty date strings
+    """
+    for line in iter_text_lines(file_path, encoding):
+        line = line.strip()
+        if line:
+            yield line
+
+
+def find_input_files(paths):
+    """
+    Expand directories into the user input files they contain.
+    
+    Args:
+        paths: Input file and directory paths
+    
+    Returns:
+        list: Input file paths; directories contribute their .txt files (possibly compressed)
+    """
+    input_file_paths = []
+    for path in paths:
+        if not os.path.isdir(path):
+            input_file_paths.append(path)
+            continue
+        for file_name in sorted(os.listdir(path)):
+            file_path = os.path.join(path, file_name)
+            base_name = os.path.splitext(file_name)[0] if get_compression_by_extension(file_name) else file_name
+            if os.path.isfile(file_path) and base_name.lower().endswith(".txt"):
+                input_file_paths.append(file_path)
+    return input_file_paths
+
+
+def export_results(file_name, lines, config=None):
     """
     Export results to a file.
     
     Args:
-        file_name: Name of the output file
-        lines: List of lines to write to the file
+        file_name: Name of the output file, or "-" for standard output
+        lines: Iterable of lines or blocks to write to the file
+        config: ConfigSnapshot (default: the global snapshot)
     """
-    config = get_config()
-    encoding = config.get_encoding()
+    config = config or get_config_snapshot()
+    encoding = config.encoding
+    
+    if file_name == STDOUT_PATH:
+        sys.stdout.flush()
+        stdout_stream = getattr(sys.stdout, "buffer", sys.stdout)
+        write_output_blocks(stdout_stream, lines, encoding)
+        stdout_stream.flush()
+        return
     
     try:
-        # Check if file exists and user wants confirmation
-        if os.path.exists(file_name) and config.get("interface.confirm_overwrite", True):
-            response = input(f"File '{file_name}' already exists. Overwrite? (y/N): ")
-            if response.lower() not in ['y', 'yes']:
-                print("Export cancelled.")
-                return
-        
-        with open(file_name, "w", encoding=encoding) as f:
-            f.writelines(lines)
-        print(f"Results exported to {file_name}")
+        # Write atomically, honoring the configured overwrite policy
+        write_status = BatchOutputWriter.from_config(config).write(file_name, lines)
+        if write_status == WRITE_CANCELLED:
+            print("Export cancelled.")
+        elif write_status == WRITE_UNCHANGED:
+            print(f"Results in {file_name} are unchanged")
+        else:
+            print(f"Results exported to {file_name}")
     except (IOError, OSError) as e:
         print(f"Error writing to file {file_name}: {e}")
@@ -0,0 +1,192 @@
+"""
+File change watching for the Tahara Calculator.
+
+This module waits for changes of a single file, using Linux inotify
+(through ctypes, so no extra package is needed) and falling back to
+polling the file's inode, size and modification time elsewhere. Bursts
+of changes, such as several appends in a row, are debounced into a
+single notification.
+"""
+
+import os
+import select
+import struct
+import time
+
+from utils.lazy_import import lazy_import
+
+# Only needed for the inotify backend
+ctypes = lazy_import("ctypes")
+ctypes_util = lazy_import("ctypes.util")
+
+# Seconds the file must stay quiet before a change is reported
+DEFAULT_DEBOUNCE = 0.3
+
+# Longest a burst of changes can postpone the notification, in seconds
+MAX_DEBOUNCE_WAIT = 5.0
+
+# Seconds between file checks of the polling backend
+DEFAULT_POLL_INTERVAL = 1.0
+
+# inotify event masks (linux/inotify.h); the directory is watched so that
+# files replaced by a rename are followed too
+_IN_MODIFY = 0x002
+_IN_CLOSE_WRITE = 0x008
+_IN_MOVED_FROM = 0x040
+_IN_MOVED_TO = 0x080
+_IN_CREATE = 0x100
+_IN_DELETE = 0x200
+_INOTIFY_WATCH_MASK = _IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE
+_INOTIFY_EVENT_HEADER = struct.Struct("iIII")
+_INOTIFY_READ_SIZE = 64 * 1024
+
+
+def get_file_signature(file_path):
+    """
+    Get the identity of a file's current contents.
+    
+    Args:
+        file_path: Path to the file
+    
+    Returns:
+        tuple: (inode, size, modification time in ns), or None if the file does not exist
+    """
+    try:
+        file_stat = os.stat(file_path)
+    except OSError:
+        return None
+    return (file_stat.st_ino, file_stat.st_size, file_stat.st_mtime_ns)
+
+
+def _open_inotify(directory):
+    """Create an inotify instance watching a directory, or return None if unavailable."""
+    if not hasattr(os, "O_NONBLOCK") or not os.path.isdir(directory):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes_util.find_library("c"), use_errno=True)
+        inotify_fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+    except (OSError, AttributeError):
+        return None
+    if inotify_fd < 0:
+        return None
+    if libc.inotify_add_watch(inotify_fd, os.fsencode(directory), _INOTIFY_WATCH_MASK) < 0:
+        os.close(inotify_fd)
+        return None
+    return inotify_fd
+
+
+def _parse_inotify_names(buffer):
+    """Get the file names of the events in an inotify read buffer."""
+    names = []
+    offset = 0
+    while offset + _INOTIFY_EVENT_HEADER.size <= len(buffer):
+        _, _, _, name_length = _INOTIFY_EVENT_HEADER.unpack_from(buffer, offset)
+        offset += _INOTIFY_EVENT_HEADER.size
+        names.append(buffer[offset:offset + name_length].rstrip(b"\0"))
+        offset += name_length
+    return names
+
+
+class FileChangeWatcher:
+    """Waits for debounced changes of one file."""
+    
+    def __init__(self, file_path, debounce=DEFAULT_DEBOUNCE, poll_interval=DEFAULT_POLL_INTERVAL,
+                 use_inotify=True):
+        """
+        Initialize the watcher.
+        
+        Args:
+            file_path: Path to the watched file
+            debounce: Seconds the file must stay quiet before a change is reported
+            poll_interval: Seconds between file checks when polling
+            use_inotify: Use inotify where available (otherwise always poll)
+        """
+        self.file_path = os.path.abspath(file_path)
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self._file_name = os.fsencode(os.path.basename(self.file_path))
+        self._inotify_fd = _open_inotify(os.path.dirname(self.file_path)) if use_inotify else None
+        self._file_signature = get_file_signature(self.file_path)
+        self._polled_signature = self._file_signature
+    
+    @property
+    def backend(self):
+        """Get the name of the change detection backend ("inotify" or "polling")."""
+        return "inotify" if self._inotify_fd is not None else "polling"
+    
+    def _wait_for_inotify_event(self, timeout):
+        """Wait up to timeout seconds for an event of the watched file."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = None if deadline is None else max(deadline - time.monotonic(), 0)
+            ready, _, _ = select.select([self._inotify_fd], [], [], remaining)
+            if not ready:
+                return False
+            try:
+                buffer = os.read(self._inotify_fd, _INOTIFY_READ_SIZE)
+            except BlockingIOError:
+                continue
+            if self._file_name in _parse_inotify_names(buffer):
+                return True
+    
+    def _wait_for_polled_change(self, timeout):
+        """Poll up to timeout seconds for a change of the file's signature."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            file_signature = get_file_signature(self.file_path)
+            if file_signature != self._polled_signature:
+                self._polled_signature = file_signature
+                return True
+            remaining = self.poll_interval if deadline is None else deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            time.sleep(min(self.poll_interval, remaining))
+    
+    def _wait_for_event(self, timeout):
+        """Wait up to timeout seconds (None: forever) for any change of the file."""
+        if self._inotify_fd is not None:
+            return self._wait_for_inotify_event(timeout)
+        return self._wait_for_polled_change(timeout)
+    
+    def wait_for_change(self, timeout=None) -> bool:
+        """
+        Wait until the file changed and then stayed quiet for the debounce time.
+        
+        Args:
+            timeout: Seconds to wait for the first change (default: forever)
+        
+        Returns:
+            bool: True if the file's contents changed, False on timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return False
+            if not self._wait_for_event(remaining):
+                return False
+            
+            # Let a burst of writes finish before reporting it as one change
+            burst_deadline = time.monotonic() + MAX_DEBOUNCE_WAIT
+            while time.monotonic() < burst_deadline:
+                if not self._wait_for_event(min(self.debounce, burst_deadline - time.monotonic())):
+                    break
+            
+            # Events can be spurious (e.g. a write of identical size and time), so compare signatures
+            file_signature = get_file_signature(self.file_path)
+            if file_signature != self._file_signature:
+                self._file_signature = file_signature
+                self._polled_signature = file_signature
+                return True
+    
+    def close(self):
+        """Release the inotify instance."""
+        if self._inotify_fd is not None:
+            os.close(self._inotify_fd)
+            self._inotify_fd = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -4,15 +4,18 @@ Output formatting utilities for the Tahara Calculator.
 This module handles formatting and displaying calculation results.
 """
 
+import io
 import sys
-import os
+import threading
+from collections import OrderedDict
 
-# Add the parent directory to the Python path
-parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-if parent_dir not in sys.path:
-    sys.path.insert(0, parent_dir)
+from config.config_snapshot import get_config_snapshot
+from utils.hebrew_calendar_utils import get_day_ordinal
+from utils.lazy_import import lazy_import
+from utils.metrics import get_metrics
 
-from config.config_db import get_config
+# Only needed when the cycle intervals section shows statistics
+interval_statistics = lazy_import("utils.interval_statistics")
 
 # Hebrew text mappings
 TIME_OF_DAY_DICT = {0: "ליל", 1: "יום"}
@@ -26,89 +29,453 @@ WEEKDAY_DICT = {
     7: "שבת"
 }
 
+# Widest histogram bar in the cycle interval statistics, in characters
+HISTOGRAM_BAR_WIDTH = 40
 
-def format_output_lines(periods_indexed_by_date, historical_cycle_intervals):
+
+class HebrewDateRenderCache:
+    """Bounded LRU cache of rendered Hebrew date fragments keyed by day ordinal."""
+    
+    def __init__(self, max_size=4096):
+        """
+        Initialize the render cache.
+        
+        Args:
+            max_size: Maximum number of days kept in the cache
+        """
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get_entry(self, hebrew_date):
+        """Get (date string, weekday name, night fragment, day fragment) for a date."""
+        ordinal = get_day_ordinal(hebrew_date)
+        with self._lock:
+            entry = self._entries.get(ordinal)
+            if entry is not None:
+                self._entries.move_to_end(ordinal)
+                self.hits += 1
+                return entry
+        
+        date_string = hebrew_date.hebrew_date_string()
+        weekday_name = WEEKDAY_DICT[hebrew_date.weekday()]
+        entry = (date_string, weekday_name) + tuple(
+            f"{date_string} ב{TIME_OF_DAY_DICT[time_of_day]} {weekday_name}"
+            for time_of_day in (0, 1)
+        )
+        with self._lock:
+            self.misses += 1
+            self._entries[ordinal] = entry
+            if len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return entry
+
+    def date_string(self, hebrew_date):
+        """Get the Hebrew date string of a date."""
+        return self._get_entry(hebrew_date)[0]
+
+    def weekday_name(self, hebrew_date):
+        """Get the Hebrew weekday name of a date."""
+        return self._get_entry(hebrew_date)[1]
+
+    def onah_string(self, hebrew_date, time_of_day):
+        """Get the "<date> ב<time of day> <weekday>" fragment of an onah."""
+        return self._get_entry(hebrew_date)[2 + time_of_day]
+
+    def clear(self):
+        """Remove all cached entries and reset the statistics."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+# Global render cache shared by all formatting code
+date_render_cache = HebrewDateRenderCache()
+get_metrics().register_cache("hebrew_date_render", date_render_cache)
+
+
+def get_date_render_cache() -> HebrewDateRenderCache:
+    """Get the global Hebrew date render cache."""
+    return date_render_cache
+
+
+def _get_period_block_key(period_date, current_period, show_hebrew_dates, output_separator):
+    """
+    Get the key of a calculated period's rendered block.
+    
+    A period's forbidden days are determined by its onah, its cycle
+    interval and the unbroken intervals that apply to it, so these and
+    the output settings determine its block.
+    
+    Returns:
+        tuple: Hashable block key
+    """
+    forbidden_days_list = current_period.forbidden_days_list
+    unbroken_intervals = ()
+    for forbidden_day in forbidden_days_list:
+        if isinstance(forbidden_day, (list, tuple)):
+            unbroken_intervals = tuple(unbroken_pattern.restriction_name for unbroken_pattern in forbidden_day)
+    return (
+        get_day_ordinal(period_date),
+        current_period.time_of_day,
+        current_period.cycle_interval,
+        unbroken_intervals,
+        # Guards against periods whose forbidden days were not calculated yet
+        len(forbidden_days_list),
+        show_hebrew_dates,
+        output_separator
+    )
+
+
+class PeriodBlockCache:
+    """Bounded LRU cache of rendered period blocks keyed by the period's calculation inputs."""
+    
+    def __init__(self, max_size=4096):
+        """
+        Initialize the block cache.
+        
+        Args:
+            max_size: Maximum number of period blocks kept in the cache (0 disables caching)
+        """
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get_lines(self, period_date, current_period, config, render_cache=None):
+        """
+        Get the output lines of a calculated period, formatting them only on a cache miss.
+        
+        Args:
+            period_date: Hebrew date of the period
+            current_period: The period, with the forbidden days calculated for it
+            config: ConfigSnapshot
+            render_cache: HebrewDateRenderCache used on a miss (default: the global render cache)
+        
+        Returns:
+            tuple: Formatted output lines for the period
+        """
+        output_separator = config.date_separator
+        if not self.max_size:
+            return tuple(
+                _format_period_lines(period_date, current_period, config, output_separator, render_cache=render_cache)
+            )
+        key = _get_period_block_key(period_date, current_period, config.show_hebrew_dates, output_separator)
+        with self._lock:
+            period_lines = self._entries.get(key)
+            if period_lines is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return period_lines
+        
+        period_lines = tuple(
+            _format_period_lines(period_date, current_period, config, output_separator, render_cache=render_cache)
+        )
+        with self._lock:
+            self.misses += 1
+            self._entries[key] = period_lines
+            if len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return period_lines
+    
+    def clear(self):
+        """Remove all cached blocks and reset the statistics."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+# Global block cache shared by all formatting code
+period_block_cache = PeriodBlockCache()
+get_metrics().register_cache("period_block_render", period_block_cache)
+
+
+def get_period_block_cache() -> PeriodBlockCache:
+    """Get the global period block cache."""
+    return period_block_cache
+
+
+def format_output_lines(periods_indexed_by_date, historical_cycle_intervals, config=None,
+                        block_cache=None):
     """
     Format the calculation results into output lines.
     
+    Periods whose blocks are already in the block cache are not
+    formatted again.
+    
     Args:
         periods_indexed_by_date: Dictionary of periods indexed by Hebrew date
         historical_cycle_intervals: List of historical cycle intervals
+        config: ConfigSnapshot (default: the global snapshot)
+        block_cache: PeriodBlockCache (default: the global block cache)
         
     Returns:
         list: Formatted output lines ready for display or export
     """
-    config = get_config()
-    output_separator = config.get_date_separator()
+    config = config or get_config_snapshot()
+    output_separator = config.date_separator
+    block_cache = block_cache or period_block_cache
     
     output_content_lines = []
     
     # Add cycle intervals if configured to show them
-    if config.get("output.show_cycle_intervals", True):
-        output_content_lines.append(f"רשימת הפלגות:\n{historical_cycle_intervals}\n{output_separator}\n")
+    if config.show_cycle_intervals:
+        output_content_lines.append(
+            format_cycle_intervals_block(historical_cycle_intervals, output_separator, config.cycle_intervals_format)
+        )
+
+    for period_date, current_period in periods_indexed_by_date.items():
+        output_content_lines.extend(block_cache.get_lines(period_date, current_period, config))
+    
+    return output_content_lines
 
-    for period_date in periods_indexed_by_date:
-        current_period = periods_indexed_by_date[period_date]
+
+def format_output_blocks(periods_indexed_by_date, historical_cycle_intervals, config=None,
+                         render_cache=None, block_cache=None):
+    """
+    Lazily format the calculation results into output blocks.
+    
+    Each block is the complete text of one section (the cycle intervals
+    list or a single period), so it can be written with a single call.
+    Periods whose blocks are already in the block cache are not
+    formatted again.
+    
+    Args:
+        periods_indexed_by_date: Dictionary of periods indexed by Hebrew date
+        historical_cycle_intervals: List of historical cycle intervals
+        config: ConfigSnapshot (default: the global snapshot)
+        render_cache: HebrewDateRenderCache (default: the global render cache)
+        block_cache: PeriodBlockCache (default: the global block cache)
         
-        # Add period header
-        if config.get("output.show_hebrew_dates", True):
-            period_header = (
-                f"{period_date.hebrew_date_string()} "
-                f"ב{TIME_OF_DAY_DICT[current_period.time_of_day]} "
-                f"{WEEKDAY_DICT[period_date.weekday()]}:\n"
-            )
-        else:
-            period_header = (
-                f"Period {period_date.day}/{period_date.month}/{period_date.year} "
-                f"ב{TIME_OF_DAY_DICT[current_period.time_of_day]} "
-                f"{WEEKDAY_DICT[period_date.weekday()]}:\n"
+    Yields:
+        str: Formatted output block
+    """
+    config = config or get_config_snapshot()
+    output_separator = config.date_separator
+    block_cache = block_cache or period_block_cache
+    
+    if config.show_cycle_intervals:
+        yield format_cycle_intervals_block(historical_cycle_intervals, output_separator, config.cycle_intervals_format)
+    
+    for period_date, current_period in periods_indexed_by_date.items():
+        yield "".join(block_cache.get_lines(period_date, current_period, config, render_cache))
+
+
+def format_cycle_intervals_block(historical_cycle_intervals, output_separator, intervals_format="list"):
+    """
+    Format the cycle intervals section.
+    
+    Args:
+        historical_cycle_intervals: List of historical cycle intervals
+        output_separator: Separator line placed after the section
+        intervals_format: "list" for the raw intervals, "statistics" for
+            their summary, or "both"
+        
+    Returns:
+        str: Formatted output block
+    """
+    section_lines = []
+    if intervals_format != "statistics":
+        section_lines.append(f"רשימת הפלגות:\n{historical_cycle_intervals}\n")
+    if intervals_format != "list":
+        section_lines.extend(
+            format_cycle_interval_statistics_lines(
+                interval_statistics.compute_cycle_interval_statistics(historical_cycle_intervals)
             )
-        output_content_lines.append(period_header)
+        )
+    section_lines.append(f"{output_separator}\n")
+    return "".join(section_lines)
+
+
+def _format_number(value):
+    """Format a statistic with at most two decimals."""
+    return str(value) if isinstance(value, int) else f"{value:.2f}".rstrip("0").rstrip(".")
+
+
+def format_cycle_interval_statistics_lines(statistics):
+    """
+    Format cycle interval statistics into output lines.
+    
+    Args:
+        statistics: CycleIntervalStatistics to format
         
-        # Add forbidden days for this period
-        for forbidden_day in current_period.forbidden_days_list:
-            if isinstance(forbidden_day, list):
-                # Handle unbroken patterns
-                output_content_lines.append("  הפלגות שלא נעקרו:\n")
-                for unbroken_pattern in forbidden_day:
-                    pattern_line = _format_forbidden_day_line(unbroken_pattern, indent="    ")
-                    output_content_lines.append(pattern_line)
-            else:
-                # Handle regular forbidden days
-                forbidden_day_line = _format_forbidden_day_line(forbidden_day, indent="  ")
-                output_content_lines.append(forbidden_day_line)
+    Returns:
+        list: Formatted output lines
+    """
+    statistics_lines = ["סטטיסטיקת הפלגות:\n", f"  מספר הפלגות: {statistics.count}\n"]
+    if not statistics.count:
+        return statistics_lines
+    
+    percentiles = ", ".join(
+        f"{percent}%: {_format_number(statistics.percentile(percent))}" for percent in interval_statistics.REPORT_PERCENTILES
+    )
+    last_run_position = statistics.longest_run_start + statistics.longest_run_length
+    statistics_lines.extend([
+        f"  ממוצע: {_format_number(statistics.mean)}\n",
+        f"  שונות: {_format_number(statistics.variance)}\n",
+        f"  סטיית תקן: {_format_number(statistics.standard_deviation)}\n",
+        f"  הקצרה ביותר: {statistics.minimum}\n",
+        f"  הארוכה ביותר: {statistics.maximum}\n",
+        f"  אחוזונים: {percentiles}\n",
+        f"  רצף הפלגות זהות ארוך ביותר: {statistics.longest_run_interval} x {statistics.longest_run_length} "
+        f"(הפלגות {statistics.longest_run_start + 1}-{last_run_position})\n",
+        "  התפלגות:\n"
+    ])
+    
+    histogram = statistics.histogram
+    largest_bin_count = max(bin_count for _, _, bin_count in histogram)
+    for lowest_interval, highest_interval, bin_count in histogram:
+        bin_label = str(lowest_interval) if lowest_interval == highest_interval else f"{lowest_interval}-{highest_interval}"
+        bar_length = max(1, round(bin_count * HISTOGRAM_BAR_WIDTH / largest_bin_count))
+        statistics_lines.append(f"    {bin_label:>9} | {'#' * bar_length} {bin_count}\n")
+    return statistics_lines
+
+
+def format_period_block(period_date, current_period, forbidden_days_list=None, config=None,
+                        render_cache=None, block_cache=None):
+    """
+    Format a single period into one output block.
+    
+    Args:
+        period_date: Hebrew date of the period
+        current_period: The menstrual period to format
+        forbidden_days_list: Forbidden days to show instead of the period's own list (optional;
+            such blocks bypass the block cache)
+        config: ConfigSnapshot (default: the global snapshot)
+        render_cache: HebrewDateRenderCache (default: the global render cache)
+        block_cache: PeriodBlockCache (default: the global block cache)
+        
+    Returns:
+        str: Formatted output block for the period
+    """
+    config = config or get_config_snapshot()
+    if forbidden_days_list is None:
+        block_cache = block_cache or period_block_cache
+        return "".join(block_cache.get_lines(period_date, current_period, config, render_cache))
+    return "".join(
+        _format_period_lines(
+            period_date, current_period, config, config.date_separator, forbidden_days_list, render_cache
+        )
+    )
+
+
+def _format_period_lines(period_date, current_period, config, output_separator, forbidden_days_list=None,
+                         render_cache=None):
+    """
+    Format a single period and its forbidden days into output lines.
+    
+    Args:
+        period_date: Hebrew date of the period
+        current_period: The menstrual period to format
+        config: ConfigSnapshot
+        output_separator: Separator line placed after the period
+        forbidden_days_list: Forbidden days to show instead of the period's own list (optional)
+        render_cache: HebrewDateRenderCache (default: the global render cache)
         
-        output_content_lines.append(output_separator + "\n")
+    Returns:
+        list: Formatted output lines for the period
+    """
+    if forbidden_days_list is None:
+        forbidden_days_list = current_period.forbidden_days_list
+    render_cache = render_cache or date_render_cache
     
-    return output_content_lines
+    # Add period header
+    if config.show_hebrew_dates:
+        period_header = (
+            f"{render_cache.onah_string(period_date, current_period.time_of_day)}:\n"
+        )
+    else:
+        period_header = (
+            f"Period {period_date.day}/{period_date.month}/{period_date.year} "
+            f"ב{TIME_OF_DAY_DICT[current_period.time_of_day]} "
+            f"{render_cache.weekday_name(period_date)}:\n"
+        )
+    period_lines = [period_header]
+    
+    # Add forbidden days for this period
+    for forbidden_day in forbidden_days_list:
+        if isinstance(forbidden_day, (list, tuple)):
+            # Handle unbroken patterns
+            period_lines.append("  הפלגות שלא נעקרו:\n")
+            for unbroken_pattern in forbidden_day:
+                pattern_line = _format_forbidden_day_line(unbroken_pattern, "    ", render_cache)
+                period_lines.append(pattern_line)
+        else:
+            # Handle regular forbidden days
+            forbidden_day_line = _format_forbidden_day_line(forbidden_day, "  ", render_cache)
+            period_lines.append(forbidden_day_line)
+    
+    period_lines.append(output_separator + "\n")
+    return period_lines
+
+
+def format_restriction_name(restriction_name):
+    """
+    Get the display name of a restriction.
+    
+    Unbroken patterns are named by their interval alone, so they get a
+    descriptive prefix.
+    
+    Args:
+        restriction_name: Restriction name of a forbidden day
+        
+    Returns:
+        str: The display name
+    """
+    return f"הפלגה שלא נעקרה {restriction_name}" if restriction_name.isdigit() else restriction_name
 
 
-def _format_forbidden_day_line(forbidden_day, indent="  "):
+def _format_forbidden_day_line(forbidden_day, indent="  ", render_cache=None):
     """
     Format a single forbidden day into a display line.
     
     Args:
         forbidden_day: ForbiddenDay object to format
         indent: Indentation string for the line
+        render_cache: HebrewDateRenderCache (default: the global render cache)
         
     Returns:
         str: Formatted line for the forbidden day
     """
+    render_cache = render_cache or date_render_cache
     return (
         f"{indent}{forbidden_day.restriction_name} - "
-        f"{forbidden_day.hebrew_date.hebrew_date_string()} "
-        f"ב{TIME_OF_DAY_DICT[forbidden_day.time_of_day]} "
-        f"{WEEKDAY_DICT[forbidden_day.weekday]}\n"
+        f"{render_cache.onah_string(forbidden_day.hebrew_date, forbidden_day.time_of_day)}\n"
     )
 
 
+def write_output_blocks(output_stream, output_blocks, encoding="utf-8"):
+    """
+    Write output blocks to a text or binary stream, one write per block.
+    
+    Args:
+        output_stream: Writable text or binary stream
+        output_blocks: Iterable of formatted output blocks (or lines)
+        encoding: Encoding used when the stream is binary
+        
+    Returns:
+        int: Number of blocks written
+    """
+    is_binary = isinstance(output_stream, (io.RawIOBase, io.BufferedIOBase))
+    blocks_written = 0
+    for output_block in output_blocks:
+        output_stream.write(output_block.encode(encoding) if is_binary else output_block)
+        blocks_written += 1
+    return blocks_written
+
+
 def print_results(output_content_lines):
     """
     Print results to console.
     
     Args:
-        output_content_lines: List of formatted output lines
+        output_content_lines: Iterable of formatted output lines or blocks
     """
-    print("")
-    for output_line in output_content_lines:
-        print(output_line[:-1])
+    sys.stdout.write("\n")
+    write_output_blocks(sys.stdout, output_content_lines)
+    sys.stdout.flush()
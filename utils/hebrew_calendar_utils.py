@@ -5,7 +5,14 @@ This module provides utility functions for working with Hebrew calendar dates
 and calculating month lengths.
 """
 
-from pyluach import dates, hebrewcal
+from __future__ import annotations
+
+from utils.calendar_table import get_calendar_table
+from utils.lazy_import import lazy_import
+
+# pyluach is loaded on first use to keep startup fast
+dates = lazy_import("pyluach.dates")
+hebrewcal = lazy_import("pyluach.hebrewcal")
 
 
 def get_hebrew_month_length(hebrew_month: hebrewcal.Month):
@@ -18,6 +25,10 @@ def get_hebrew_month_length(hebrew_month: hebrewcal.Month):
     Returns:
         int: The number of days in the month
     """
+    calendar_table = get_calendar_table()
+    if calendar_table is not None and calendar_table.has_year(hebrew_month.year):
+        return calendar_table.month_length(hebrew_month.year, hebrew_month.month)
+    
     next_month_first_day = dates.HebrewDate(
         (hebrew_month + 1).year, 
         (hebrew_month + 1).month, 
@@ -25,3 +36,56 @@ def get_hebrew_month_length(hebrew_month: hebrewcal.Month):
     ) - 1
     current_month_length = next_month_first_day.day
     return current_month_length
+
+
+def get_day_ordinal(hebrew_date: dates.HebrewDate) -> int:
+    """
+    Get the integer day ordinal (Julian Day Number) of a Hebrew date.
+    
+    Args:
+        hebrew_date: A Hebrew calendar date
+        
+    Returns:
+        int: The day ordinal, unique per calendar day
+    """
+    return int(hebrew_date.jd + .5)
+
+
+def ordinal_to_hebrew_date(ordinal: int) -> dates.HebrewDate:
+    """
+    Get the Hebrew date of a day ordinal (the inverse of get_day_ordinal).
+    
+    Args:
+        ordinal: Day ordinal (Julian Day Number)
+        
+    Returns:
+        HebrewDate: The date, looked up in the shared calendar table when one covers it
+    """
+    calendar_table = get_calendar_table()
+    if calendar_table is not None and calendar_table.has_ordinal(ordinal):
+        year, month, day, _ = calendar_table.ordinal_to_date(ordinal)
+        return dates.HebrewDate(year, month, day, jd=ordinal - .5)
+    return dates.JulianDay(ordinal - .5).to_heb()
+
+
+def add_days(hebrew_date: dates.HebrewDate, day_count: int) -> dates.HebrewDate:
+    """
+    Get the Hebrew date a number of days after (or before) a date.
+    
+    Equivalent to ``hebrew_date + day_count``, but looked up in the shared
+    calendar table when one is enabled and covers the result.
+    
+    Args:
+        hebrew_date: A Hebrew calendar date
+        day_count: Number of days to add (negative to subtract)
+        
+    Returns:
+        HebrewDate: The resulting date
+    """
+    calendar_table = get_calendar_table()
+    if calendar_table is not None:
+        ordinal = int(hebrew_date.jd + .5) + day_count
+        if calendar_table.has_ordinal(ordinal):
+            year, month, day, _ = calendar_table.ordinal_to_date(ordinal)
+            return dates.HebrewDate(year, month, day, jd=ordinal - .5)
+    return hebrew_date + day_count
@@ -0,0 +1,285 @@
+"""
+iCalendar (.ics) export of forbidden days for the Tahara Calculator.
+
+This module turns calculation results into an iCalendar feed with one
+VEVENT per forbidden onah, so the restrictions can be imported into
+calendar apps. Each event's UID is derived from (period onah, rule,
+target onah), so re-importing an updated feed updates the existing
+events instead of duplicating them. Events are generated one at a time
+and can be limited to a date window, so large feeds stream straight to
+the output file.
+
+Onah bounds are approximated with fixed clock times (by default night
+from 18:00 to 06:00 and day from 06:00 to 18:00), written as floating
+local times that calendar apps show in the viewer's own time zone.
+"""
+
+import hashlib
+import os
+import sys
+from datetime import datetime, time, timedelta, timezone
+
+from config.config_snapshot import get_config_snapshot
+from utils.compression import get_compression_by_extension
+from utils.file_operations import STDOUT_PATH
+from utils.formatters import TIME_OF_DAY_DICT, date_render_cache, format_restriction_name, write_output_blocks
+from utils.hebrew_calendar_utils import get_day_ordinal
+from utils.output_writer import BatchOutputWriter
+
+# Default clock times at which the night and day onot begin
+DEFAULT_NIGHT_START = time(18, 0)
+DEFAULT_DAY_START = time(6, 0)
+
+# Domain part of every event UID
+UID_DOMAIN = "tahara-calculator"
+
+# Product identifier written into every feed
+ICS_PRODUCT_ID = "-//Tahara Calculator//Forbidden Days//HE"
+
+# Day ordinals (Julian Day Numbers) minus Python date ordinals
+_JULIAN_DAY_OFFSET = 1721425
+
+# Longest content line in octets before it is folded (RFC 5545, section 3.1)
+_MAX_LINE_OCTETS = 75
+
+
+def is_ics_file_name(file_path):
+    """
+    Check whether a file name has the .ics extension, possibly before a compression extension.
+    
+    Args:
+        file_path: Path to the file
+    
+    Returns:
+        bool: True for names such as "feed.ics" or "feed.ics.gz"
+    """
+    if get_compression_by_extension(file_path):
+        file_path = os.path.splitext(file_path)[0]
+    return os.path.splitext(file_path)[1].lower() == ".ics"
+
+
+def get_gregorian_date(hebrew_date):
+    """
+    Get the Gregorian date on which the day onah of a Hebrew date falls.
+    
+    Args:
+        hebrew_date: Hebrew calendar date
+    
+    Returns:
+        date: The Gregorian date
+    """
+    return datetime.fromordinal(get_day_ordinal(hebrew_date) - _JULIAN_DAY_OFFSET).date()
+
+
+def get_onah_bounds(hebrew_date, time_of_day, night_start=DEFAULT_NIGHT_START, day_start=DEFAULT_DAY_START):
+    """
+    Get the approximate start and end of an onah.
+    
+    The night onah of a Hebrew date begins on the evening of the
+    previous Gregorian day.
+    
+    Args:
+        hebrew_date: Hebrew date of the onah
+        time_of_day: 0 for night, 1 for day
+        night_start: Clock time at which the night begins
+        day_start: Clock time at which the day begins
+    
+    Returns:
+        tuple: (start datetime, end datetime)
+    """
+    gregorian_date = get_gregorian_date(hebrew_date)
+    if time_of_day:
+        return datetime.combine(gregorian_date, day_start), datetime.combine(gregorian_date, night_start)
+    return (
+        datetime.combine(gregorian_date - timedelta(days=1), night_start),
+        datetime.combine(gregorian_date, day_start)
+    )
+
+
+def get_event_uid(period_date, period_time_of_day, rule, target_date, target_time_of_day, uid_namespace=""):
+    """
+    Get the stable UID of a forbidden onah's event.
+    
+    Args:
+        period_date: Hebrew date of the source period
+        period_time_of_day: Time of day of the source period
+        rule: Restriction name
+        target_date: Hebrew date of the forbidden onah
+        target_time_of_day: Time of day of the forbidden onah
+        uid_namespace: Distinguishes the feeds of different users (optional)
+    
+    Returns:
+        str: The UID
+    """
+    key = (
+        f"{uid_namespace}|{get_day_ordinal(period_date)}.{period_time_of_day}|{rule}|"
+        f"{get_day_ordinal(target_date)}.{target_time_of_day}"
+    )
+    return f"{hashlib.sha1(key.encode('utf-8')).hexdigest()}@{UID_DOMAIN}"
+
+
+def _escape_text(text):
+    """Escape a TEXT property value."""
+    return (
+        text.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\n", "\\n")
+    )
+
+
+def _fold_line(line):
+    """Fold a content line into lines of at most 75 octets, ending it with CRLF."""
+    encoded_line = line.encode("utf-8")
+    if len(encoded_line) <= _MAX_LINE_OCTETS:
+        return line + "\r\n"
+    
+    folded_parts = []
+    start = 0
+    limit = _MAX_LINE_OCTETS
+    while start < len(encoded_line):
+        end = min(start + limit, len(encoded_line))
+        # Never split a multi-byte character
+        while end < len(encoded_line) and (encoded_line[end] & 0xC0) == 0x80:
+            end -= 1
+        folded_parts.append(encoded_line[start:end].decode("utf-8"))
+        start = end
+        # Continuation lines begin with a space
+        limit = _MAX_LINE_OCTETS - 1
+    return "\r\n ".join(folded_parts) + "\r\n"
+
+
+def _format_ics_datetime(value):
+    """Format a floating local date-time."""
+    return value.strftime("%Y%m%dT%H%M%S")
+
+
+def _iter_forbidden_days(forbidden_days_list):
+    """Flatten a forbidden days list, including unbroken pattern lists."""
+    for forbidden_day in forbidden_days_list:
+        if isinstance(forbidden_day, (list, tuple)):
+            yield from forbidden_day
+        else:
+            yield forbidden_day
+
+
+def iter_ics_events(periods_indexed_by_date, window_start=None, window_end=None, uid_namespace="",
+                    night_start=DEFAULT_NIGHT_START, day_start=DEFAULT_DAY_START, timestamp=None,
+                    render_cache=None):
+    """
+    Lazily format one VEVENT per forbidden onah.
+    
+    Args:
+        periods_indexed_by_date: Dictionary of periods indexed by Hebrew date
+        window_start: Earliest Hebrew date of the exported onot (optional)
+        window_end: Latest Hebrew date of the exported onot (optional)
+        uid_namespace: Distinguishes the feeds of different users (optional)
+        night_start: Clock time at which the night begins
+        day_start: Clock time at which the day begins
+        timestamp: Creation time stamped on the events (default: now)
+        render_cache: HebrewDateRenderCache (default: the global render cache)
+    
+    Yields:
+        str: Formatted VEVENT block
+    """
+    render_cache = render_cache or date_render_cache
+    first_ordinal = get_day_ordinal(window_start) if window_start is not None else None
+    last_ordinal = get_day_ordinal(window_end) if window_end is not None else None
+    timestamp_text = (timestamp or datetime.now(timezone.utc)).astimezone(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    
+    for period_date, period in periods_indexed_by_date.items():
+        period_time_of_day = period.time_of_day
+        period_onah = render_cache.onah_string(period_date, period_time_of_day)
+        # Repeated unbroken intervals produce the same onah more than once
+        exported_uids = set()
+        for forbidden_day in _iter_forbidden_days(period.forbidden_days_list):
+            target_date = forbidden_day.hebrew_date
+            target_ordinal = get_day_ordinal(target_date)
+            if first_ordinal is not None and target_ordinal < first_ordinal:
+                continue
+            if last_ordinal is not None and target_ordinal > last_ordinal:
+                continue
+            
+            uid = get_event_uid(
+                period_date, period_time_of_day, forbidden_day.restriction_name,
+                target_date, forbidden_day.time_of_day, uid_namespace
+            )
+            if uid in exported_uids:
+                continue
+            exported_uids.add(uid)
+            
+            event_start, event_end = get_onah_bounds(target_date, forbidden_day.time_of_day, night_start, day_start)
+            summary = (
+                f"{format_restriction_name(forbidden_day.restriction_name)} "
+                f"({TIME_OF_DAY_DICT[forbidden_day.time_of_day]})"
+            )
+            description = (
+                f"{render_cache.onah_string(target_date, forbidden_day.time_of_day)}\nמקור: {period_onah}"
+            )
+            event_lines = [
+                "BEGIN:VEVENT",
+                f"UID:{uid}",
+                f"DTSTAMP:{timestamp_text}",
+                f"DTSTART:{_format_ics_datetime(event_start)}",
+                f"DTEND:{_format_ics_datetime(event_end)}",
+                f"SUMMARY:{_escape_text(summary)}",
+                f"DESCRIPTION:{_escape_text(description)}",
+                "TRANSP:TRANSPARENT",
+                "END:VEVENT"
+            ]
+            yield "".join(_fold_line(event_line) for event_line in event_lines)
+
+
+def iter_ics_blocks(periods_indexed_by_date, calendar_name="Tahara Calculator", **event_options):
+    """
+    Lazily format a complete iCalendar feed.
+    
+    Args:
+        periods_indexed_by_date: Dictionary of periods indexed by Hebrew date
+        calendar_name: Display name of the calendar
+        **event_options: Options passed to iter_ics_events
+    
+    Yields:
+        str: Formatted feed block (header, one per event, footer)
+    """
+    yield "".join(_fold_line(header_line) for header_line in [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        f"PRODID:{ICS_PRODUCT_ID}",
+        "CALSCALE:GREGORIAN",
+        "METHOD:PUBLISH",
+        f"X-WR-CALNAME:{_escape_text(calendar_name)}"
+    ])
+    yield from iter_ics_events(periods_indexed_by_date, **event_options)
+    yield _fold_line("END:VCALENDAR")
+
+
+def export_ics(file_name, periods_indexed_by_date, config=None, **feed_options):
+    """
+    Write an iCalendar feed to a file, streaming one event at a time.
+    
+    Args:
+        file_name: Path to the .ics file (may be compressed), or "-" for standard output
+        periods_indexed_by_date: Dictionary of periods indexed by Hebrew date
+        config: ConfigSnapshot (default: the global snapshot)
+        **feed_options: Options passed to iter_ics_blocks
+    
+    Returns:
+        str: WRITE_WRITTEN or WRITE_CANCELLED (None for standard output)
+    """
+    config = config or get_config_snapshot()
+    feed_blocks = iter_ics_blocks(periods_indexed_by_date, **feed_options)
+    
+    # iCalendar is always UTF-8 with CRLF line ends, whatever the text output uses
+    if file_name == STDOUT_PATH:
+        sys.stdout.flush()
+        stdout_stream = getattr(sys.stdout, "buffer", sys.stdout)
+        write_output_blocks(stdout_stream, feed_blocks, "utf-8")
+        stdout_stream.flush()
+        return None
+    
+    # Every feed carries a new DTSTAMP, so comparing with the old file never pays off
+    writer = BatchOutputWriter(
+        encoding="utf-8",
+        fsync_policy=config.fsync_policy,
+        overwrite_policy=config.effective_overwrite_policy,
+        skip_unchanged=False
+    )
+    return writer.write(file_name, feed_blocks)
@@ -0,0 +1,159 @@
+"""
+Instrumentation utilities for the Tahara Calculator.
+
+This module provides per-stage wall/CPU timing of the calculation
+pipeline and optional cProfile capture, reported as text or JSON.
+"""
+
+import io
+import sys
+import time
+from contextlib import contextmanager
+
+from utils.lazy_import import lazy_import
+
+# Only needed for JSON timing reports
+json = lazy_import("json")
+
+# Supported timing report formats
+TIMING_REPORT_FORMATS = ("text", "json")
+
+
+class StageRecord:
+    """Timing measurements of a single pipeline stage."""
+    
+    def __init__(self, name):
+        """
+        Initialize a stage record.
+        
+        Args:
+            name: Name of the stage
+        """
+        self.name = name
+        self.wall_seconds = 0.0
+        self.cpu_seconds = 0.0
+        self.items = None
+    
+    @property
+    def items_per_second(self):
+        """Get the stage throughput, or None if unknown."""
+        if self.items is None or not self.wall_seconds:
+            return None
+        return self.items / self.wall_seconds
+    
+    def to_dict(self):
+        """Get the record as a dictionary."""
+        return {
+            "stage": self.name,
+            "wall_seconds": self.wall_seconds,
+            "cpu_seconds": self.cpu_seconds,
+            "items": self.items,
+            "items_per_second": self.items_per_second
+        }
+
+
+class PipelineInstrumentation:
+    """Collects stage timings; near-free when disabled."""
+    
+    def __init__(self, enabled=True):
+        """
+        Initialize the instrumentation.
+        
+        Args:
+            enabled: Whether stages are timed
+        """
+        self.enabled = enabled
+        self.records = []
+    
+    @contextmanager
+    def stage(self, name):
+        """
+        Time a pipeline stage.
+        
+        Set ``items`` on the yielded record to report the stage throughput.
+        
+        Args:
+            name: Name of the stage
+        
+        Yields:
+            StageRecord: The record of the stage
+        """
+        stage_record = StageRecord(name)
+        if not self.enabled:
+            yield stage_record
+            return
+        
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield stage_record
+        finally:
+            stage_record.wall_seconds = time.perf_counter() - wall_start
+            stage_record.cpu_seconds = time.process_time() - cpu_start
+            self.records.append(stage_record)
+    
+    def to_dict(self):
+        """Get all stage records and totals as a dictionary."""
+        return {
+            "stages": [stage_record.to_dict() for stage_record in self.records],
+            "total_wall_seconds": sum(stage_record.wall_seconds for stage_record in self.records),
+            "total_cpu_seconds": sum(stage_record.cpu_seconds for stage_record in self.records)
+        }
+    
+    def format_report(self, report_format="text"):
+        """
+        Format the collected timings.
+        
+        Args:
+            report_format: "text" or "json"
+        
+        Returns:
+            str: The timing report
+        """
+        if report_format == "json":
+            return json.dumps(self.to_dict(), indent=2)
+        
+        report_lines = [f"{'Stage':<16} {'wall (s)':>10} {'cpu (s)':>10} {'items':>10} {'items/s':>12}"]
+        for stage_record in self.records:
+            items = "-" if stage_record.items is None else str(stage_record.items)
+            items_per_second = stage_record.items_per_second
+            throughput = "-" if items_per_second is None else f"{items_per_second:.1f}"
+            report_lines.append(
+                f"{stage_record.name:<16} {stage_record.wall_seconds:>10.4f} "
+                f"{stage_record.cpu_seconds:>10.4f} {items:>10} {throughput:>12}"
+            )
+        totals = self.to_dict()
+        report_lines.append(
+            f"{'total':<16} {totals['total_wall_seconds']:>10.4f} {totals['total_cpu_seconds']:>10.4f}"
+        )
+        return "\n".join(report_lines)
+
+
+@contextmanager
+def profile_section(output_path=None, top_n=20, output_stream=None):
+    """
+    Profile a block of code with cProfile.
+    
+    Args:
+        output_path: File to dump the raw profile to (optional); when not
+            given, a summary of the top hotspots is written instead
+        top_n: Number of functions in the summary
+        output_stream: Stream for the summary (default: stderr)
+    """
+    # The profilers are only imported when profiling is requested
+    import cProfile
+    import pstats
+    
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        if output_path:
+            profiler.dump_stats(output_path)
+        else:
+            summary_stream = io.StringIO()
+            stats = pstats.Stats(profiler, stream=summary_stream)
+            stats.sort_stats("cumulative").print_stats(top_n)
+            (output_stream or sys.stderr).write(summary_stream.getvalue())
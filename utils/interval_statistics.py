@@ -0,0 +1,182 @@
+"""
+Streaming statistics of cycle intervals for the Tahara Calculator.
+
+This module summarizes a sequence of cycle intervals (as returned by
+calculate_cycle_intervals) in a single pass with bounded memory: count,
+mean and variance (Welford's algorithm), minimum and maximum, a
+histogram, approximate percentiles read from that histogram, and the
+longest run of identical intervals. The histogram starts with one bin
+per day and doubles its bin width whenever it would exceed its bin
+limit, so memory stays constant however long the history is.
+"""
+
+import math
+
+# Most bins the histogram keeps before doubling its bin width
+DEFAULT_MAX_HISTOGRAM_BINS = 64
+
+# Percentiles shown in reports
+REPORT_PERCENTILES = (10, 25, 50, 75, 90)
+
+
+class CycleIntervalStatistics:
+    """Running summary of cycle intervals, updated one interval at a time."""
+    
+    __slots__ = (
+        "count", "minimum", "maximum", "bin_width", "max_histogram_bins", "_mean", "_squared_deviations",
+        "_bin_counts", "_run_interval", "_run_length", "longest_run_interval", "longest_run_length",
+        "longest_run_start"
+    )
+    
+    def __init__(self, cycle_intervals=(), max_histogram_bins=DEFAULT_MAX_HISTOGRAM_BINS):
+        """
+        Initialize the statistics.
+        
+        Args:
+            cycle_intervals: Intervals to add right away (optional)
+            max_histogram_bins: Most histogram bins kept before the bin width doubles
+        """
+        if max_histogram_bins < 2:
+            raise ValueError("max_histogram_bins must be at least 2")
+        self.count = 0
+        self.minimum = None
+        self.maximum = None
+        self.bin_width = 1
+        self.max_histogram_bins = max_histogram_bins
+        self._mean = 0.0
+        self._squared_deviations = 0.0
+        self._bin_counts = {}
+        self._run_interval = None
+        self._run_length = 0
+        self.longest_run_interval = None
+        self.longest_run_length = 0
+        # Zero-based position of the longest run's first interval
+        self.longest_run_start = None
+        self.update(cycle_intervals)
+    
+    def add(self, cycle_interval):
+        """Add the next cycle interval."""
+        self.count += 1
+        
+        # Welford's update of the mean and the sum of squared deviations
+        delta = cycle_interval - self._mean
+        self._mean += delta / self.count
+        self._squared_deviations += delta * (cycle_interval - self._mean)
+        
+        if self.minimum is None or cycle_interval < self.minimum:
+            self.minimum = cycle_interval
+        if self.maximum is None or cycle_interval > self.maximum:
+            self.maximum = cycle_interval
+        
+        bin_index = cycle_interval // self.bin_width
+        while bin_index not in self._bin_counts and len(self._bin_counts) >= self.max_histogram_bins:
+            self._widen_bins()
+            bin_index = cycle_interval // self.bin_width
+        self._bin_counts[bin_index] = self._bin_counts.get(bin_index, 0) + 1
+        
+        if cycle_interval == self._run_interval:
+            self._run_length += 1
+        else:
+            self._run_interval = cycle_interval
+            self._run_length = 1
+        if self._run_length > self.longest_run_length:
+            self.longest_run_interval = cycle_interval
+            self.longest_run_length = self._run_length
+            self.longest_run_start = self.count - self._run_length
+    
+    def update(self, cycle_intervals):
+        """
+        Add cycle intervals in order.
+        
+        Args:
+            cycle_intervals: Iterable of cycle intervals
+        
+        Returns:
+            CycleIntervalStatistics: self
+        """
+        for cycle_interval in cycle_intervals:
+            self.add(cycle_interval)
+        return self
+    
+    def _widen_bins(self):
+        """Double the bin width, merging neighbouring bins."""
+        merged_bin_counts = {}
+        for bin_index, bin_count in self._bin_counts.items():
+            merged_index = bin_index // 2
+            merged_bin_counts[merged_index] = merged_bin_counts.get(merged_index, 0) + bin_count
+        self._bin_counts = merged_bin_counts
+        self.bin_width *= 2
+    
+    @property
+    def mean(self):
+        """Get the mean interval, or None without intervals."""
+        return self._mean if self.count else None
+    
+    @property
+    def variance(self):
+        """Get the sample variance of the intervals, or None without intervals."""
+        if not self.count:
+            return None
+        return self._squared_deviations / (self.count - 1) if self.count > 1 else 0.0
+    
+    @property
+    def standard_deviation(self):
+        """Get the sample standard deviation of the intervals, or None without intervals."""
+        variance = self.variance
+        return None if variance is None else math.sqrt(variance)
+    
+    @property
+    def histogram(self):
+        """
+        Get the histogram bins in ascending order.
+        
+        Returns:
+            list: (lowest interval, highest interval, count) tuples of the non-empty bins
+        """
+        return [
+            (bin_index * self.bin_width, (bin_index + 1) * self.bin_width - 1, self._bin_counts[bin_index])
+            for bin_index in sorted(self._bin_counts)
+        ]
+    
+    def percentile(self, percent):
+        """
+        Get an approximate percentile of the intervals.
+        
+        The nearest-rank percentile is exact while every bin is one day
+        wide; with wider bins it is interpolated within its bin.
+        
+        Args:
+            percent: Percentile between 0 and 100
+        
+        Returns:
+            The percentile (int when exact, float when interpolated), or None without intervals
+        """
+        if not 0 <= percent <= 100:
+            raise ValueError("percent must be between 0 and 100")
+        if not self.count:
+            return None
+        rank = max(1, math.ceil(percent / 100 * self.count))
+        preceding_count = 0
+        for lowest_interval, _, bin_count in self.histogram:
+            if preceding_count + bin_count >= rank:
+                if self.bin_width == 1:
+                    return lowest_interval
+                position = (rank - preceding_count - 0.5) / bin_count
+                estimate = lowest_interval + position * self.bin_width
+                return min(max(estimate, self.minimum), self.maximum)
+            preceding_count += bin_count
+        return self.maximum
+
+
+def compute_cycle_interval_statistics(cycle_intervals, max_histogram_bins=DEFAULT_MAX_HISTOGRAM_BINS):
+    """
+    Summarize cycle intervals in one pass.
+    
+    Args:
+        cycle_intervals: Iterable of cycle intervals, e.g. from calculate_cycle_intervals
+        max_histogram_bins: Most histogram bins kept before the bin width doubles
+    
+    Returns:
+        CycleIntervalStatistics: The summary
+    """
+    return CycleIntervalStatistics(cycle_intervals, max_histogram_bins)
@@ -0,0 +1,67 @@
+"""
+Lazy module loading for the Tahara Calculator.
+
+This module defers importing heavy modules (pyluach, compression codecs,
+the HTTP server) until one of their attributes is first used, so that
+starting a command line tool only pays for what the command needs.
+"""
+
+import importlib.util
+import sys
+import threading
+import types
+
+# Serializes lazy module loads: a module must not be used by one thread
+# while another thread is still executing it
+_load_lock = threading.RLock()
+
+
+class _LazyModule(types.ModuleType):
+    """Module that executes its code on first attribute access, safely across threads."""
+    
+    def __getattribute__(self, attribute):
+        if type(self) is _LazyModule:
+            with _load_lock:
+                module_dict = object.__getattribute__(self, "__dict__")
+                # Skip if another thread loaded the module while this one waited, or if
+                # the module's own code is still executing (it sees the partial module)
+                if type(self) is _LazyModule and not module_dict.get("__lazy_loading__"):
+                    module_dict["__lazy_loading__"] = True
+                    try:
+                        module_dict["__spec__"].loader.exec_module(self)
+                        self.__class__ = types.ModuleType
+                    finally:
+                        del module_dict["__lazy_loading__"]
+        return types.ModuleType.__getattribute__(self, attribute)
+
+
+def lazy_import(module_name):
+    """
+    Import a module lazily.
+    
+    The returned module is executed on first attribute access; after that
+    it behaves exactly like a normally imported module. Threads that use
+    the module while it is being executed wait until it is complete.
+    
+    Args:
+        module_name: Fully qualified module name (e.g., "pyluach.dates")
+    
+    Returns:
+        module: The (possibly not yet executed) module
+    """
+    module = sys.modules.get(module_name)
+    if module is not None:
+        return module
+    
+    module_spec = importlib.util.find_spec(module_name)
+    if module_spec is None:
+        raise ImportError(f"No module named '{module_name}'", name=module_name)
+    module = importlib.util.module_from_spec(module_spec)
+    module.__class__ = _LazyModule
+    sys.modules[module_name] = module
+    
+    # Make the module reachable as an attribute of its parent package
+    parent_name, _, child_name = module_name.rpartition(".")
+    if parent_name:
+        setattr(sys.modules[parent_name], child_name, module)
+    return module
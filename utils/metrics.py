@@ -0,0 +1,265 @@
+"""
+Hot-path metrics for the Tahara Calculator.
+
+This module counts forbidden days created per rule, pyluach calls, cache
+hits and misses and unbroken-pattern list lengths. Metrics are disabled
+by default; hot paths only check ``metrics.enabled`` until they are
+turned on. Snapshots can be dumped as JSON or served in Prometheus text
+format from a long-running process.
+"""
+
+import threading
+
+from utils.lazy_import import lazy_import
+
+# pyluach is loaded on first use to keep startup fast
+dates = lazy_import("pyluach.dates")
+
+# Prefix of exported Prometheus metric names
+METRIC_PREFIX = "tahara"
+
+# pyluach HebrewDate methods counted while metrics are enabled
+PYLUACH_COUNTED_METHODS = ("from_pydate", "__add__", "weekday", "hebrew_date_string")
+
+
+class MetricsRegistry:
+    """Thread-safe registry of counters, summaries and cache statistics."""
+    
+    def __init__(self, enabled=False):
+        """
+        Initialize the registry.
+        
+        Args:
+            enabled: Whether hot paths record metrics
+        """
+        self.enabled = enabled
+        self._counters = {}
+        self._summaries = {}
+        self._caches = {}
+        self._lock = threading.Lock()
+    
+    def increment(self, name, labels=None, amount=1):
+        """
+        Increase a counter.
+        
+        Args:
+            name: Counter name
+            labels: Dictionary of label name -> value (optional)
+            amount: Amount to add
+        """
+        key = (name, tuple(sorted(labels.items())) if labels else ())
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+    
+    def observe(self, name, value):
+        """
+        Record a value in a summary (count, sum and maximum).
+        
+        Args:
+            name: Summary name
+            value: Observed value
+        """
+        with self._lock:
+            summary = self._summaries.get(name)
+            if summary is None:
+                self._summaries[name] = [1, value, value]
+            else:
+                summary[0] += 1
+                summary[1] += value
+                summary[2] = max(summary[2], value)
+    
+    def register_cache(self, name, cache):
+        """
+        Register a cache whose ``hits`` and ``misses`` attributes are reported.
+        
+        Args:
+            name: Cache name
+            cache: Object with ``hits`` and ``misses`` counters
+        """
+        with self._lock:
+            self._caches[name] = cache
+    
+    def reset(self):
+        """Clear all counters and summaries."""
+        with self._lock:
+            self._counters.clear()
+            self._summaries.clear()
+    
+    def snapshot(self):
+        """
+        Get the current metric values.
+        
+        Returns:
+            dict: JSON-serializable metrics snapshot
+        """
+        with self._lock:
+            counters = {}
+            for (name, labels), value in sorted(self._counters.items()):
+                label_text = ",".join(f"{label}={label_value}" for label, label_value in labels)
+                counters.setdefault(name, {})[label_text] = value
+            summaries = {
+                name: {"count": count, "sum": total, "max": maximum, "mean": total / count}
+                for name, (count, total, maximum) in sorted(self._summaries.items())
+            }
+            caches = {}
+            for name, cache in sorted(self._caches.items()):
+                lookups = cache.hits + cache.misses
+                caches[name] = {
+                    "hits": cache.hits,
+                    "misses": cache.misses,
+                    "hit_rate": cache.hits / lookups if lookups else None
+                }
+        return {"counters": counters, "summaries": summaries, "caches": caches}
+    
+    def format_prometheus(self):
+        """
+        Format the current metric values in Prometheus text exposition format.
+        
+        Returns:
+            str: Prometheus text
+        """
+        with self._lock:
+            counter_items = sorted(self._counters.items())
+            summary_items = sorted(self._summaries.items())
+            cache_items = sorted(
+                (name, cache.hits, cache.misses) for name, cache in self._caches.items()
+            )
+        
+        output_lines = []
+        declared_metrics = set()
+        for (name, labels), value in counter_items:
+            metric_name = f"{METRIC_PREFIX}_{name}_total"
+            if metric_name not in declared_metrics:
+                output_lines.append(f"# TYPE {metric_name} counter")
+                declared_metrics.add(metric_name)
+            output_lines.append(f"{metric_name}{_format_labels(labels)} {value}")
+        
+        for name, (count, total, maximum) in summary_items:
+            metric_name = f"{METRIC_PREFIX}_{name}"
+            output_lines.append(f"# TYPE {metric_name} summary")
+            output_lines.append(f"{metric_name}_count {count}")
+            output_lines.append(f"{metric_name}_sum {total}")
+            output_lines.append(f"# TYPE {metric_name}_max gauge")
+            output_lines.append(f"{metric_name}_max {maximum}")
+        
+        if cache_items:
+            for result in ("hits", "misses"):
+                metric_name = f"{METRIC_PREFIX}_cache_{result}_total"
+                output_lines.append(f"# TYPE {metric_name} counter")
+                for name, hits, misses in cache_items:
+                    value = hits if result == "hits" else misses
+                    output_lines.append(f"{metric_name}{_format_labels((('cache', name),))} {value}")
+        
+        return "\n".join(output_lines) + "\n"
+
+
+def _format_labels(labels):
+    """Format label pairs as a Prometheus label set."""
+    if not labels:
+        return ""
+    label_pairs = ",".join(
+        f'{label}="{_escape_label_value(label_value)}"' for label, label_value in labels
+    )
+    return "{" + label_pairs + "}"
+
+
+def _escape_label_value(label_value):
+    """Escape a label value for the Prometheus text format."""
+    return str(label_value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+# Global metrics registry shared by all modules
+metrics = MetricsRegistry()
+
+_original_pyluach_methods = {}
+
+
+def get_metrics() -> MetricsRegistry:
+    """Get the global metrics registry."""
+    return metrics
+
+
+def enable_metrics():
+    """Turn on metric recording, including pyluach call counting."""
+    metrics.enabled = True
+    _install_pyluach_counters()
+
+
+def disable_metrics():
+    """Turn off metric recording and restore the original pyluach methods."""
+    metrics.enabled = False
+    _remove_pyluach_counters()
+
+
+def _install_pyluach_counters():
+    """Wrap the counted pyluach HebrewDate methods with call counters."""
+    if _original_pyluach_methods:
+        return
+    for method_name in PYLUACH_COUNTED_METHODS:
+        original = dates.HebrewDate.__dict__.get(method_name)
+        _original_pyluach_methods[method_name] = original
+        
+        if isinstance(original, staticmethod):
+            wrapped_function = original.__func__
+            
+            def counted_static(*args, _function=wrapped_function, _name=method_name, **kwargs):
+                metrics.increment("pyluach_calls", {"call": _name})
+                return _function(*args, **kwargs)
+            
+            setattr(dates.HebrewDate, method_name, staticmethod(counted_static))
+        else:
+            inherited_function = getattr(dates.HebrewDate, method_name)
+            
+            def counted_method(self, *args, _function=inherited_function, _name=method_name, **kwargs):
+                metrics.increment("pyluach_calls", {"call": _name})
+                return _function(self, *args, **kwargs)
+            
+            setattr(dates.HebrewDate, method_name, counted_method)
+
+
+def _remove_pyluach_counters():
+    """Restore the pyluach HebrewDate methods wrapped by _install_pyluach_counters."""
+    for method_name, original in _original_pyluach_methods.items():
+        if original is None:
+            delattr(dates.HebrewDate, method_name)
+        else:
+            setattr(dates.HebrewDate, method_name, original)
+    _original_pyluach_methods.clear()
+
+
+def start_metrics_server(port, host="127.0.0.1"):
+    """
+    Serve the global metrics for Prometheus scraping in a background thread.
+    
+    Args:
+        port: Port to listen on
+        host: Address to bind to
+    
+    Returns:
+        ThreadingHTTPServer: The running server (call ``shutdown()`` to stop it)
+    """
+    # http.server is slow to import and only needed by long-running processes
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    
+    class MetricsRequestHandler(BaseHTTPRequestHandler):
+        """Serves the global metrics in Prometheus text format on /metrics."""
+        
+        def do_GET(self):
+            """Handle a scrape request."""
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = metrics.format_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        
+        def log_message(self, format, *args):
+            """Keep scrapes out of the console."""
+    
+    server = ThreadingHTTPServer((host, port), MetricsRequestHandler)
+    server_thread = threading.Thread(target=server.serve_forever, daemon=True)
+    server_thread.start()
+    return server
@@ -0,0 +1,250 @@
+"""
+Atomic output writing for the Tahara Calculator.
+
+This module writes results to a temporary file in the destination
+directory and renames it into place, so readers never observe a
+half-written result file.
+"""
+
+import os
+import threading
+
+from config.config_snapshot import get_config_snapshot, FSYNC_POLICY_CHOICES, OVERWRITE_POLICY_CHOICES
+from utils.compression import get_compression_by_extension, open_binary_file, wrap_binary_stream, DECOMPRESSION_ERRORS
+from utils.lazy_import import lazy_import
+
+# Only needed when writing files, so loaded on first use
+hashlib = lazy_import("hashlib")
+tempfile = lazy_import("tempfile")
+
+# Buffer size used for output files
+OUTPUT_BUFFER_SIZE = 1 << 16
+
+# When to fsync: never, the written file only, or the file and its directory
+FSYNC_POLICIES = FSYNC_POLICY_CHOICES
+
+# What to do when the output file already exists
+OVERWRITE_POLICIES = OVERWRITE_POLICY_CHOICES
+
+# Results of BatchOutputWriter.write
+WRITE_WRITTEN = "written"
+WRITE_UNCHANGED = "unchanged"
+WRITE_CANCELLED = "cancelled"
+
+
+def hash_file(file_path, chunk_size=OUTPUT_BUFFER_SIZE):
+    """
+    Compute the SHA-256 digest of a file's (decompressed) bytes.
+    
+    The bytes are hashed as stored, without decoding them, so files that
+    differ only in line endings get different digests.
+    
+    Args:
+        file_path: Path to the file
+        chunk_size: Number of bytes read at a time
+    
+    Returns:
+        str: Hex digest, or None if the file couldn't be read
+    """
+    hasher = hashlib.sha256()
+    try:
+        with open_binary_file(file_path) as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                hasher.update(chunk)
+    except DECOMPRESSION_ERRORS:
+        return None
+    return hasher.hexdigest()
+
+
+def rewrite_file_tail(file_name, offset, output_blocks, encoding="utf-8", fsync_policy="file"):
+    """
+    Atomically replace an uncompressed file's content from a byte offset on.
+    
+    The bytes before the offset are copied from the existing file as they
+    are, so only the new tail is formatted and encoded, which suits
+    frequent small updates. Like BatchOutputWriter.write, the new content
+    goes to a temporary file that is renamed into place.
+    
+    Args:
+        file_name: Path to the existing output file
+        offset: Byte offset the new data starts at (the old data after it is dropped)
+        output_blocks: Iterable of formatted output blocks written from the offset
+        encoding: Encoding used for the output text
+        fsync_policy: One of FSYNC_POLICIES
+    
+    Returns:
+        int: New size of the file in bytes
+    """
+    target_dir = os.path.dirname(os.path.abspath(file_name))
+    temp_fd, temp_path = tempfile.mkstemp(
+        dir=target_dir, prefix=f".{os.path.basename(file_name)}.", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(temp_fd, "wb", buffering=OUTPUT_BUFFER_SIZE) as f:
+            with open(file_name, "rb") as old_file:
+                bytes_left = offset
+                while bytes_left:
+                    chunk = old_file.read(min(bytes_left, OUTPUT_BUFFER_SIZE))
+                    if not chunk:
+                        raise OSError(f"'{file_name}' is shorter than the rewrite offset {offset}")
+                    f.write(chunk)
+                    bytes_left -= len(chunk)
+            for output_block in output_blocks:
+                f.write(output_block.encode(encoding))
+            f.flush()
+            if fsync_policy != "never":
+                os.fsync(f.fileno())
+            file_size = f.tell()
+        
+        BatchOutputWriter._copy_mode(file_name, temp_path)
+        os.replace(temp_path, file_name)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
+    
+    if fsync_policy == "always":
+        BatchOutputWriter._fsync_directory(target_dir)
+    return file_size
+
+
+_umask = None
+_umask_lock = threading.Lock()
+
+
+def _get_umask():
+    """Get the process umask (read once, since reading it means changing it)."""
+    global _umask
+    with _umask_lock:
+        if _umask is None:
+            _umask = os.umask(0)
+            os.umask(_umask)
+        return _umask
+
+
+class BatchOutputWriter:
+    """Non-interactive, crash-safe writer for result files."""
+    
+    def __init__(self, encoding="utf-8", fsync_policy="file",
+                 overwrite_policy="prompt", skip_unchanged=True):
+        """
+        Initialize the writer.
+        
+        Args:
+            encoding: Encoding used for the output text
+            fsync_policy: One of FSYNC_POLICIES
+            overwrite_policy: One of OVERWRITE_POLICIES
+            skip_unchanged: Keep the existing file when its content is identical
+        """
+        if fsync_policy not in FSYNC_POLICIES:
+            raise ValueError(f"Invalid fsync policy: {fsync_policy}")
+        if overwrite_policy not in OVERWRITE_POLICIES:
+            raise ValueError(f"Invalid overwrite policy: {overwrite_policy}")
+        self.encoding = encoding
+        self.fsync_policy = fsync_policy
+        self.overwrite_policy = overwrite_policy
+        self.skip_unchanged = skip_unchanged
+    
+    @classmethod
+    def from_config(cls, config=None):
+        """Create a writer from a ConfigSnapshot (default: the global snapshot)."""
+        config = config or get_config_snapshot()
+        return cls(
+            encoding=config.encoding,
+            fsync_policy=config.fsync_policy,
+            overwrite_policy=config.effective_overwrite_policy,
+            skip_unchanged=config.skip_unchanged_output
+        )
+    
+    def confirm_overwrite(self, file_name):
+        """
+        Decide whether an existing output file may be replaced.
+        
+        Args:
+            file_name: Path to the output file
+        
+        Returns:
+            bool: True if the file may be written
+        """
+        if not os.path.exists(file_name) or self.overwrite_policy == "overwrite":
+            return True
+        if self.overwrite_policy == "skip":
+            return False
+        try:
+            response = input(f"File '{file_name}' already exists. Overwrite? (y/N): ")
+        except EOFError:
+            return False
+        return response.lower() in ['y', 'yes']
+    
+    def write(self, file_name, output_blocks):
+        """
+        Atomically write output blocks to a file.
+        Files named with a compression extension (.gz, .bz2, .xz) are compressed.
+        When skip_unchanged is set and the file exists, the encoded output is
+        held in memory and compared first, so an unchanged file is returned
+        as WRITE_UNCHANGED without prompting, writing or fsyncing.
+        
+        Args:
+            file_name: Path to the output file
+            output_blocks: Iterable of formatted output blocks (or lines)
+        
+        Returns:
+            str: WRITE_WRITTEN, WRITE_UNCHANGED or WRITE_CANCELLED
+        """
+        encoded_blocks = (output_block.encode(self.encoding) for output_block in output_blocks)
+        if self.skip_unchanged and os.path.exists(file_name):
+            encoded_blocks = list(encoded_blocks)
+            hasher = hashlib.sha256()
+            for data in encoded_blocks:
+                hasher.update(data)
+            if hash_file(file_name) == hasher.hexdigest():
+                return WRITE_UNCHANGED
+        
+        if not self.confirm_overwrite(file_name):
+            return WRITE_CANCELLED
+        
+        target_dir = os.path.dirname(os.path.abspath(file_name))
+        temp_fd, temp_path = tempfile.mkstemp(
+            dir=target_dir, prefix=f".{os.path.basename(file_name)}.", suffix=".tmp"
+        )
+        try:
+            with os.fdopen(temp_fd, "wb", buffering=OUTPUT_BUFFER_SIZE) as f:
+                output_stream = wrap_binary_stream(f, get_compression_by_extension(file_name))
+                for data in encoded_blocks:
+                    output_stream.write(data)
+                if output_stream is not f:
+                    output_stream.close()
+                f.flush()
+                if self.fsync_policy != "never":
+                    os.fsync(f.fileno())
+            
+            self._copy_mode(file_name, temp_path)
+            os.replace(temp_path, file_name)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
+        
+        if self.fsync_policy == "always":
+            self._fsync_directory(target_dir)
+        return WRITE_WRITTEN
+    
+    @staticmethod
+    def _copy_mode(file_name, temp_path):
+        """Give the temporary file the permissions the output file would have."""
+        if os.path.exists(file_name):
+            mode = os.stat(file_name).st_mode & 0o7777
+        else:
+            mode = 0o666 & ~_get_umask()
+        os.chmod(temp_path, mode)
+    
+    @staticmethod
+    def _fsync_directory(directory):
+        """Flush a directory entry so the rename survives a crash."""
+        if not hasattr(os, "O_DIRECTORY"):
+            return
+        dir_fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
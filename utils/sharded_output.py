@@ -0,0 +1,224 @@
+"""
+Sharded output by Hebrew year for the Tahara Calculator.
+
+This module partitions the formatted period blocks into one file per
+Hebrew year, writes the shards concurrently and records them in a
+manifest, so consumers can load only the years they need.
+"""
+
+import hashlib
+import json
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from config.config_snapshot import get_config_snapshot
+from utils.formatters import format_period_block
+from utils.output_writer import BatchOutputWriter
+
+# Ways of assigning a period block to a year
+SHARD_BY_OPTIONS = ("period", "forbidden_day")
+
+MANIFEST_FILE_NAME = "manifest.json"
+
+# Shard file names: the Hebrew year followed by the shard suffix
+SHARD_FILE_NAME_PATTERN = re.compile(r"\d+[^/\\]*")
+
+
+class YearShard:
+    """Formatted output blocks belonging to a single Hebrew year."""
+    
+    def __init__(self, year):
+        """
+        Initialize an empty shard.
+        
+        Args:
+            year: The Hebrew year of the shard
+        """
+        self.year = year
+        self.blocks = []
+        self.period_count = 0
+        self.forbidden_day_count = 0
+    
+    def add_block(self, block, forbidden_day_count):
+        """Add a formatted period block to the shard."""
+        self.blocks.append(block)
+        self.period_count += 1
+        self.forbidden_day_count += forbidden_day_count
+    
+    def get_content_hash(self, encoding="utf-8"):
+        """Get the SHA-256 digest of the shard's content."""
+        hasher = hashlib.sha256()
+        for block in self.blocks:
+            hasher.update(block.encode(encoding))
+        return hasher.hexdigest()
+
+
+def partition_by_year(periods_indexed_by_date, shard_by="period", config=None):
+    """
+    Partition the formatted period blocks by Hebrew year.
+    
+    Args:
+        periods_indexed_by_date: Dictionary of periods indexed by Hebrew date
+        shard_by: "period" to use the period's year, or "forbidden_day" to
+            split each period's forbidden days by their own year
+        config: ConfigSnapshot (default: the global snapshot)
+    
+    Returns:
+        dict: Hebrew year -> YearShard, sorted by year
+    """
+    if shard_by not in SHARD_BY_OPTIONS:
+        raise ValueError(f"Invalid shard mode: {shard_by}")
+    
+    shards = {}
+    for period_date, current_period in periods_indexed_by_date.items():
+        if shard_by == "period":
+            forbidden_days_by_year = {period_date.year: current_period.forbidden_days_list}
+        else:
+            forbidden_days_by_year = _split_forbidden_days_by_year(current_period.forbidden_days_list)
+        
+        for year, forbidden_days_list in forbidden_days_by_year.items():
+            if year not in shards:
+                shards[year] = YearShard(year)
+            shards[year].add_block(
+                format_period_block(period_date, current_period, forbidden_days_list, config),
+                _count_forbidden_days(forbidden_days_list)
+            )
+    
+    return dict(sorted(shards.items()))
+
+
+def _split_forbidden_days_by_year(forbidden_days_list):
+    """Split a forbidden days list (including unbroken pattern lists) by Hebrew year."""
+    forbidden_days_by_year = {}
+    for forbidden_day in forbidden_days_list:
+        if isinstance(forbidden_day, list):
+            patterns_by_year = {}
+            for unbroken_pattern in forbidden_day:
+                patterns_by_year.setdefault(unbroken_pattern.year, []).append(unbroken_pattern)
+            for year, unbroken_patterns in patterns_by_year.items():
+                forbidden_days_by_year.setdefault(year, []).append(unbroken_patterns)
+        else:
+            forbidden_days_by_year.setdefault(forbidden_day.year, []).append(forbidden_day)
+    return forbidden_days_by_year
+
+
+def _count_forbidden_days(forbidden_days_list):
+    """Count forbidden days, including those inside unbroken pattern lists."""
+    return sum(
+        len(forbidden_day) if isinstance(forbidden_day, list) else 1
+        for forbidden_day in forbidden_days_list
+    )
+
+
+def _is_shard_file(output_dir, file_name):
+    """
+    Check whether a file name from a manifest names a shard file inside the output directory.
+    
+    Manifests can be edited by hand, so names that could reach outside
+    the directory (paths, absolute names, links) are never treated as shards.
+    """
+    if not isinstance(file_name, str) or os.path.basename(file_name) != file_name:
+        return False
+    if not SHARD_FILE_NAME_PATTERN.fullmatch(file_name):
+        return False
+    real_output_dir = os.path.realpath(output_dir)
+    real_file_path = os.path.realpath(os.path.join(output_dir, file_name))
+    return os.path.dirname(real_file_path) == real_output_dir
+
+
+def load_manifest(output_dir):
+    """
+    Load the shard manifest from an output directory.
+    
+    Args:
+        output_dir: Directory containing the shards
+    
+    Returns:
+        dict: The manifest, or None if there is no valid manifest
+    """
+    manifest_path = os.path.join(output_dir, MANIFEST_FILE_NAME)
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (json.JSONDecodeError, IOError, OSError):
+        return None
+
+
+def export_sharded_results(output_dir, periods_indexed_by_date, shard_by="period",
+                           file_suffix=".txt", max_workers=None, config=None):
+    """
+    Write one output file per Hebrew year plus a manifest.
+    
+    Shards whose content hash matches the previous manifest are not
+    rewritten, and shards that no longer exist are removed.
+    
+    Args:
+        output_dir: Directory to write the shards into
+        periods_indexed_by_date: Dictionary of periods indexed by Hebrew date
+        shard_by: "period" or "forbidden_day" (see partition_by_year)
+        file_suffix: Shard file suffix, e.g. ".txt.gz" for compressed shards
+        max_workers: Maximum number of writer threads (optional)
+        config: ConfigSnapshot (default: the global snapshot)
+    
+    Returns:
+        tuple: (the new manifest, number of shards rewritten)
+    """
+    config = config or get_config_snapshot()
+    encoding = config.encoding
+    writer = BatchOutputWriter(
+        encoding=encoding,
+        fsync_policy=config.fsync_policy,
+        overwrite_policy="overwrite",
+        skip_unchanged=False
+    )
+    
+    os.makedirs(output_dir, exist_ok=True)
+    previous_manifest = load_manifest(output_dir) or {}
+    previous_hashes = {
+        shard_entry["file"]: shard_entry["sha256"]
+        for shard_entry in previous_manifest.get("shards", [])
+    }
+    
+    shards = partition_by_year(periods_indexed_by_date, shard_by, config)
+    shard_entries = []
+    pending_writes = []
+    for year, shard in shards.items():
+        shard_file = f"{year}{file_suffix}"
+        content_hash = shard.get_content_hash(encoding)
+        shard_entries.append({
+            "year": year,
+            "file": shard_file,
+            "periods": shard.period_count,
+            "forbidden_days": shard.forbidden_day_count,
+            "sha256": content_hash
+        })
+        shard_path = os.path.join(output_dir, shard_file)
+        if previous_hashes.get(shard_file) != content_hash or not os.path.exists(shard_path):
+            pending_writes.append((shard_path, shard.blocks))
+    
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(writer.write, shard_path, blocks)
+            for shard_path, blocks in pending_writes
+        ]
+        for future in futures:
+            future.result()
+    
+    # Remove shards left over from a previous run
+    current_files = {shard_entry["file"] for shard_entry in shard_entries}
+    for stale_file in set(previous_hashes) - current_files:
+        if not _is_shard_file(output_dir, stale_file):
+            continue
+        stale_path = os.path.join(output_dir, stale_file)
+        if os.path.isfile(stale_path):
+            os.remove(stale_path)
+    
+    manifest = {
+        "shard_by": shard_by,
+        "encoding": encoding,
+        "shards": shard_entries
+    }
+    manifest_text = json.dumps(manifest, indent=2, ensure_ascii=False) + "\n"
+    writer.write(os.path.join(output_dir, MANIFEST_FILE_NAME), [manifest_text])
+    return manifest, len(pending_writes)
@@ -0,0 +1,338 @@
+"""
+Year-at-a-glance calendar grid for the Tahara Calculator.
+
+This module renders a Hebrew year as month grids in which every day
+shows whether its night and day onot carry restrictions and which rules
+apply. The forbidden days are first folded into a flat array of rule
+flags with one byte per onah, indexed by day ordinal, so rendering the
+year is a single pass over that array instead of a search through every
+period's forbidden days for each cell. The grid is available as text
+and as HTML.
+"""
+
+import html
+from typing import NamedTuple, Tuple
+
+from utils.formatters import TIME_OF_DAY_DICT
+from utils.hebrew_calendar_utils import get_day_ordinal, get_hebrew_month_length
+from utils.lazy_import import lazy_import
+
+# pyluach is loaded on first use to keep startup fast
+dates = lazy_import("pyluach.dates")
+hebrewcal = lazy_import("pyluach.hebrewcal")
+
+# Output formats of the grid
+YEAR_GRID_FORMATS = ("text", "html")
+
+# Flag bit and one-letter text code of each restriction name
+GRID_RULES = (
+    ("אור זרוע", "O"),
+    ("כרתי ופלתי", "K"),
+    ("עונה בינונית 30", "B"),
+    ("עונה בינונית 31", "L"),
+    ("וסת החודש", "M"),
+    ("הפלגה", "H")
+)
+_RULE_FLAGS = {restriction_name: 1 << bit for bit, (restriction_name, _) in enumerate(GRID_RULES)}
+
+# Unbroken patterns are named by their interval, so they share one flag
+UNBROKEN_PATTERN_FLAG = 1 << len(GRID_RULES)
+UNBROKEN_PATTERN_CODE = "U"
+
+# Marks the onah on which a period itself began
+PERIOD_FLAG = 0x80
+
+# Text marks of onot without restrictions, with several rules, and of periods
+_FREE_MARK = "."
+_SEVERAL_RULES_MARK = "*"
+_PERIOD_MARK = "P"
+
+# Column headers of the text grid, Sunday first (Latin, so bidi terminals keep the column order)
+_TEXT_WEEKDAY_HEADERS = ("Su", "Mo", "Tu", "We", "Th", "Fr", "Sa")
+_TEXT_CELL_WIDTH = 5
+_TEXT_HEADER_LINE = " ".join(f"{header:>{_TEXT_CELL_WIDTH}}" for header in _TEXT_WEEKDAY_HEADERS) + "\n"
+_HTML_WEEKDAY_HEADERS = ("ראשון", "שני", "שלישי", "רביעי", "חמישי", "שישי", "שבת")
+
+_HTML_STYLE = (
+    "body{font-family:sans-serif}"
+    "table{border-collapse:collapse;margin:0 1em 1.5em 0;display:inline-table;vertical-align:top}"
+    "th,td{border:1px solid #bbb;padding:2px 4px;vertical-align:top;font-size:12px;width:7em}"
+    "td.empty{border:none}"
+    ".day{font-weight:bold}"
+    ".onah{display:block}"
+    ".restricted{background:#fde2e1}"
+    ".period{background:#f5b7b1}"
+)
+
+
+class GridMonth(NamedTuple):
+    """One month of a year grid."""
+    
+    month: int
+    name: str
+    first_ordinal: int
+    length: int
+
+
+class YearGrid(NamedTuple):
+    """Restriction flags of every onah in one Hebrew year."""
+    
+    year: int
+    year_name: str
+    # Months in calendar order, starting with Tishrei
+    months: Tuple[GridMonth, ...]
+    first_ordinal: int
+    day_count: int
+    # Two flag bytes per day (night, then day), indexed from first_ordinal
+    flags: bytes
+    
+    def get_onah_flags(self, ordinal, time_of_day) -> int:
+        """Get the flags of one onah of the year."""
+        return self.flags[(ordinal - self.first_ordinal) * 2 + time_of_day]
+
+
+def get_rule_flag(restriction_name) -> int:
+    """
+    Get the flag bit of a restriction name.
+    
+    Args:
+        restriction_name: Restriction name of a forbidden day
+    
+    Returns:
+        int: The flag bit (0 for unknown rules)
+    """
+    if restriction_name.isdigit():
+        return UNBROKEN_PATTERN_FLAG
+    return _RULE_FLAGS.get(restriction_name, 0)
+
+
+def get_flag_rule_names(onah_flags):
+    """
+    Get the display names of the rules set in an onah's flags.
+    
+    Args:
+        onah_flags: Flags of one onah
+    
+    Returns:
+        list: Restriction display names, in GRID_RULES order
+    """
+    rule_names = [
+        restriction_name for restriction_name, _ in GRID_RULES if onah_flags & _RULE_FLAGS[restriction_name]
+    ]
+    if onah_flags & UNBROKEN_PATTERN_FLAG:
+        rule_names.append("הפלגה שלא נעקרה")
+    return rule_names
+
+
+def build_onah_flags(periods_indexed_by_date, first_ordinal, day_count):
+    """
+    Fold all forbidden days in a range of days into per-onah rule flags.
+    
+    Args:
+        periods_indexed_by_date: Dictionary of periods indexed by Hebrew date
+        first_ordinal: Day ordinal of the first day of the range
+        day_count: Number of days in the range
+    
+    Returns:
+        bytearray: Two flag bytes per day (night, then day)
+    """
+    flags = bytearray(day_count * 2)
+    for period_date, period in periods_indexed_by_date.items():
+        day_index = get_day_ordinal(period_date) - first_ordinal
+        if 0 <= day_index < day_count:
+            flags[day_index * 2 + period.time_of_day] |= PERIOD_FLAG
+        
+        for forbidden_day in period.forbidden_days_list:
+            # Unbroken patterns are nested lists of ForbiddenDay objects
+            entry_days = forbidden_day if isinstance(forbidden_day, (list, tuple)) else (forbidden_day,)
+            for entry_day in entry_days:
+                day_index = get_day_ordinal(entry_day.hebrew_date) - first_ordinal
+                if 0 <= day_index < day_count:
+                    flags[day_index * 2 + entry_day.time_of_day] |= get_rule_flag(entry_day.restriction_name)
+    return flags
+
+
+def build_year_grid(periods_indexed_by_date, hebrew_year) -> YearGrid:
+    """
+    Build the grid of one Hebrew year.
+    
+    Args:
+        periods_indexed_by_date: Dictionary of periods indexed by Hebrew date
+        hebrew_year: The Hebrew year (from Tishrei)
+    
+    Returns:
+        YearGrid: The year's months and onah flags
+    """
+    year = hebrewcal.Year(hebrew_year)
+    first_ordinal = get_day_ordinal(dates.HebrewDate(hebrew_year, 7, 1))
+    months = []
+    month_ordinal = first_ordinal
+    for month in year.itermonths():
+        month_length = get_hebrew_month_length(month)
+        months.append(GridMonth(month.month, month.month_name(hebrew=True), month_ordinal, month_length))
+        month_ordinal += month_length
+    day_count = month_ordinal - first_ordinal
+    
+    return YearGrid(
+        year=hebrew_year,
+        year_name=year.year_string(),
+        months=tuple(months),
+        first_ordinal=first_ordinal,
+        day_count=day_count,
+        flags=bytes(build_onah_flags(periods_indexed_by_date, first_ordinal, day_count))
+    )
+
+
+def _get_weekday(ordinal):
+    """Get the weekday of a day ordinal (1 = Sunday ... 7 = Shabbat, as pyluach)."""
+    return (ordinal + 1) % 7 + 1
+
+
+def _iter_month_weeks(grid_month):
+    """Yield the month's weeks as lists of seven day numbers (None outside the month)."""
+    week = [None] * (_get_weekday(grid_month.first_ordinal) - 1)
+    for day in range(1, grid_month.length + 1):
+        week.append(day)
+        if len(week) == 7:
+            yield week
+            week = []
+    if week:
+        yield week + [None] * (7 - len(week))
+
+
+def _get_text_mark(onah_flags):
+    """Get the one-character text mark of an onah."""
+    if onah_flags & PERIOD_FLAG:
+        return _PERIOD_MARK
+    rule_codes = [
+        rule_code for restriction_name, rule_code in GRID_RULES if onah_flags & _RULE_FLAGS[restriction_name]
+    ]
+    if onah_flags & UNBROKEN_PATTERN_FLAG:
+        rule_codes.append(UNBROKEN_PATTERN_CODE)
+    if not rule_codes:
+        return _FREE_MARK
+    return rule_codes[0] if len(rule_codes) == 1 else _SEVERAL_RULES_MARK
+
+
+def _format_text_legend():
+    """Format the legend of the text grid."""
+    legend_lines = ["מקרא (ליל ואחריו יום):\n"]
+    legend_lines.extend(f"  {rule_code} = {restriction_name}\n" for restriction_name, rule_code in GRID_RULES)
+    legend_lines.append(f"  {UNBROKEN_PATTERN_CODE} = הפלגה שלא נעקרה\n")
+    legend_lines.append(f"  {_SEVERAL_RULES_MARK} = כמה איסורים, {_PERIOD_MARK} = ראייה, {_FREE_MARK} = מותר\n")
+    return "".join(legend_lines)
+
+
+def format_year_grid_text(year_grid, output_separator="-" * 25, show_details=True):
+    """
+    Format a year grid as text, one block per month.
+    
+    Each cell shows the day of the month followed by the marks of its
+    night and day onot.
+    
+    Args:
+        year_grid: YearGrid to format
+        output_separator: Separator line placed after each month
+        show_details: List the rules of each restricted onah under its month
+    
+    Yields:
+        str: Formatted block (the legend, then one per month)
+    """
+    yield f"לוח שנתי {year_grid.year_name}:\n{_format_text_legend()}{output_separator}\n"
+    
+    flags = year_grid.flags
+    for grid_month in year_grid.months:
+        flag_offset = (grid_month.first_ordinal - year_grid.first_ordinal) * 2
+        month_lines = [f"{grid_month.name} {year_grid.year_name}:\n", _TEXT_HEADER_LINE]
+        for week in _iter_month_weeks(grid_month):
+            cells = []
+            for day in week:
+                if day is None:
+                    cells.append(" " * _TEXT_CELL_WIDTH)
+                    continue
+                night_mark = _get_text_mark(flags[flag_offset + day * 2 - 2])
+                day_mark = _get_text_mark(flags[flag_offset + day * 2 - 1])
+                cells.append(f"{day:>{_TEXT_CELL_WIDTH - 2}}{night_mark}{day_mark}")
+            month_lines.append(" ".join(cells).rstrip() + "\n")
+        
+        if show_details:
+            for day in range(1, grid_month.length + 1):
+                for time_of_day in (0, 1):
+                    rule_names = get_flag_rule_names(flags[flag_offset + (day - 1) * 2 + time_of_day])
+                    if rule_names:
+                        month_lines.append(f"  {day} ב{TIME_OF_DAY_DICT[time_of_day]}: {', '.join(rule_names)}\n")
+        
+        month_lines.append(output_separator + "\n")
+        yield "".join(month_lines)
+
+
+def _format_html_onah(onah_flags, time_of_day):
+    """Format one onah of an HTML day cell."""
+    rule_names = get_flag_rule_names(onah_flags)
+    label = TIME_OF_DAY_DICT[time_of_day]
+    if onah_flags & PERIOD_FLAG:
+        rule_names.insert(0, "ראייה")
+    if not rule_names:
+        return f'<span class="onah">{label}</span>'
+    css_class = "period" if onah_flags & PERIOD_FLAG else "restricted"
+    return f'<span class="onah {css_class}">{label}: {html.escape(", ".join(rule_names))}</span>'
+
+
+def format_year_grid_html(year_grid):
+    """
+    Format a year grid as an HTML page, one table per month.
+    
+    Args:
+        year_grid: YearGrid to format
+    
+    Yields:
+        str: Formatted block (page header, one per month, page footer)
+    """
+    title = html.escape(f"לוח שנתי {year_grid.year_name}")
+    yield (
+        f'<!DOCTYPE html>\n<html lang="he" dir="rtl">\n<head>\n<meta charset="utf-8">\n'
+        f"<title>{title}</title>\n<style>{_HTML_STYLE}</style>\n</head>\n<body>\n<h1>{title}</h1>\n"
+    )
+    
+    flags = year_grid.flags
+    header_cells = "".join(f"<th>{weekday_name}</th>" for weekday_name in _HTML_WEEKDAY_HEADERS)
+    for grid_month in year_grid.months:
+        flag_offset = (grid_month.first_ordinal - year_grid.first_ordinal) * 2
+        month_html = [
+            f"<table>\n<caption>{html.escape(grid_month.name)} {html.escape(year_grid.year_name)}</caption>\n"
+            f"<tr>{header_cells}</tr>\n"
+        ]
+        for week in _iter_month_weeks(grid_month):
+            cells = []
+            for day in week:
+                if day is None:
+                    cells.append('<td class="empty"></td>')
+                    continue
+                night_flags = flags[flag_offset + day * 2 - 2]
+                day_flags = flags[flag_offset + day * 2 - 1]
+                cells.append(
+                    f'<td><span class="day">{day}</span>'
+                    f"{_format_html_onah(night_flags, 0)}{_format_html_onah(day_flags, 1)}</td>"
+                )
+            month_html.append(f"<tr>{''.join(cells)}</tr>\n")
+        month_html.append("</table>\n")
+        yield "".join(month_html)
+    
+    yield "</body>\n</html>\n"
+
+
+def format_year_grid(year_grid, grid_format="text", output_separator="-" * 25):
+    """
+    Format a year grid in one of YEAR_GRID_FORMATS.
+    
+    Args:
+        year_grid: YearGrid to format
+        grid_format: "text" or "html"
+        output_separator: Separator line of the text grid
+    
+    Returns:
+        Iterator of formatted blocks
+    """
+    if grid_format == "html":
+        return format_year_grid_html(year_grid)
+    return format_year_grid_text(year_grid, output_separator)
@@ -0,0 +1,6 @@
+"""
+Correctness verification tools for the Tahara Calculator.
+
+Modules:
+    differential: Randomized differential testing of alternative engines
+"""
@@ -0,0 +1,373 @@
+"""
+Differential correctness harness for the Tahara Calculator engines.
+
+This module runs the reference implementations of calculate_forbidden_days
+and _calculate_unbroken_patterns side by side with every registered
+alternative implementation over randomized histories. The histories
+cover 29/30-day months, Adar I/II in leap years and night/day onahs.
+Any mismatch is shrunk to a minimal reproducing history.
+
+Usage:
+    python verification/differential.py --iterations 500 --seed 0
+"""
+
+import argparse
+import os
+import random
+import sys
+
+# Add the parent directory to the Python path when run as a script
+if not __package__:
+    parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if parent_dir not in sys.path:
+        sys.path.insert(0, parent_dir)
+
+from pyluach import dates, hebrewcal
+from src.models import MenstrualPeriod
+from src.calculations import (
+    UnbrokenIntervalState,
+    calculate_forbidden_days,
+    _calculate_unbroken_patterns,
+    _calculate_unbroken_patterns_from_state,
+    _calculate_unbroken_patterns_linear
+)
+from src.processor import calculate_cycle_intervals
+from utils.date_converter import format_hebrew_date_for_input
+from utils.hebrew_calendar_utils import get_day_ordinal, get_hebrew_month_length
+
+
+def _calculate_forbidden_days_incremental(menstrual_period, previous_cycle_intervals=None):
+    """Adapt calculate_forbidden_days with an unbroken interval state to the engine signature."""
+    return calculate_forbidden_days(
+        menstrual_period, previous_cycle_intervals,
+        UnbrokenIntervalState(previous_cycle_intervals or ())
+    )
+
+
+def _calculate_unbroken_patterns_incremental(menstrual_period, previous_cycle_intervals, period_date):
+    """Adapt the incremental unbroken interval state to the engine signature."""
+    return _calculate_unbroken_patterns_from_state(
+        menstrual_period, previous_cycle_intervals, period_date,
+        UnbrokenIntervalState(previous_cycle_intervals)
+    )
+
+
+# Engines compared against the reference; register alternatives here
+FORBIDDEN_DAYS_ENGINES = {
+    "reference": calculate_forbidden_days,
+    "incremental": _calculate_forbidden_days_incremental
+}
+UNBROKEN_PATTERNS_ENGINES = {
+    "reference": _calculate_unbroken_patterns,
+    "linear": _calculate_unbroken_patterns_linear,
+    "incremental": _calculate_unbroken_patterns_incremental
+}
+
+# Range of Hebrew years histories start in (covers both leap and non-leap years)
+START_YEAR_RANGE = (5700, 5800)
+
+# Upper limit of shrinking attempts per mismatch
+MAX_SHRINK_STEPS = 2000
+
+
+def register_forbidden_days_engine(name, engine):
+    """
+    Register an alternative calculate_forbidden_days implementation.
+    
+    Args:
+        name: Engine name
+        engine: Function with the signature of calculate_forbidden_days
+    """
+    FORBIDDEN_DAYS_ENGINES[name] = engine
+
+
+def register_unbroken_patterns_engine(name, engine):
+    """
+    Register an alternative _calculate_unbroken_patterns implementation.
+    
+    Args:
+        name: Engine name
+        engine: Function with the signature of _calculate_unbroken_patterns
+    """
+    UNBROKEN_PATTERNS_ENGINES[name] = engine
+
+
+def _random_start_date(rng):
+    """Pick a start date, favouring month edges and Adar I/II."""
+    year = rng.randint(*START_YEAR_RANGE)
+    month_count = 13 if hebrewcal.Year(year).leap else 12
+    if rng.random() < 0.3:
+        month = rng.choice([12, 13] if month_count == 13 else [12])
+    else:
+        month = rng.randint(1, month_count)
+    month_length = get_hebrew_month_length(hebrewcal.Month(year, month))
+    day = rng.choice([1, 2, month_length - 1, month_length, rng.randint(1, month_length)])
+    return dates.HebrewDate(year, month, day)
+
+
+def _random_interval(rng, previous_intervals):
+    """Pick a cycle interval, mixing repeats, month lengths and long gaps."""
+    choice = rng.random()
+    if previous_intervals and choice < 0.3:
+        return rng.choice(previous_intervals)
+    if choice < 0.55:
+        return rng.choice([28, 29, 30, 31])
+    if choice < 0.8:
+        return rng.randint(20, 40)
+    if choice < 0.9:
+        return rng.randint(1, 5)
+    return rng.randint(50, 400)
+
+
+def generate_history(rng, max_periods=30):
+    """
+    Generate a random period history.
+    
+    Args:
+        rng: random.Random instance
+        max_periods: Maximum number of periods
+    
+    Returns:
+        list: (day ordinal, time_of_day) tuples in chronological order
+    """
+    period_count = rng.randint(1, max_periods)
+    ordinal = get_day_ordinal(_random_start_date(rng))
+    history = [(ordinal, rng.randint(0, 1))]
+    intervals = []
+    for _ in range(period_count - 1):
+        interval = _random_interval(rng, intervals)
+        intervals.append(interval)
+        ordinal += interval - 1
+        history.append((ordinal, rng.randint(0, 1)))
+    return history
+
+
+def _ordinal_to_hebrew_date(ordinal):
+    """Convert a day ordinal back to a Hebrew date."""
+    return dates.JulianDay(ordinal - .5).to_heb()
+
+
+def build_periods(history):
+    """
+    Build menstrual periods and their cycle intervals from a history.
+    
+    Args:
+        history: (day ordinal, time_of_day) tuples
+    
+    Returns:
+        tuple: (list of MenstrualPeriod, list of cycle intervals)
+    """
+    menstrual_periods_list = [
+        MenstrualPeriod(_ordinal_to_hebrew_date(ordinal), time_of_day)
+        for ordinal, time_of_day in history
+    ]
+    historical_cycle_intervals = calculate_cycle_intervals(menstrual_periods_list)
+    return menstrual_periods_list, historical_cycle_intervals
+
+
+def _normalize_forbidden_day(forbidden_day):
+    """Get the comparable content of a forbidden day."""
+    return (
+        forbidden_day.restriction_name,
+        get_day_ordinal(forbidden_day.hebrew_date),
+        forbidden_day.time_of_day
+    )
+
+
+def normalize_result(forbidden_days_list):
+    """
+    Get the comparable content of a calculation result, preserving order.
+    
+    Args:
+        forbidden_days_list: ForbiddenDay objects and unbroken pattern lists, or None
+    
+    Returns:
+        tuple: Nested tuples of (restriction name, day ordinal, time_of_day)
+    """
+    if forbidden_days_list is None:
+        return None
+    return tuple(
+        tuple(_normalize_forbidden_day(pattern) for pattern in forbidden_day)
+        if isinstance(forbidden_day, list) else _normalize_forbidden_day(forbidden_day)
+        for forbidden_day in forbidden_days_list
+    )
+
+
+def find_mismatch(history):
+    """
+    Run every engine over a history and return the first disagreement.
+    
+    Args:
+        history: (day ordinal, time_of_day) tuples
+    
+    Returns:
+        dict: Mismatch description, or None if all engines agree
+    """
+    menstrual_periods_list, historical_cycle_intervals = build_periods(history)
+    for period_index, period in enumerate(menstrual_periods_list):
+        previous_intervals = historical_cycle_intervals[:period_index]
+        
+        expected = normalize_result(FORBIDDEN_DAYS_ENGINES["reference"](period, previous_intervals))
+        for engine_name, engine in FORBIDDEN_DAYS_ENGINES.items():
+            actual = normalize_result(engine(period, previous_intervals))
+            if actual != expected:
+                return _describe_mismatch("calculate_forbidden_days", engine_name, period_index,
+                                          previous_intervals, expected, actual)
+        
+        expected = normalize_result(
+            UNBROKEN_PATTERNS_ENGINES["reference"](period, previous_intervals, period.hebrew_date)
+        )
+        for engine_name, engine in UNBROKEN_PATTERNS_ENGINES.items():
+            actual = normalize_result(engine(period, previous_intervals, period.hebrew_date))
+            if actual != expected:
+                return _describe_mismatch("_calculate_unbroken_patterns", engine_name, period_index,
+                                          previous_intervals, expected, actual)
+    return None
+
+
+def _describe_mismatch(function_name, engine_name, period_index, previous_intervals, expected, actual):
+    """Build a mismatch description."""
+    return {
+        "function": function_name,
+        "engine": engine_name,
+        "period_index": period_index,
+        "previous_intervals": list(previous_intervals),
+        "expected": expected,
+        "actual": actual
+    }
+
+
+def shrink_history(history, max_steps=MAX_SHRINK_STEPS):
+    """
+    Shrink a failing history to a minimal one that still fails.
+    
+    Tries removing chunks of periods, then single periods, then moving
+    periods to night onahs and shortening the gaps between periods.
+    
+    Args:
+        history: (day ordinal, time_of_day) tuples that produce a mismatch
+        max_steps: Maximum number of candidate histories to try
+    
+    Returns:
+        list: A smaller history that still produces a mismatch
+    """
+    steps = 0
+    
+    def still_fails(candidate):
+        nonlocal steps
+        steps += 1
+        return bool(candidate) and find_mismatch(candidate) is not None
+    
+    improved = True
+    while improved and steps < max_steps:
+        improved = False
+        
+        # Remove chunks of periods, from large chunks down to single periods
+        chunk_size = len(history) // 2
+        while chunk_size >= 1 and steps < max_steps:
+            start = 0
+            while start < len(history) and steps < max_steps:
+                candidate = history[:start] + history[start + chunk_size:]
+                if still_fails(candidate):
+                    history = candidate
+                    improved = True
+                else:
+                    start += chunk_size
+            chunk_size //= 2
+        
+        # Prefer night onahs
+        for period_index, (ordinal, time_of_day) in enumerate(history):
+            if time_of_day and steps < max_steps:
+                candidate = list(history)
+                candidate[period_index] = (ordinal, 0)
+                if still_fails(candidate):
+                    history = candidate
+                    improved = True
+        
+        # Shorten the gaps between consecutive periods
+        for period_index in range(1, len(history)):
+            gap = history[period_index][0] - history[period_index - 1][0]
+            while gap > 1 and steps < max_steps:
+                shift = gap // 2
+                candidate = history[:period_index] + [
+                    (ordinal - shift, time_of_day) for ordinal, time_of_day in history[period_index:]
+                ]
+                if not still_fails(candidate):
+                    break
+                history = candidate
+                gap -= shift
+                improved = True
+    
+    return history
+
+
+def format_history(history):
+    """
+    Format a history in input file format.
+    
+    Args:
+        history: (day ordinal, time_of_day) tuples
+    
+    Returns:
+        str: One "day/month/year time_of_day" line per period
+    """
+    return "\n".join(
+        format_hebrew_date_for_input(_ordinal_to_hebrew_date(ordinal), time_of_day)
+        for ordinal, time_of_day in history
+    )
+
+
+def run_differential_check(iterations=200, seed=0, max_periods=30, output_stream=None):
+    """
+    Compare all registered engines against the reference over random histories.
+    
+    Args:
+        iterations: Number of random histories
+        seed: Random seed
+        max_periods: Maximum periods per history
+        output_stream: Stream for the report (default: stdout)
+    
+    Returns:
+        dict: Minimal mismatch (with its "history"), or None if all engines agree
+    """
+    output_stream = output_stream or sys.stdout
+    rng = random.Random(seed)
+    for iteration in range(iterations):
+        history = generate_history(rng, max_periods)
+        if find_mismatch(history) is None:
+            continue
+        
+        minimal_history = shrink_history(history)
+        mismatch = find_mismatch(minimal_history)
+        mismatch["history"] = minimal_history
+        output_stream.write(
+            f"Mismatch in {mismatch['function']} (engine '{mismatch['engine']}') "
+            f"on iteration {iteration}, period {mismatch['period_index']}\n"
+            f"Minimal history ({len(minimal_history)} periods):\n{format_history(minimal_history)}\n"
+            f"Previous intervals: {mismatch['previous_intervals']}\n"
+            f"Expected: {mismatch['expected']}\n"
+            f"Actual:   {mismatch['actual']}\n"
+        )
+        return mismatch
+    
+    engine_names = sorted(set(FORBIDDEN_DAYS_ENGINES) | set(UNBROKEN_PATTERNS_ENGINES))
+    output_stream.write(
+        f"All engines agree on {iterations} histories (engines: {', '.join(engine_names)})\n"
+    )
+    return None
+
+
+def main(argv=None):
+    """Main entry point for the differential harness."""
+    parser = argparse.ArgumentParser(description="Differential test of the Tahara Calculator engines.")
+    parser.add_argument("--iterations", type=int, default=200, help="Number of random histories")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    parser.add_argument("--max-periods", type=int, default=30, help="Maximum periods per history")
+    args = parser.parse_args(argv)
+    
+    mismatch = run_differential_check(args.iterations, args.seed, args.max_periods)
+    sys.exit(1 if mismatch else 0)
+
+
+if __name__ == "__main__":
+    main()